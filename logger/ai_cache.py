@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "logs" / "ai_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_TOUCH_BATCH = 64
+
+
+class AIDecisionCache:
+    """
+    Disk-backed cache of AI categorization decisions.
+
+    Entries live in a small SQLite file so restarts reuse earlier answers instead of
+    calling the AI again. Each cache instance owns one namespace (e.g. "context" keys
+    from _ai_cache_key, or "keyword" phrases) inside the shared file.
+
+    - LRU: hits refresh last_used in memory; the refreshes are written in one
+      transaction once touch_batch keys are pending, and before every insert, which
+      evicts the least recently used rows once the namespace holds more than
+      max_entries.
+    - TTL: rows expire after ttl_seconds (per-entry override allowed on set).
+    - Version: rows written under a different version (bumped by hand when the
+      categories change meaning) are treated as misses and pruned.
+    - Validity: with is_valid, rows whose category it rejects (e.g. one that was
+      renamed or removed) are treated as misses and deleted.
+
+    Nothing is opened until the first lookup or write.
+    """
+
+    def __init__(
+        self,
+        namespace,
+        path=None,
+        max_entries=DEFAULT_MAX_ENTRIES,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+        version=None,
+        is_valid=None,
+        touch_batch=DEFAULT_TOUCH_BATCH,
+    ):
+        self.namespace = namespace
+        self.path = Path(path or DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_batch = touch_batch
+        self._version = version
+        self._is_valid = is_valid
+        self._touched = {}  # key -> last_used not yet written
+        self._conn = None
+        self._pruned_version = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        if callable(self._version):
+            return str(self._version())
+        return str(self._version or "")
+
+    def _connection(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS ai_decisions (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    productive INTEGER NOT NULL,
+                    version TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_ai_decisions_lru
+                ON ai_decisions(namespace, last_used);
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        version = self._current_version()
+        if self._pruned_version != version:
+            self._conn.execute(
+                "DELETE FROM ai_decisions WHERE namespace = ? AND (version != ? OR expires_at <= ?)",
+                (self.namespace, version, time.time()),
+            )
+            self._conn.commit()
+            self._pruned_version = version
+        return self._conn
+
+    def get(self, key, default=None):
+        """Return (category, productive) for key, or default when missing/expired/stale."""
+        if not key:
+            return default
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                """
+                SELECT category, productive, version, expires_at
+                FROM ai_decisions
+                WHERE namespace = ? AND key = ?
+                """,
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                return default
+            category, productive, version, expires_at = row
+            if (
+                version != self._pruned_version
+                or expires_at <= now
+                or (self._is_valid is not None and not self._is_valid(category))
+            ):
+                self._touched.pop(key, None)
+                conn.execute(
+                    "DELETE FROM ai_decisions WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                conn.commit()
+                return default
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched(conn)
+                conn.commit()
+        return category, bool(productive)
+
+    def _flush_touched(self, conn):
+        """Write pending last_used refreshes; the caller commits."""
+        if self._touched:
+            conn.executemany(
+                "UPDATE ai_decisions SET last_used = ? WHERE namespace = ? AND key = ?",
+                [(used, self.namespace, key) for key, used in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store (category, productive) for key and evict LRU rows beyond max_entries."""
+        if not key:
+            return
+        category, productive = value
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            conn = self._connection()
+            self._touched.pop(key, None)
+            self._flush_touched(conn)
+            conn.execute(
+                """
+                INSERT INTO ai_decisions (
+                    namespace, key, category, productive, version, expires_at, last_used
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(namespace, key) DO UPDATE SET
+                    category = excluded.category,
+                    productive = excluded.productive,
+                    version = excluded.version,
+                    expires_at = excluded.expires_at,
+                    last_used = excluded.last_used
+                """,
+                (self.namespace, key, category, int(bool(productive)), self._pruned_version, now + ttl, now),
+            )
+            conn.execute(
+                """
+                DELETE FROM ai_decisions
+                WHERE namespace = ? AND key IN (
+                    SELECT key FROM ai_decisions
+                    WHERE namespace = ?
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.namespace, self.namespace, self.max_entries),
+            )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            self._touched.clear()
+            conn.execute("DELETE FROM ai_decisions WHERE namespace = ?", (self.namespace,))
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush_touched(self._conn)
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+                self._pruned_version = None
+
+    def __len__(self):
+        with self._lock:
+            conn = self._connection()
+            return conn.execute(
+                "SELECT COUNT(*) FROM ai_decisions WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()[0]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
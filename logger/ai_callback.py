@@ -1,17 +1,36 @@
+import importlib.util
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from openai import OpenAI
 from datetime import datetime
 
 RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "category_rules.json"
 AI_CONFIG_PATH = Path(__file__).resolve().parent.parent / "config" / "ai_config.json"
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# The openai SDK is imported on first client construction (see _openai_class).
+OpenAI = None
+DEFAULT_CATEGORY_NAMES = "Coding, Docs & Learning, Communication, Meetings, Research, Productivity, Social/Forums, Shopping, Entertainment, Gaming, Utilities, Idle/Unknown"
 
 
-def _load_categories():
+def ai_available():
+    """True when the openai SDK is installed; checked without importing it."""
+    return OpenAI is not None or importlib.util.find_spec("openai") is not None
+
+
+def _openai_class():
+    global OpenAI
+    if OpenAI is None:
+        from openai import OpenAI as client_class
+
+        OpenAI = client_class
+    return OpenAI
+
+
+def _load_categories(rules_path=None):
     try:
-        data = json.loads(RULES_PATH.read_text())
+        data = json.loads(Path(rules_path or RULES_PATH).read_text())
     except Exception:
         return {}
     return {
@@ -22,79 +41,246 @@ def _load_categories():
     }
 
 
-def _load_ai_config():
-    if AI_CONFIG_PATH.exists():
+def _load_ai_config(config_path=None):
+    config_path = Path(config_path or AI_CONFIG_PATH)
+    if config_path.exists():
         try:
-            return json.loads(AI_CONFIG_PATH.read_text())
+            return json.loads(config_path.read_text())
         except Exception:
             pass
     return {}
 
 
-def openai_categorize(app, title, url):
+def _mtime(path):
+    try:
+        return Path(path).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _normalize_suggestion(suggestion):
+    return {
+        "category": suggestion.get("category") or "Unknown",
+        "productive": bool(suggestion.get("productive", False)),
+        "confidence": suggestion.get("confidence"),
+        "rationale": suggestion.get("rationale"),
+    }
+
+
+def _log_call(user_content, message):
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    print("\n===== AI REQUEST (testing) =====")
+    print(f"Time: {now}")
+    print(json.dumps(user_content, indent=2))
+    print("----- AI RESPONSE -----")
+    print(message)
+    print("===== END AI CALL =====\n")
+
+
+class OpenAICategorizer:
     """
-    AI callback compatible with categorize_with_ai. Requires OPENAI_API_KEY.
+    Long-lived OpenAI classifier.
 
-    Returns a dict: {"category": str, "productive": bool, "confidence": float, "rationale": str}
+    Keeps one OpenAI client (and so one keep-alive HTTP connection pool) for the life of
+    the process. ai_config.json and category_rules.json are only re-read when their mtime
+    changes; the system prompts are rebuilt only when the category list changes, and the
+    client only when the api key or base_url changes.
+
+    stats() reports call count, latency and token usage so the saving is visible.
+    Paths default to the module-level AI_CONFIG_PATH / RULES_PATH.
     """
-    cfg = _load_ai_config()
-
-    api_key = cfg.get("api_key") or os.getenv("OPENAI_API_KEY")
-    model = cfg.get("model") or DEFAULT_MODEL
-    log_calls = bool(cfg.get("log_calls"))
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set")
-
-    client = OpenAI(api_key=api_key)
-    categories = _load_categories()
-    allowed_names = (
-        ", ".join(categories.keys())
-        if categories
-        else "Coding, Docs & Learning, Communication, Meetings, Research, Productivity, Social/Forums, Shopping, Entertainment, Gaming, Utilities, Idle/Unknown"
-    )
-
-    system_prompt = f"""You classify computer activity into one of these categories: {allowed_names}.
+
+    def __init__(self, config_path=None, rules_path=None):
+        self._config_path = config_path
+        self._rules_path = rules_path
+        self._lock = threading.Lock()
+
+        self._config = {}
+        self._config_stamp = None  # (path, mtime_ns) the cached config was read from
+        self._rules_stamp = None
+        self._allowed_names = DEFAULT_CATEGORY_NAMES
+        self._single_prompt = None
+        self._batch_prompt = None
+        self._client = None
+        self._client_key = None
+
+        self._stats = {}
+        self.reset_stats()
+
+    # -------- cached context --------
+    def _refresh(self):
+        """Return (client, config, single_prompt, batch_prompt), reloading what changed on disk."""
+        config_path = Path(self._config_path or AI_CONFIG_PATH)
+        rules_path = Path(self._rules_path or RULES_PATH)
+        with self._lock:
+            config_stamp = (config_path, _mtime(config_path))
+            if config_stamp != self._config_stamp:
+                self._config = _load_ai_config(config_path)
+                self._config_stamp = config_stamp
+                self._stats["config_loads"] += 1
+
+            rules_stamp = (rules_path, _mtime(rules_path))
+            if rules_stamp != self._rules_stamp:
+                categories = _load_categories(rules_path)
+                allowed_names = ", ".join(categories.keys()) if categories else DEFAULT_CATEGORY_NAMES
+                self._rules_stamp = rules_stamp
+                if allowed_names != self._allowed_names or self._single_prompt is None:
+                    self._allowed_names = allowed_names
+                    self._single_prompt, self._batch_prompt = self._build_prompts(allowed_names)
+                    self._stats["prompt_builds"] += 1
+
+            cfg = self._config
+            api_key = cfg.get("api_key") or os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY is not set")
+            base_url = cfg.get("base_url") or os.getenv("OPENAI_BASE_URL")
+            if self._client is None or self._client_key != (api_key, base_url):
+                if self._client is not None:
+                    self._client.close()
+                self._client = _openai_class()(api_key=api_key, base_url=base_url)
+                self._client_key = (api_key, base_url)
+                self._stats["client_builds"] += 1
+
+            return self._client, cfg, self._single_prompt, self._batch_prompt
+
+    @staticmethod
+    def _build_prompts(allowed_names):
+        single = f"""You classify computer activity into one of these categories: {allowed_names}.
 Return JSON with keys: category (string), productive (boolean), confidence (0-1), rationale (short).
 If unsure, use category="Unknown" and productive=false."""
+        batch = f"""You classify computer activity into one of these categories: {allowed_names}.
+You receive JSON {{"items": [{{"id", "app", "title", "url"}}, ...]}}.
+Return JSON {{"results": [...]}} with one object per item, keys: id (same as input), category (string), productive (boolean), confidence (0-1), rationale (short).
+If unsure, use category="Unknown" and productive=false."""
+        return single, batch
 
-    user_content = {
-        "app": app,
-        "title": title,
-        "url": url,
-    }
+    # -------- calls --------
+    def _complete(self, client, cfg, system_prompt, user_content, max_tokens, timeout=None):
+        model = cfg.get("model") or DEFAULT_MODEL
+        request = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": json.dumps(user_content)},
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.2,
+            "response_format": {"type": "json_object"},
+        }
+        if timeout is not None:
+            request["timeout"] = timeout
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": json.dumps(user_content)},
-        ],
-        max_tokens=120,
-        temperature=0.2,
-        response_format={"type": "json_object"},
-    )
-
-    message = response.choices[0].message.content
-    suggestion = json.loads(message) if message else {}
-
-    if log_calls:
-        now = datetime.now().strftime("%Y-%m-%d %H:%M")
-        print("\n===== AI REQUEST (testing) =====")
-        print(f"Time: {now}")
-        print(json.dumps(user_content, indent=2))
-        print("----- AI RESPONSE -----")
-        print(message)
-        print("===== END AI CALL =====\n")
-
-    # Normalize output
-    category = suggestion.get("category") or "Unknown"
-    productive = bool(suggestion.get("productive", False))
-    confidence = suggestion.get("confidence")
-    rationale = suggestion.get("rationale")
+        started = time.perf_counter()
+        try:
+            response = client.chat.completions.create(**request)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        latency = time.perf_counter() - started
 
-    return {
-        "category": category,
-        "productive": productive,
-        "confidence": confidence,
-        "rationale": rationale,
-    }
+        usage = getattr(response, "usage", None)
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["last_latency_seconds"] = latency
+            self._stats["total_latency_seconds"] += latency
+            self._stats["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            self._stats["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+        message = response.choices[0].message.content
+        if cfg.get("log_calls"):
+            _log_call(user_content, message)
+        return json.loads(message) if message else {}
+
+    def categorize(self, app, title, url):
+        """
+        Classify one context.
+
+        Returns a dict: {"category": str, "productive": bool, "confidence": float, "rationale": str}
+        """
+        client, cfg, single_prompt, _ = self._refresh()
+        user_content = {
+            "app": app,
+            "title": title,
+            "url": url,
+        }
+        suggestion = self._complete(client, cfg, single_prompt, user_content, max_tokens=120)
+        return _normalize_suggestion(suggestion)
+
+    def categorize_batch(self, items, timeout=None):
+        """
+        Classify several contexts with a single multi-item prompt.
+
+        items is a list of {"app", "title", "url"} dicts. Returns a list of suggestion dicts
+        (same shape as categorize) aligned with items; items the model skipped come
+        back as None, so they are cached like failed calls and retried sooner.
+        """
+        if not items:
+            return []
+        client, cfg, _, batch_prompt = self._refresh()
+        user_content = {
+            "items": [
+                {"id": idx, "app": item.get("app"), "title": item.get("title"), "url": item.get("url")}
+                for idx, item in enumerate(items)
+            ]
+        }
+        payload = self._complete(
+            client, cfg, batch_prompt, user_content, max_tokens=60 + 80 * len(items), timeout=timeout
+        )
+
+        by_id = {}
+        for result in payload.get("results") or []:
+            if isinstance(result, dict) and isinstance(result.get("id"), int):
+                by_id[result["id"]] = result
+        return [
+            _normalize_suggestion(by_id[idx]) if idx in by_id else None for idx in range(len(items))
+        ]
+
+    # -------- instrumentation --------
+    def stats(self):
+        """Snapshot of call/latency/token counters plus cache rebuild counts."""
+        with self._lock:
+            snapshot = dict(self._stats)
+        calls = snapshot["calls"]
+        snapshot["avg_latency_seconds"] = snapshot["total_latency_seconds"] / calls if calls else 0.0
+        return snapshot
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {
+                "calls": 0,
+                "errors": 0,
+                "last_latency_seconds": 0.0,
+                "total_latency_seconds": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "config_loads": 0,
+                "prompt_builds": 0,
+                "client_builds": 0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+                self._client_key = None
+
+
+DEFAULT_CATEGORIZER = OpenAICategorizer()
+
+
+def openai_categorize(app, title, url):
+    """
+    AI callback compatible with categorize_with_ai. Requires OPENAI_API_KEY.
+
+    Returns a dict: {"category": str, "productive": bool, "confidence": float, "rationale": str}
+    """
+    return DEFAULT_CATEGORIZER.categorize(app, title, url)
+
+
+def openai_categorize_batch(items, timeout=None):
+    """
+    Batch callback for AIClassificationQueue; see OpenAICategorizer.categorize_batch.
+    """
+    return DEFAULT_CATEGORIZER.categorize_batch(items, timeout=timeout)
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from logger.categorize import _ai_cache_key, apply_ai_suggestion
+
+
+class AIClassificationQueue:
+    """
+    Background AI classification so the capture loop never waits on the network.
+
+    categorize_with_ai(..., ai_queue=queue) returns the rule result immediately and
+    submits the context here. Pending contexts are deduplicated by _ai_cache_key,
+    grouped into batches (batch_size, or whatever arrived within max_wait_seconds)
+    and sent to batch_callback as one multi-item request. At most max_concurrency
+    batches are in flight at once; each call gets timeout_seconds.
+
+    Results are written back through apply_ai_suggestion (caches, keyword index,
+    rules) and then passed to listeners as (cache_key, category, productive), e.g.
+    LogBuffer.apply_ai_label to relabel buffered samples.
+
+    batch_callback should accept (items, timeout=...) where items is a list of
+    {"app", "title", "url"} dicts, and return one suggestion dict per item
+    (see logger.ai_callback.openai_categorize_batch). Items answered with None, or
+    missing from the end of the list, are recorded as failed calls: cached for
+    AI_FAILURE_TTL_SECONDS and retried by a later batch.
+    """
+
+    def __init__(
+        self,
+        batch_callback,
+        batch_size=8,
+        max_wait_seconds=2.0,
+        max_concurrency=2,
+        timeout_seconds=20.0,
+        max_pending=256,
+    ):
+        self.batch_callback = batch_callback
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_pending = max_pending
+
+        self._pending = OrderedDict()  # cache_key -> (queued_at, item)
+        self._in_flight = set()
+        self._listeners = []
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = None
+        self._thread = None
+        self._stopping = False
+
+    def add_listener(self, listener):
+        """Register listener(cache_key, category, productive), called once per resolved context."""
+        self._listeners.append(listener)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="ai-classify"
+        )
+        self._thread = threading.Thread(target=self._run, name="ai-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, drain=True, timeout=None):
+        """Stop the dispatcher. With drain=True, pending contexts are sent first."""
+        with self._cond:
+            if not drain:
+                self._pending.clear()
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=drain)
+            self._executor = None
+
+    def submit(self, app, title, url, provisional=("Unknown", False)):
+        """
+        Queue a context for AI classification. Returns False when it is already queued
+        or in flight, or when the queue is full (it will be resubmitted on a later sample).
+        """
+        host_lower = (urlparse(url or "").hostname or "").lower()
+        cache_key = _ai_cache_key(app, host_lower, title)
+        with self._cond:
+            if self._stopping:
+                return False
+            if cache_key in self._pending or cache_key in self._in_flight:
+                return False
+            if len(self._pending) >= self.max_pending:
+                return False
+            item = {"app": app, "title": title, "url": url, "provisional": tuple(provisional)}
+            self._pending[cache_key] = (time.monotonic(), item)
+            self._cond.notify_all()
+        return True
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def join(self, timeout=None):
+        """Wait until every submitted context has been resolved. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._slots.acquire()
+            try:
+                self._executor.submit(self._process, batch)
+            except RuntimeError:
+                self._slots.release()
+                self._finish(batch)
+                return
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if self._pending:
+                    oldest_at = next(iter(self._pending.values()))[0]
+                    waited = time.monotonic() - oldest_at
+                    if (
+                        self._stopping
+                        or len(self._pending) >= self.batch_size
+                        or waited >= self.max_wait_seconds
+                    ):
+                        break
+                    self._cond.wait(self.max_wait_seconds - waited)
+                elif self._stopping:
+                    return None
+                else:
+                    self._cond.wait()
+
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                cache_key, (_, item) = self._pending.popitem(last=False)
+                self._in_flight.add(cache_key)
+                batch.append((cache_key, item))
+            return batch
+
+    def _process(self, batch):
+        try:
+            items = [{"app": i["app"], "title": i["title"], "url": i["url"]} for _, i in batch]
+            try:
+                suggestions = list(self.batch_callback(items, timeout=self.timeout_seconds) or [])
+            except Exception as exc:
+                print(f"[AI queue] batch of {len(batch)} failed: {exc}")
+                suggestions = []
+
+            for idx, (cache_key, item) in enumerate(batch):
+                suggestion = suggestions[idx] if idx < len(suggestions) else None
+                try:
+                    category, productive = apply_ai_suggestion(
+                        item["app"], item["title"], item["url"], suggestion, fallback=item["provisional"]
+                    )
+                except Exception as exc:
+                    print(f"[AI queue] failed to store result for {cache_key}: {exc}")
+                    continue
+                for listener in self._listeners:
+                    try:
+                        listener(cache_key, category, productive)
+                    except Exception as exc:
+                        print(f"[AI queue] listener error: {exc}")
+        finally:
+            self._slots.release()
+            self._finish(batch)
+
+    def _finish(self, batch):
+        with self._cond:
+            for cache_key, _ in batch:
+                self._in_flight.discard(cache_key)
+            self._cond.notify_all()
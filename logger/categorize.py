@@ -1,13 +1,32 @@
+import copy
 import json
+import os
 import re
+import threading
 import time
 from pathlib import Path
 from urllib.parse import urlparse
 
+from logger.ai_cache import AIDecisionCache
+from logger.expiring_lru import ExpiringLRU
+from new_classifiers.compiled_rules import HotReloadingRules, build_indexes
+from new_classifiers.profiling import ClassificationProfile
+
 CONFIG_PATH = Path(__file__).resolve().parent.parent / "config" / "category_rules.json"
 KEYWORD_INDEX_PATH = Path(__file__).resolve().parent.parent / "config" / "keyword_index.json"
 KEYWORDS_PER_CATEGORY = 500
 KEYWORD_SESSION_RESET_SECONDS = 120
+KEYWORD_SESSION_MAX_CONTEXTS = 4096
+AI_FAILURE_TTL_SECONDS = 3600
+# Version of cached AI decisions. Decisions naming a category that no longer exists
+# are dropped on lookup (see _is_known_category); bump this only when a category
+# keeps its name but changes meaning (e.g. it is split).
+AI_CACHE_VERSION = "categories-v1"
+# Set by enable_profiling(); None keeps categorize() free of timing overhead.
+PROFILE = None
+
+# Guards keyword-index and rule writes, which may come from AI queue workers
+_WRITE_LOCK = threading.RLock()
 
 AMBIGUOUS_DOMAINS = {
     "www.google.com",
@@ -38,51 +57,85 @@ def _load_rules(rules_path=CONFIG_PATH):
     return json.loads(Path(rules_path).read_text())
 
 
-CATEGORY_RULES = _load_rules()
+# Module state below is initialized on first use (see _ensure_loaded), so importing
+# this module does no file I/O. Module attribute access (categorize.CATEGORY_RULES)
+# also triggers the load through __getattr__.
+_LAZY_STATE = (
+    "CATEGORY_RULES",
+    "APP_INDEX",
+    "DOMAIN_INDEX",
+    "KEYWORD_INDEX",
+    "KEYWORD_LOOKUP",
+)
+_INIT_LOCK = threading.Lock()
+_LOADED = False
+_HOT_RULES = None
+_COMPILED = None
+_KEYWORD_INDEX_STAMP = None
+
+
+def _ensure_loaded():
+    """
+    Load rules and the keyword index once, on first use. Thread-safe; cheap afterwards.
+    """
+    global _LOADED, _HOT_RULES, _COMPILED, CATEGORY_RULES, APP_INDEX, DOMAIN_INDEX
+    global KEYWORD_INDEX, KEYWORD_LOOKUP, _KEYWORD_INDEX_STAMP
+    if _LOADED:
+        return
+    with _INIT_LOCK:
+        if _LOADED:
+            return
+        # Compiled rules shared with new_classifiers (binary cache keyed by file hash);
+        # _refresh_rules() swaps them in when category_rules.json changes on disk.
+        _HOT_RULES = HotReloadingRules(CONFIG_PATH)
+        _COMPILED = _HOT_RULES.current()
+        CATEGORY_RULES = _COMPILED.rules
+        APP_INDEX, DOMAIN_INDEX = _COMPILED.app_index, _COMPILED.domain_index
+        KEYWORD_INDEX = _load_keyword_index()
+        KEYWORD_LOOKUP = _keyword_lookup_for(KEYWORD_INDEX, CATEGORY_RULES)
+        _KEYWORD_INDEX_STAMP = _keyword_index_stamp()
+        _LOADED = True
+
+
+def __getattr__(name):
+    if name in _LAZY_STATE:
+        _ensure_loaded()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _save_rules(rules, rules_path=CONFIG_PATH):
-    Path(rules_path).write_text(json.dumps(rules, indent=2))
+    _ensure_loaded()
+    # Replace the file in one step so hot reloaders never read a partial write.
+    rules_path = Path(rules_path)
+    tmp_path = rules_path.with_name(f"{rules_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(rules, indent=2))
+    os.replace(tmp_path, rules_path)
     global CATEGORY_RULES
     CATEGORY_RULES = rules
     _rebuild_indexes(rules)
+    if rules_path == _HOT_RULES.rules_path:
+        _apply_compiled(_HOT_RULES.reload())
 
 def _build_indexes(rules):
     """
     Precompute lookup maps for O(1) app and host matches, and small-per-host path checks.
     """
-    app_index = {}
-    domain_index = {}
-
-    for category, data in rules.items():
-        productive_flag = bool(data.get("productive", False))
-
-        for token in data.get("apps", []):
-            token = token.strip().lower()
-            if token:
-                app_index[token] = (category, productive_flag)
-
-        for token in data.get("domains", []):
-            token = token.strip().lower()
-            if not token:
-                continue
-            host, sep, path = token.partition("/")
-            host = host.strip()
-            if not host:
-                continue
-            path = path.strip()
-            if sep and path and not path.startswith("/"):
-                path = "/" + path
-            domain_index.setdefault(host, []).append((path, category, productive_flag))
-
-    # More specific paths first
-    for host, paths in domain_index.items():
-        domain_index[host] = sorted(paths, key=lambda p: len(p[0]), reverse=True)
-
-    return app_index, domain_index
-APP_INDEX, DOMAIN_INDEX = _build_indexes(CATEGORY_RULES)
-AI_CACHE = {}
-KEYWORD_AI_CACHE = {}
+    return build_indexes(rules)
+
+
+def _is_known_category(category):
+    """
+    Whether a cached AI decision still names a current category: one in the rules,
+    one the keyword index learned (AI answers for ambiguous hosts), or Unknown.
+    """
+    _ensure_loaded()
+    return category == "Unknown" or category in CATEGORY_RULES or category in KEYWORD_INDEX
+
+
+# Persistent (SQLite) caches, opened lazily on first lookup.
+AI_CACHE = AIDecisionCache(namespace="context", version=AI_CACHE_VERSION, is_valid=_is_known_category)
+KEYWORD_AI_CACHE = AIDecisionCache(namespace="keyword", version=AI_CACHE_VERSION, is_valid=_is_known_category)
 
 def _load_keyword_index(index_path=None):
     index_path = index_path or KEYWORD_INDEX_PATH
@@ -95,27 +148,43 @@ def _load_keyword_index(index_path=None):
 
 
 def _save_keyword_index(index, index_path=None):
+    _ensure_loaded()
     index_path = index_path or KEYWORD_INDEX_PATH
     Path(index_path).write_text(json.dumps(index, indent=2))
-    global KEYWORD_INDEX, KEYWORD_LOOKUP
+    global KEYWORD_INDEX, KEYWORD_LOOKUP, _KEYWORD_INDEX_STAMP
     KEYWORD_INDEX = index
     KEYWORD_LOOKUP = _build_keyword_lookup(index)
+    _KEYWORD_INDEX_STAMP = _keyword_index_stamp()
+
+
+def _keyword_index_stamp():
+    try:
+        st = Path(KEYWORD_INDEX_PATH).stat()
+    except OSError:
+        return (str(KEYWORD_INDEX_PATH), None)
+    return (str(KEYWORD_INDEX_PATH), st.st_mtime_ns, st.st_size)
 
 
 def _build_keyword_lookup(index):
+    _ensure_loaded()
+    return _keyword_lookup_for(index, CATEGORY_RULES)
+
+
+def _keyword_lookup_for(index, rules):
     lookup = {}
     for category, entries in index.items():
         for entry in entries:
             keyword = entry.get("keyword", "").strip().lower()
             if keyword and keyword not in lookup:
-                productive = CATEGORY_RULES.get(category, {}).get("productive", False)
+                productive = rules.get(category, {}).get("productive", False)
                 lookup[keyword] = (category, productive)
     return lookup
 
 
-KEYWORD_INDEX = _load_keyword_index()
-KEYWORD_LOOKUP = _build_keyword_lookup(KEYWORD_INDEX)
-KEYWORD_SESSION_STATE = {}
+# context_key -> last counted keyword; entries expire after the session reset window
+KEYWORD_SESSION_STATE = ExpiringLRU(
+    ttl_seconds=KEYWORD_SESSION_RESET_SECONDS, max_entries=KEYWORD_SESSION_MAX_CONTEXTS
+)
 
 
 def _rebuild_indexes(rules):
@@ -123,22 +192,46 @@ def _rebuild_indexes(rules):
     APP_INDEX, DOMAIN_INDEX = _build_indexes(rules)
 
 
+def _apply_compiled(compiled):
+    global _COMPILED, CATEGORY_RULES, APP_INDEX, DOMAIN_INDEX, KEYWORD_LOOKUP
+    with _WRITE_LOCK:
+        _COMPILED = compiled
+        CATEGORY_RULES = compiled.rules
+        APP_INDEX, DOMAIN_INDEX = compiled.app_index, compiled.domain_index
+        KEYWORD_LOOKUP = _build_keyword_lookup(KEYWORD_INDEX)
+
+
+def _refresh_rules():
+    """
+    Pick up edits made to category_rules.json or keyword_index.json by other
+    processes (or by hand) without restarting.
+    """
+    global KEYWORD_INDEX, KEYWORD_LOOKUP, _KEYWORD_INDEX_STAMP
+    _ensure_loaded()
+    compiled = _HOT_RULES.current()
+    if compiled is not _COMPILED:
+        _apply_compiled(compiled)
+
+    stamp = _keyword_index_stamp()
+    if stamp != _KEYWORD_INDEX_STAMP:
+        with _WRITE_LOCK:
+            KEYWORD_INDEX = _load_keyword_index()
+            KEYWORD_LOOKUP = _build_keyword_lookup(KEYWORD_INDEX)
+            _KEYWORD_INDEX_STAMP = stamp
+
+
 def _record_keyword_session_hit(context_key, category, keyword):
     """
     Increment keyword count once per session (context + keyword). Resets after timeout or change.
     """
     if not context_key or not keyword:
         return
-    now = time.time()
-    prev = KEYWORD_SESSION_STATE.get(context_key)
-    if prev:
-        prev_keyword = prev.get("keyword")
-        last_seen = prev.get("ts", 0)
-        if prev_keyword == keyword and (now - last_seen) < KEYWORD_SESSION_RESET_SECONDS:
-            KEYWORD_SESSION_STATE[context_key]["ts"] = now
-            return
-    _increment_keyword_count(category, keyword)
-    KEYWORD_SESSION_STATE[context_key] = {"keyword": keyword, "ts": now}
+    _ensure_loaded()
+    # Entries older than KEYWORD_SESSION_RESET_SECONDS have already expired here
+    prev_keyword = KEYWORD_SESSION_STATE.get(context_key)
+    if prev_keyword != keyword:
+        _increment_keyword_count(category, keyword)
+    KEYWORD_SESSION_STATE.set(context_key, keyword)
 
 
 def _increment_keyword_count(category, keyword):
@@ -151,42 +244,78 @@ def _increment_keyword_count(category, keyword):
     if not keyword:
         return
 
-    entries = KEYWORD_INDEX.setdefault(category, [])
-    for idx, entry in enumerate(entries):
-        if entry.get("keyword") == keyword:
-            entry["count"] = entry.get("count", 0) + 1
-            _save_keyword_index(KEYWORD_INDEX)
-            return
-
-    if len(entries) < KEYWORDS_PER_CATEGORY:
-        entries.append({"keyword": keyword, "count": 1})
-        print(f'Adding {keyword} to keyword index...')
-    else:
-        min_idx = min(range(len(entries)), key=lambda i: (entries[i].get("count", 0), i))
-        print(f'Removing {entries[min_idx]} from keyword index, adding {keyword} to index...')
-        entries[min_idx] = {"keyword": keyword, "count": 1}
-    _save_keyword_index(KEYWORD_INDEX)
+    _ensure_loaded()
+    with _WRITE_LOCK:
+        entries = KEYWORD_INDEX.setdefault(category, [])
+        for idx, entry in enumerate(entries):
+            if entry.get("keyword") == keyword:
+                entry["count"] = entry.get("count", 0) + 1
+                _save_keyword_index(KEYWORD_INDEX)
+                return
+
+        if len(entries) < KEYWORDS_PER_CATEGORY:
+            entries.append({"keyword": keyword, "count": 1})
+            print(f'Adding {keyword} to keyword index...')
+        else:
+            min_idx = min(range(len(entries)), key=lambda i: (entries[i].get("count", 0), i))
+            print(f'Removing {entries[min_idx]} from keyword index, adding {keyword} to index...')
+            entries[min_idx] = {"keyword": keyword, "count": 1}
+        _save_keyword_index(KEYWORD_INDEX)
 
 
 def _match_keyword_index(normalized_title, context_key=None):
+    """Return (category, productive, keyword) for the first indexed keyword in the title."""
+    _ensure_loaded()
     for keyword in _extract_keyword_candidates(normalized_title):
         keyword_lower = keyword.lower()
         if keyword_lower in KEYWORD_LOOKUP:
             category, productive_flag = KEYWORD_LOOKUP[keyword_lower]
             _record_keyword_session_hit(context_key, category, keyword_lower)
-            return category, productive_flag
+            return category, productive_flag, keyword_lower
     return None
 
 
+def enable_profiling(profile=None):
+    """
+    Start counting rule hits, unmatched apps/hosts and latency for categorize().
+    Returns the ClassificationProfile; call .dump() / .reset() on it.
+    """
+    global PROFILE
+    PROFILE = profile or ClassificationProfile()
+    return PROFILE
+
+
+def disable_profiling():
+    global PROFILE
+    PROFILE = None
+
+
 def categorize(app, title, url, context_key=None):
     """
     Rule-based classifier. Categories are deterministic; each has a boolean productive flag.
 
     Matching priority per category (in file order):
     1) app tokens
-    2) domain/path tokens (host + path without query/fragment)
-    3) keyword index (ambiguous hosts or unknowns)
+    2) url_globs / url_regexes, then title_globs / title_regexes
+    3) domain/path tokens (host + path without query/fragment)
+    4) keyword index (ambiguous hosts or unknowns)
     """
+    profile = PROFILE
+    if profile is None:
+        category, productive_flag, _ = _categorize(app, title, url, context_key)
+        return category, productive_flag
+
+    started = time.perf_counter()
+    category, productive_flag, rule_id = _categorize(app, title, url, context_key)
+    elapsed = time.perf_counter() - started
+    host_lower = (urlparse(url or "").hostname or "").lower()
+    profile.record(rule_id, (app or "").lower(), host_lower, elapsed)
+    return category, productive_flag
+
+
+def _categorize(app, title, url, context_key=None):
+    """categorize() plus the id of the matching rule (None when nothing matched)."""
+    _refresh_rules()
     normalized_app = (app or "").lower()
     normalized_title = (title or "").lower()
     parsed = urlparse(url or "")
@@ -194,42 +323,58 @@ def categorize(app, title, url, context_key=None):
     path_lower = (parsed.path or "").lower()
 
     if normalized_app == "idle" or normalized_title == "idle":
-        return "Idle", False
+        return "Idle", False, "idle"
 
     # App match (exact token)
     if normalized_app in APP_INDEX:
-        return APP_INDEX[normalized_app]
+        category, productive_flag = APP_INDEX[normalized_app]
+        return category, productive_flag, f"app:{normalized_app}"
+
+    # Title/URL glob and regex patterns (one automaton pass per field)
+    compiled = _COMPILED
+    if url and compiled.url_patterns is not None:
+        url_match = compiled.url_patterns.match(url.strip())
+        if url_match:
+            return url_match
+    if title and compiled.title_patterns is not None:
+        title_match = compiled.title_patterns.match(title.strip())
+        if title_match:
+            return title_match
 
     # Domain + optional path prefix match
     domain_match = _match_domain(host_lower, path_lower)
     if domain_match:
-        category, productive_flag = domain_match
+        category, productive_flag, path_prefix = domain_match
         if host_lower in AMBIGUOUS_DOMAINS:
             keyword_match = _match_keyword_index(normalized_title, context_key=context_key)
             if keyword_match:
-                return keyword_match
-        return category, productive_flag
+                category, productive_flag, keyword = keyword_match
+                return category, productive_flag, f"keyword:{keyword}"
+        return category, productive_flag, f"domain:{host_lower}{path_prefix}"
 
     # keyword match
     keyword_match = _match_keyword_index(normalized_title, context_key=context_key)
     if keyword_match:
-        return keyword_match
+        category, productive_flag, keyword = keyword_match
+        return category, productive_flag, f"keyword:{keyword}"
 
-    return "Unknown", False
+    return "Unknown", False, None
 
 
 def _match_domain(host_lower, path_lower):
     """
     Match exact host and most specific path prefix (if provided in rules).
+    Returns (category, productive, path_prefix).
     """
     if not host_lower:
         return None
+    _ensure_loaded()
     for path_prefix, category, productive_flag in DOMAIN_INDEX.get(host_lower, []):
         if path_prefix:
             if path_lower.startswith(path_prefix):
-                return category, productive_flag
+                return category, productive_flag, path_prefix
         else:
-            return category, productive_flag
+            return category, productive_flag, path_prefix
     return None
 
 
@@ -287,40 +432,49 @@ def _ai_cache_key(app, host_lower, title):
 
 def _add_rule_from_ai(category, productive, app, title, url):
     """
-    Update category_rules.json in-place with the AI result.
+    Update category_rules.json with the AI result.
 
     - Browser/URL: add domain rule (skip ambiguous hosts to avoid over-broad rules).
     - Non-browser app: add app rule.
-    """
-    global CATEGORY_RULES
-    rules = CATEGORY_RULES
-    cat_rules = rules.setdefault(
-        category, {"apps": [], "domains": [], "productive": bool(productive)}
-    )
-    cat_rules.setdefault("apps", [])
-    cat_rules.setdefault("domains", [])
-    if "productive" not in cat_rules:
-        cat_rules["productive"] = bool(productive)
 
-    parsed = urlparse(url or "")
-    host_lower = (parsed.hostname or "").lower()
-    app_norm = (app or "").lower()
-
-    if (app_norm in BROWSER_APPS or not app_norm) and host_lower:
-        if host_lower not in AMBIGUOUS_DOMAINS:
-            existing_domains = [d.lower() for d in cat_rules.get("domains", [])]
-            if host_lower not in existing_domains:
-                cat_rules["domains"].append(host_lower)
-                print(f'saving {host_lower} to {category}...')
-    elif app_norm and app_norm not in BROWSER_APPS:
+    The current rules belong to a compiled snapshot other threads are reading, so
+    the change is made on a copy; _save_rules writes it and swaps in the new snapshot.
+    """
+    _ensure_loaded()
+    with _WRITE_LOCK:
+        rules = copy.deepcopy(CATEGORY_RULES)
+        changed = category not in rules
+        cat_rules = rules.setdefault(
+            category, {"apps": [], "domains": [], "productive": bool(productive)}
+        )
+        cat_rules.setdefault("apps", [])
+        cat_rules.setdefault("domains", [])
+        if "productive" not in cat_rules:
+            cat_rules["productive"] = bool(productive)
+            changed = True
+
+        parsed = urlparse(url or "")
+        host_lower = (parsed.hostname or "").lower()
+        app_norm = (app or "").lower()
+
+        if (app_norm in BROWSER_APPS or not app_norm) and host_lower:
+            if host_lower not in AMBIGUOUS_DOMAINS:
+                existing_domains = [d.lower() for d in cat_rules.get("domains", [])]
+                if host_lower not in existing_domains:
+                    cat_rules["domains"].append(host_lower)
+                    changed = True
+                    print(f'saving {host_lower} to {category}...')
+        elif app_norm and app_norm not in BROWSER_APPS:
             existing_apps = [a.lower() for a in cat_rules.get("apps", [])]
             if app_norm not in existing_apps:
                 cat_rules["apps"].append(app_norm)
+                changed = True
                 print(f'saving {app_norm} to {category}...')
-    _save_rules(rules)
+        if changed:
+            _save_rules(rules, _HOT_RULES.rules_path)
 
 
-def categorize_with_ai(app, title, url, ai_callback=None):
+def categorize_with_ai(app, title, url, ai_callback=None, ai_queue=None, local_model=None):
     """
     Rule-based categorization with optional AI fallback.
 
@@ -328,8 +482,14 @@ def categorize_with_ai(app, title, url, ai_callback=None):
     {"category": "X", "productive": True/False, "confidence": 0.8, "rationale": "..."}
 
     Example: from logger.ai_callback import openai_categorize; pass ai_callback=openai_categorize
+
+    With ai_queue (an AIClassificationQueue), the AI is never called inline: the context
+    is queued and the rule result is returned as a provisional label.
+
+    local_model (e.g. new_classifiers.naive_bayes.NaiveBayesClassifier) runs after the
+    rules and before the AI; its answer is used when confidence >= local_model.min_confidence.
     """
-    global KEYWORD_LOOKUP
+    _ensure_loaded()
     parsed = urlparse(url or "")
     host_lower = (parsed.hostname or "").lower()
     cache_key = _ai_cache_key(app, host_lower, title)
@@ -352,38 +512,74 @@ def categorize_with_ai(app, title, url, ai_callback=None):
             cat, prod = KEYWORD_LOOKUP[cand_lower]
             _record_keyword_session_hit(cache_key, cat, cand_lower)
             return cat, prod
-        if cand_lower in KEYWORD_AI_CACHE:
-            cat, prod = KEYWORD_AI_CACHE[cand_lower]
+        cached = KEYWORD_AI_CACHE.get(cand_lower)
+        if cached is not None:
+            cat, prod = cached
             _record_keyword_session_hit(cache_key, cat, cand_lower)
             return cat, prod
 
     if keyword_lower is None:
         return category, productive
 
+    # A previous AI decision for this context (possibly from an earlier run)
+    cached = AI_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if local_model is not None:
+        model_category, model_productive, confidence = local_model.predict(app, title, url)
+        if confidence >= local_model.min_confidence:
+            return model_category, model_productive
+
+    if ai_queue is not None:
+        ai_queue.submit(app, title, url, provisional=(category, productive))
+        return category, productive
+
     if ai_callback is None:
         return category, productive
 
     try:
         suggestion = ai_callback(app=app, title=title, url=url) or {}
     except Exception:
-        AI_CACHE[cache_key] = (category, productive)
-        return category, productive
+        suggestion = None
+    return apply_ai_suggestion(app, title, url, suggestion, fallback=(category, productive))
+
+
+def apply_ai_suggestion(app, title, url, suggestion, fallback=("Unknown", False)):
+    """
+    Write an AI suggestion back into the caches, keyword index and rules.
+
+    suggestion=None records a failed call (cached briefly so it is retried later).
+    Returns the resulting (category, productive). Safe to call from worker threads.
+    """
+    global KEYWORD_LOOKUP
+    _ensure_loaded()
+    parsed = urlparse(url or "")
+    host_lower = (parsed.hostname or "").lower()
+    cache_key = _ai_cache_key(app, host_lower, title)
+    keyword_candidates = _extract_keyword_candidates(title)
+    keyword_lower = keyword_candidates[0].lower() if keyword_candidates else None
+
+    if suggestion is None:
+        # Retry transient failures sooner than regular decisions expire
+        AI_CACHE.set(cache_key, fallback, ttl_seconds=AI_FAILURE_TTL_SECONDS)
+        return fallback
 
     suggested_category = suggestion.get("category", "Unknown")
     suggested_productive = bool(suggestion.get("productive", False))
 
     if suggested_category != "Unknown":
-        KEYWORD_AI_CACHE[keyword_lower] = (suggested_category, suggested_productive)
-        _increment_keyword_count(suggested_category, keyword_lower)
-        KEYWORD_LOOKUP = _build_keyword_lookup(KEYWORD_INDEX)
-        _record_keyword_session_hit(cache_key, suggested_category, keyword_lower)
-        if host_lower not in AMBIGUOUS_DOMAINS:
-            _add_rule_from_ai(suggested_category, suggested_productive, app, title, url)
+        with _WRITE_LOCK:
+            if keyword_lower:
+                KEYWORD_AI_CACHE[keyword_lower] = (suggested_category, suggested_productive)
+                _increment_keyword_count(suggested_category, keyword_lower)
+                KEYWORD_LOOKUP = _build_keyword_lookup(KEYWORD_INDEX)
+                _record_keyword_session_hit(cache_key, suggested_category, keyword_lower)
+            if host_lower not in AMBIGUOUS_DOMAINS:
+                _add_rule_from_ai(suggested_category, suggested_productive, app, title, url)
         AI_CACHE[cache_key] = (suggested_category, suggested_productive)
         return suggested_category, suggested_productive
 
-    AI_CACHE[cache_key] = (category, productive)
-    return category, productive
-
+    AI_CACHE[cache_key] = fallback
+    return fallback
 
-# TODO: can use a classification model for unknown front apps
@@ -0,0 +1,80 @@
+import time
+from collections import OrderedDict
+
+
+class ExpiringLRU:
+    """
+    Bounded mapping whose entries expire ttl_seconds after their last write.
+
+    Entries are kept in write order, so the oldest entry is always at the front:
+    expiry and size eviction only ever pop from the front, which keeps every
+    operation amortized O(1). Expired entries are purged as a side effect of
+    reads and writes, so the structure never holds stale keys for long.
+    """
+
+    def __init__(self, ttl_seconds, max_entries=4096, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (written_at, value)
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, key, default=None):
+        """Return the live value for key, or default if missing or expired."""
+        now = self._clock()
+        self._purge_expired(now)
+        item = self._entries.get(key)
+        if item is None:
+            return default
+        written_at, value = item
+        if now - written_at >= self.ttl_seconds:
+            del self._entries[key]
+            self.expired += 1
+            return default
+        return value
+
+    def set(self, key, value):
+        """Insert or refresh key; it becomes the most recent entry."""
+        now = self._clock()
+        self._entries.pop(key, None)
+        self._entries[key] = (now, value)
+        self._purge_expired(now)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def _purge_expired(self, now):
+        entries = self._entries
+        while entries:
+            written_at, _ = next(iter(entries.values()))
+            if now - written_at < self.ttl_seconds:
+                break
+            entries.popitem(last=False)
+            self.expired += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
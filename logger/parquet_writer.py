@@ -1,14 +1,18 @@
+import threading
+import time
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 from pathlib import Path
 from datetime import datetime
-from logger.categorize import categorize, categorize_with_ai
+from urllib.parse import urlparse
+from logger.categorize import categorize, categorize_with_ai, _ai_cache_key
 from logger.device import get_device_id
+from new_core.metrics import REGISTRY
 
-try:
-    from logger.ai_callback import openai_categorize
-except Exception:
+from logger.ai_callback import ai_available, openai_categorize
+
+if not ai_available():
     openai_categorize = None
 
 
@@ -24,6 +28,11 @@ def classify(app, title, url):
             print(f"[AI categorize fallback] {exc}")
     return categorize(app, title, url)
 
+FLUSH_SECONDS = REGISTRY.histogram("activity_logbuffer_flush_seconds", "LogBuffer.flush duration.")
+FLUSH_ERRORS = REGISTRY.counter("activity_logbuffer_flush_errors", "LogBuffer.flush calls that raised.")
+ROWS_WRITTEN = REGISTRY.counter("activity_logbuffer_sessions_written", "Sessions written to parquet by LogBuffer.flush.")
+BUFFERED_SAMPLES = REGISTRY.gauge("activity_logbuffer_buffered_samples", "Samples waiting in the LogBuffer.")
+
 class LogBuffer:
     def __init__(
         self,
@@ -49,6 +58,7 @@ class LogBuffer:
         self.active_category = None
         self.active_productive = None
         self.resume_gap_seconds = resume_gap_seconds
+        self._lock = threading.RLock()
 
         self._resume_from_last_row()
 
@@ -89,11 +99,32 @@ class LogBuffer:
             print(f"Resumed active session: {self.active_app} ({self.active_title}) at {self.active_start}")
 
     def add(self, row: dict):
-        self.buffer.append(row)
-        now = datetime.now()
+        # Same lock as apply_ai_label, which edits buffered entries from the AI worker.
+        with self._lock:
+            self.buffer.append(row)
+            now = datetime.now()
 
-        if len(self.buffer) >= self.max_rows or (now - self.last_flush).total_seconds() >= self.flush_interval:
-            self.flush()
+            if len(self.buffer) >= self.max_rows or (now - self.last_flush).total_seconds() >= self.flush_interval:
+                self.flush()
+
+    def apply_ai_label(self, cache_key, category, productive):
+        """
+        Replace provisional labels once an asynchronous AI result arrives
+        (AIClassificationQueue listener). Updates buffered samples and the open
+        session whose AI cache key matches; already-written parquet rows are left as-is.
+        """
+        def matches(app, title, url):
+            host_lower = (urlparse(url or "").hostname or "").lower()
+            return _ai_cache_key(app, host_lower, title) == cache_key
+
+        with self._lock:
+            for entry in self.buffer:
+                if matches(entry.get("app"), entry.get("title"), entry.get("url")):
+                    entry["category"] = category
+                    entry["is_productive"] = productive
+            if self.active_app is not None and matches(self.active_app, self.active_title, self.active_url):
+                self.active_category = category
+                self.active_productive = productive
 
     def _buffer_to_sessions(self, close_active=False):
         """
@@ -101,6 +132,10 @@ class LogBuffer:
         start_time, end_time, duration_sec, app, title, category, is_productive
         using categorize(app, title).
         """
+        with self._lock:
+            return self._buffer_to_sessions_locked(close_active=close_active)
+
+    def _buffer_to_sessions_locked(self, close_active=False):
         sessions = []
 
         # bring in ongoing session info across flushes
@@ -188,8 +223,25 @@ class LogBuffer:
         return sessions
     
     def flush(self, force=False):
+        started = time.perf_counter()
+        # Held from snapshot to clear, so an AI label cannot land on an entry that
+        # was just written or race an append.
+        with self._lock:
+            try:
+                written = self._flush(force)
+            except Exception:
+                FLUSH_ERRORS.inc()
+                raise
+            finally:
+                BUFFERED_SAMPLES.set(len(self.buffer))
+        if written is not None:
+            FLUSH_SECONDS.observe(time.perf_counter() - started)
+            ROWS_WRITTEN.inc(written)
+
+    def _flush(self, force):
+        """Write closed sessions; return how many, or None when there was nothing to do."""
         if not self.buffer and not (force and self.active_app):
-            return
+            return None
 
         # 1. convert snapshots -> finished sessions (except the still-active last one)
         session_rows = self._buffer_to_sessions(close_active=force)
@@ -199,7 +251,7 @@ class LogBuffer:
             # so just update timestamps and bail.
             self.last_flush = datetime.now()
             self.buffer.clear()
-            return
+            return 0
 
         # 2. create DataFrame of finalized sessions
         df = pd.DataFrame(session_rows).reindex(
@@ -275,7 +327,7 @@ class LogBuffer:
                             self.sync_client.upload_file(file_path)
                         except Exception as exc:
                             print(f"[Drive Sync] Upload failed for {file_path.name}: {exc}")
-                    return
+                    return len(session_rows)
 
                 df = df[[c for c in target_cols if c in df.columns]]
             except Exception as e:
@@ -307,3 +359,4 @@ class LogBuffer:
                 self.sync_client.upload_file(file_path)
             except Exception as exc:
                 print(f"[Drive Sync] Upload failed for {file_path.name}: {exc}")
+        return len(session_rows)
@@ -1,29 +1,44 @@
+import os
 import time
 import datetime
 import subprocess
 from pathlib import Path
 
 from logger.core import get_active_window_info
-from logger.categorize import categorize, categorize_with_ai
+from logger.ai_queue import AIClassificationQueue
+from logger.categorize import categorize, categorize_with_ai, enable_profiling
 from logger.device import get_device_id
 from logger.idle import IdleMonitor
 from logger.parquet_writer import LogBuffer
+from new_classifiers.naive_bayes import NaiveBayesClassifier
+from new_logger.capture_metrics import CAPTURE_POLLS, CAPTURE_SAMPLE_SECONDS
+from new_publish.metrics_http import MetricsServer
 from sync import get_drive_sync_client
 
-try:
-    from logger.ai_callback import openai_categorize
-except Exception:
+from logger.ai_callback import ai_available, openai_categorize, openai_categorize_batch
+
+if not ai_available():
     openai_categorize = None
+    openai_categorize_batch = None
 
 
-def classify(app, title, url):
+def classify(app, title, url, ai_queue=None, local_model=None):
     """
     Categorize using AI callback if available; otherwise fall back to rules.
+    With ai_queue, unknown contexts get the rule label now and the AI label later.
+    A trained local_model is consulted before the AI.
     """
     url = url or ""
-    if openai_categorize:
+    if openai_categorize or local_model:
         try:
-            return categorize_with_ai(app, title, url, ai_callback=openai_categorize)
+            return categorize_with_ai(
+                app,
+                title,
+                url,
+                ai_callback=openai_categorize,
+                ai_queue=ai_queue,
+                local_model=local_model,
+            )
         except Exception as exc:
             print(f"[AI categorize fallback] {exc}")
     return categorize(app, title, url)
@@ -90,6 +105,26 @@ def run_logger(interval=10, flush_interval=60, max_rows=50):
         device_id=device_id,
         sync_client=drive_sync,
     )
+    local_model = NaiveBayesClassifier.load_default()
+    if local_model:
+        print(f"Local classifier loaded ({len(local_model.classes)} categories)")
+    ai_queue = None
+    if openai_categorize_batch:
+        ai_queue = AIClassificationQueue(openai_categorize_batch)
+        ai_queue.add_listener(buffer.apply_ai_label)
+        ai_queue.start()
+    # ACTIVITY_LOGGER_PROFILE=1 counts rule hits/misses and latency, dumped on exit.
+    profile = enable_profiling() if os.getenv("ACTIVITY_LOGGER_PROFILE") else None
+    # ACTIVITY_LOGGER_METRICS_PORT=9464 serves Prometheus metrics on 127.0.0.1.
+    metrics_server = None
+    if os.getenv("ACTIVITY_LOGGER_METRICS_PORT"):
+        metrics_server = MetricsServer(port=int(os.environ["ACTIVITY_LOGGER_METRICS_PORT"]))
+        metrics_server.start()
+        print(f"[metrics] serving {metrics_server.url}")
+    idle_polls = CAPTURE_POLLS.labels(source="legacy", state="idle")
+    empty_polls = CAPTURE_POLLS.labels(source="legacy", state="empty")
+    active_polls = CAPTURE_POLLS.labels(source="legacy", state="active")
+    sample_seconds = CAPTURE_SAMPLE_SECONDS.labels(source="legacy")
     idle_threshold = _resolve_idle_threshold(user_idle_seconds=600)  # TODO: make configurable
     idle_monitor = IdleMonitor(threshold_seconds=idle_threshold)
     idle_active = False
@@ -102,6 +137,7 @@ def run_logger(interval=10, flush_interval=60, max_rows=50):
             info = None
 
             if is_idle:
+                idle_polls.inc()
                 if not idle_active:
                     idle_active = True
                     cat, prod = classify("Idle", "Idle", "")
@@ -116,12 +152,17 @@ def run_logger(interval=10, flush_interval=60, max_rows=50):
             else:
                 if idle_active:
                     idle_active = False
+                sample_started = time.perf_counter()
                 info = get_active_window_info()
+                sample_seconds.observe(time.perf_counter() - sample_started)
+                (active_polls if info else empty_polls).inc()
                 if info:
                     cat, prod = classify(
                         info["app"],
                         info["title"],
                         info.get("url") or "",
+                        ai_queue=ai_queue,
+                        local_model=local_model,
                     )
                     info["category"] = cat
                     info["is_productive"] = prod
@@ -137,7 +178,14 @@ def run_logger(interval=10, flush_interval=60, max_rows=50):
     except KeyboardInterrupt:
         print("Activity logger stopping...")
     finally:
+        if ai_queue:
+            ai_queue.stop(drain=True, timeout=30)
         buffer.flush(force=True)
+        if metrics_server:
+            metrics_server.stop()
+        if profile:
+            profile.dump(log_dir / "categorize_profile.json")
+            print(f"[profile] rule statistics written to {log_dir / 'categorize_profile.json'}")
 
 if __name__ == "__main__":
     run_logger(1)
@@ -3,9 +3,16 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
+from logger.device import get_device_id
+from new_classifiers.cascade import CascadeClassifier, Stage
+from new_classifiers.naive_bayes import NaiveBayesClassifier
 from new_classifiers.rules import RulesClassifier
-from new_core.appservice import AppService
+from new_core.appservice import AppService, AppServiceConfig
+from new_logger.enrichment import EnrichedEventSource, default_pipeline
 from new_logger.macos.macos_front_app_source import MacOSFrontAppSourceAdaptive
+from new_publish.coalescing import CoalescingPublisher
+from new_publish.metrics_http import MetricsServer
+from new_publish.sse import SSEServer
 from new_storage.sqlite import SQLiteStorage
 
 
@@ -25,18 +32,81 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Record events without writing engine classifications.",
     )
+    parser.add_argument(
+        "--queued",
+        action="store_true",
+        help="Write and classify events on a worker thread instead of the capture thread.",
+    )
+    parser.add_argument(
+        "--queue-overflow",
+        choices=("block", "drop_newest", "drop_oldest"),
+        default="block",
+        help="What --queued does with new events when the queue is full.",
+    )
+    parser.add_argument(
+        "--commit-batch",
+        type=int,
+        default=1,
+        help="With --queued, write up to this many events per transaction (group commit).",
+    )
+    parser.add_argument(
+        "--sse-port",
+        type=int,
+        help="Stream batched change notifications as Server-Sent Events on 127.0.0.1:PORT/events.",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics.",
+    )
     return parser.parse_args()
 
 
+def build_classifier() -> RulesClassifier | CascadeClassifier:
+    """Rules alone, or rules then the local model when one has been trained."""
+    rules = RulesClassifier()
+    local_model = NaiveBayesClassifier.load_default()
+    if local_model is None:
+        return rules
+    return CascadeClassifier([Stage("rules", rules), Stage("local", local_model)])
+
+
 def main() -> None:
     args = parse_args()
 
-    source = MacOSFrontAppSourceAdaptive()
-    storage = SQLiteStorage(args.db)
-    classifier = None if args.no_classify else RulesClassifier()
-    service = AppService(source=source, storage=storage, classifier=classifier)
+    source = EnrichedEventSource(MacOSFrontAppSourceAdaptive(), default_pipeline(device=get_device_id()))
+    classifier = None if args.no_classify else build_classifier()
+    storage = SQLiteStorage(
+        args.db,
+        rollup_engine_version=None if classifier is None else classifier.engine_version,
+    )
+    publisher = None
+    sse_server = None
+    if args.sse_port is not None:
+        publisher = CoalescingPublisher(span_lookup=storage.event_spans)
+        sse_server = SSEServer(publisher, port=args.sse_port)
+    service = AppService(
+        source=source,
+        storage=storage,
+        classifier=classifier,
+        publisher=publisher,
+        context_store=storage,
+        config=AppServiceConfig(
+            ingest_mode="queued" if args.queued else "sync",
+            queue_overflow=args.queue_overflow,
+            commit_max_events=args.commit_batch if args.queued else 1,
+        ),
+    )
 
     print(f"New backend writing to {storage.db_path}")
+    if sse_server is not None:
+        sse_server.start()
+        print(f"Change notifications at {sse_server.url}")
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(port=args.metrics_port)
+        metrics_server.start()
+        print(f"Metrics at {metrics_server.url}")
     print("Press Ctrl+C to stop.")
 
     try:
@@ -45,6 +115,16 @@ def main() -> None:
         pass
     finally:
         service.stop()
+        if args.queued:
+            print(f"Ingestion queue: {service.queue_stats()}")
+        for name, stage in source.pipeline.stats().items():
+            print(f"Enrichment {name}: {stage.calls} calls, {stage.cache_hits} cached, {stage.mean_ms:.3f} ms/call")
+        if sse_server is not None:
+            sse_server.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if publisher is not None:
+            publisher.close()
         storage.close()
 
 
@@ -0,0 +1,272 @@
+"""Composite classifier that chains stages from cheap to expensive."""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from new_core.memo import memo_version
+from new_core.models import Classification, Event
+from new_core.ports import Classifier
+
+
+LateListener = Callable[[Event, Optional[Classification]], None]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One classifier in a cascade.
+
+    A result is accepted when it is not ``Unknown`` and its confidence is at
+    least ``min_confidence``. Stages without ``budget_seconds`` run inline.
+    Stages with a budget run on a worker thread; if they have not answered
+    within the budget, the cascade moves on and the stage finishes on the
+    async completion path. ``timeout_seconds`` (measured from submission) is
+    enforced by a timer: a stage still running then is given up as unsure and
+    its result discarded. Python cannot interrupt the worker thread, so a
+    stage that hangs keeps its thread; set ``timeout_seconds`` on any stage
+    that can hang so its events still resolve.
+    """
+
+    name: str
+    classifier: Classifier
+    min_confidence: float = 0.0
+    budget_seconds: Optional[float] = None
+    timeout_seconds: Optional[float] = None
+
+
+class CallbackClassifier:
+    """
+    Adapts a ``callback(app, title, url)`` returning a suggestion dict
+    (``category``, ``productive``, ``confidence``), such as
+    ``logger.ai_callback.openai_categorize``, to the Classifier protocol.
+    Callbacks answer ``Unknown`` when they fail, so the adapter is ``fallible``.
+    """
+
+    fallible = True
+
+    def __init__(self, engine_version: str, callback: Callable[[str, str, str], dict[str, Any]]) -> None:
+        self.engine_version = engine_version
+        self._callback = callback
+
+    def classify(self, e: Event) -> Classification:
+        suggestion = self._callback(e.app, e.title, e.url) or {}
+        confidence = suggestion.get("confidence")
+        return Classification(
+            category_id=suggestion.get("category") or "Unknown",
+            confidence=float(confidence) if confidence is not None else 1.0,
+            rule_id=self.engine_version,
+            meta={"productive": bool(suggestion.get("productive", False))},
+        )
+
+
+class _Deferred:
+    """Bookkeeping for one event whose over-budget stages are still running."""
+
+    def __init__(self, event: Event, trail: list[dict[str, Any]]) -> None:
+        self.event = event
+        self.trail = trail
+        self.lock = threading.Lock()
+        # Deferred stages not yet settled, with their timeout timers.
+        self.open: dict[Future, Optional[threading.Timer]] = {}
+        self.resolved = False
+        self.returned = False  # classify() has handed out a provisional result
+        self.early: Optional[Classification] = None  # accepted before classify() returned
+
+
+class CascadeClassifier:
+    """
+    Run stages in order and return the first confident result.
+
+    ``Classification.meta`` keeps the accepted classifier's meta plus:
+    - ``stage``: name of the stage that produced the result (absent if none did);
+    - ``cascade``: one ``{"stage", "status", "seconds"}`` entry per stage tried,
+      with status ``accepted``, ``rejected``, ``error`` or ``deferred``;
+    - ``pending``: stages still running on the async path, when the returned
+      result is provisional.
+
+    When no stage accepts, the result is ``Unknown`` (keeping the first
+    non-error stage's meta such as ``productive``). Deferred stages report back
+    through listeners registered with ``add_late_listener``: each provisional
+    event gets exactly one call, with the accepted late Classification or
+    ``None`` if every deferred stage failed, timed out or was unsure.
+    """
+
+    def __init__(self, stages: Sequence[Stage], max_workers: int = 4) -> None:
+        if not stages:
+            raise ValueError("CascadeClassifier needs at least one stage")
+        self.stages = tuple(stages)
+        self.engine_version = "cascade[" + ">".join(s.classifier.engine_version for s in self.stages) + "]"
+        self._listeners: list[LateListener] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._max_workers = max_workers
+
+    @property
+    def cache_version(self) -> str:
+        return "cascade[" + ">".join(memo_version(s.classifier) for s in self.stages) + "]"
+
+    @property
+    def fallible(self) -> bool:
+        return any(getattr(s.classifier, "fallible", False) for s in self.stages)
+
+    def add_late_listener(self, listener: LateListener) -> None:
+        """Register ``listener(event, classification_or_none)`` for provisional results."""
+        self._listeners.append(listener)
+
+    def close(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    # -------- classification --------
+    def classify(self, e: Event) -> Classification:
+        trail: list[dict[str, Any]] = []
+        fallback: Optional[Classification] = None
+        deferred: Optional[_Deferred] = None
+
+        for stage in self.stages:
+            if deferred is not None:
+                with deferred.lock:
+                    if deferred.early is not None:
+                        deferred.resolved = True
+                        return deferred.early
+            started = time.perf_counter()
+            if stage.budget_seconds is None:
+                try:
+                    c = stage.classifier.classify(e)
+                except Exception:
+                    trail.append(_step(stage, "error", started))
+                    continue
+            else:
+                future = self._pool().submit(stage.classifier.classify, e)
+                try:
+                    c = future.result(timeout=stage.budget_seconds)
+                except FutureTimeout:
+                    trail.append(_step(stage, "deferred", started))
+                    if deferred is None:
+                        deferred = _Deferred(e, trail)
+                    self._defer(deferred, stage, future, started)
+                    continue
+                except Exception:
+                    trail.append(_step(stage, "error", started))
+                    continue
+
+            if _accepts(stage, c):
+                trail.append(_step(stage, "accepted", started))
+                if deferred is not None:
+                    with deferred.lock:
+                        deferred.resolved = True
+                return _with_trail(c, stage.name, trail)
+            trail.append(_step(stage, "rejected", started))
+            if fallback is None:
+                fallback = c
+
+        meta = dict((fallback.meta if fallback else None) or {"productive": False})
+        unknown = Classification(
+            category_id="Unknown",
+            confidence=fallback.confidence if fallback else 0.0,
+            rule_id=None,
+            meta=meta,
+        )
+        result = _with_trail(unknown, None, trail)
+        if deferred is not None:
+            with deferred.lock:
+                if deferred.early is not None:
+                    deferred.resolved = True
+                    return deferred.early
+                deferred.returned = True
+                if deferred.open:
+                    result.meta["pending"] = [step["stage"] for step in trail if step["status"] == "deferred"]
+                else:
+                    # Every deferred stage already finished without a confident answer.
+                    deferred.resolved = True
+        return result
+
+    # -------- async completion --------
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="cascade-stage"
+                )
+            return self._executor
+
+    def _defer(self, deferred: _Deferred, stage: Stage, future: Future, started: float) -> None:
+        timer: Optional[threading.Timer] = None
+        if stage.timeout_seconds is not None:
+            remaining = max(0.0, stage.timeout_seconds - (time.perf_counter() - started))
+            timer = threading.Timer(remaining, self._late_expired, (deferred, stage, future, started))
+            timer.daemon = True
+        with deferred.lock:
+            deferred.open[future] = timer
+        if timer is not None:
+            timer.start()
+        future.add_done_callback(lambda f: self._late_done(deferred, stage, f, started))
+
+    def _late_expired(self, deferred: _Deferred, stage: Stage, future: Future, started: float) -> None:
+        self._late_done(deferred, stage, future, started, expired=True)
+        future.cancel()  # frees the pool slot if the stage never started
+
+    def _late_done(
+        self, deferred: _Deferred, stage: Stage, future: Future, started: float, expired: bool = False
+    ) -> None:
+        elapsed = time.perf_counter() - started
+        c: Optional[Classification] = None
+        if not expired and (stage.timeout_seconds is None or elapsed <= stage.timeout_seconds):
+            try:
+                c = future.result()
+            except Exception:
+                c = None
+
+        with deferred.lock:
+            if future not in deferred.open:
+                return  # already settled by the other of completion and timeout
+            timer = deferred.open.pop(future)
+            if timer is not None and not expired:
+                timer.cancel()
+            if deferred.resolved:
+                return
+            if c is not None and _accepts(stage, c):
+                trail = [dict(step) for step in deferred.trail] + [
+                    {"stage": stage.name, "status": "accepted", "seconds": round(elapsed, 6)}
+                ]
+                outcome: Optional[Classification] = _with_trail(c, stage.name, trail)
+                if not deferred.returned:
+                    # classify() is still running and will return this directly.
+                    if deferred.early is None:
+                        deferred.early = outcome
+                    return
+                deferred.resolved = True
+            elif not deferred.open and deferred.returned:
+                deferred.resolved = True
+                outcome = None
+            else:
+                return
+
+        for listener in self._listeners:
+            try:
+                listener(deferred.event, outcome)
+            except Exception as exc:
+                print(f"[cascade] late listener error: {exc}")
+
+
+def _accepts(stage: Stage, c: Classification) -> bool:
+    return c.category_id != "Unknown" and c.confidence >= stage.min_confidence
+
+
+def _step(stage: Stage, status: str, started: float) -> dict[str, Any]:
+    return {"stage": stage.name, "status": status, "seconds": round(time.perf_counter() - started, 6)}
+
+
+def _with_trail(c: Classification, stage_name: Optional[str], trail: list[dict[str, Any]]) -> Classification:
+    meta = dict(c.meta or {})
+    meta["cascade"] = [dict(step) for step in trail]
+    if stage_name is not None:
+        meta["stage"] = stage_name
+    return Classification(category_id=c.category_id, confidence=c.confidence, rule_id=c.rule_id, meta=meta)
@@ -0,0 +1,245 @@
+"""Compiled, hot-reloadable category rules shared by the rules classifiers."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from new_classifiers.patterns import PatternSet
+
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "category_rules.json"
+# ACTIVITY_RULES_CACHE_DIR moves the cache (the test suites point it at a temp dir).
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("ACTIVITY_RULES_CACHE_DIR") or Path(__file__).resolve().parent.parent / "data" / "cache"
+)
+
+# Bump when the compiled layout changes so stale cache files are ignored.
+COMPILED_FORMAT = 2
+
+AppIndex = dict[str, tuple[str, bool]]
+DomainIndex = dict[str, list[tuple[str, str, bool]]]
+
+# Rule keys holding glob/regex patterns, per matched field: (rules key, pattern kind).
+PATTERN_KEYS = {
+    "title": (("title_globs", "glob"), ("title_regexes", "regex")),
+    "url": (("url_globs", "glob"), ("url_regexes", "regex")),
+}
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """
+    Immutable snapshot of a rules file and the indexes derived from it.
+
+    ``source_hash`` is the SHA-256 prefix of the raw file bytes; it keys the
+    on-disk cache and identifies the snapshot for reload checks. The pattern
+    sets are ``None`` when no category defines title or URL patterns; their
+    payloads are ``(category_id, productive, rule_id)``.
+    """
+
+    source_hash: str
+    rules: dict[str, dict[str, Any]]
+    app_index: AppIndex
+    domain_index: DomainIndex
+    title_patterns: Optional[PatternSet] = None
+    url_patterns: Optional[PatternSet] = None
+
+
+def build_indexes(rules: dict[str, dict[str, Any]]) -> tuple[AppIndex, DomainIndex]:
+    """
+    Convert raw rules into application and domain lookup indexes.
+
+    Returns a pair containing:
+    - an app-name mapping to ``(category_id, productive)``;
+    - a hostname mapping to path-specific
+      ``(path_prefix, category_id, productive)`` entries.
+
+    Domain entries are ordered from longest to shortest path prefix so the
+    most specific matching rule wins.
+    """
+    app_index: AppIndex = {}
+    domain_index: DomainIndex = {}
+
+    for category_id, data in rules.items():
+        productive = bool(data.get("productive", False))
+
+        for app_token in data.get("apps", []):
+            normalized = str(app_token).strip().lower()
+            if normalized:
+                app_index[normalized] = (category_id, productive)
+
+        for domain_token in data.get("domains", []):
+            token = str(domain_token).strip().lower()
+            if not token:
+                continue
+
+            host, separator, path = token.partition("/")
+            host = host.strip()
+            if not host:
+                continue
+
+            path_prefix = path.strip()
+            if separator and path_prefix and not path_prefix.startswith("/"):
+                path_prefix = "/" + path_prefix
+
+            domain_index.setdefault(host, []).append((path_prefix, category_id, productive))
+
+    for host, entries in domain_index.items():
+        domain_index[host] = sorted(entries, key=lambda item: len(item[0]), reverse=True)
+
+    return app_index, domain_index
+
+
+def build_pattern_sets(rules: dict[str, dict[str, Any]]) -> tuple[Optional[PatternSet], Optional[PatternSet]]:
+    """
+    Compile the title and URL glob/regex rules into one ``PatternSet`` per field.
+
+    Patterns keep file order (category order, then list order), so the first
+    listed pattern wins when several match. Rule ids look like
+    ``title-regex:<pattern>`` or ``url-glob:<pattern>``.
+    """
+    sets: dict[str, Optional[PatternSet]] = {}
+    for field, keys in PATTERN_KEYS.items():
+        entries = []
+        for category_id, data in rules.items():
+            productive = bool(data.get("productive", False))
+            for key, kind in keys:
+                for pattern in data.get(key, []):
+                    pattern = str(pattern).strip()
+                    if pattern:
+                        rule_id = f"{field}-{kind}:{pattern}"
+                        entries.append((kind, pattern, (category_id, productive, rule_id)))
+        sets[field] = PatternSet(entries) if entries else None
+    return sets["title"], sets["url"]
+
+
+def compile_rules(
+    rules_path: str | Path = DEFAULT_RULES_PATH,
+    cache_dir: Optional[str | Path] = DEFAULT_CACHE_DIR,
+) -> CompiledRules:
+    """
+    Return the compiled form of ``rules_path``.
+
+    The raw bytes are hashed; when ``cache_dir`` holds a pickle for that hash it
+    is loaded directly, skipping JSON parsing and index building. Otherwise the
+    rules are compiled and the pickle is written atomically (older pickles for
+    the same rules file are removed). Cache files are named after the rules
+    file's stem and a hash of its resolved path, so two rules files with the
+    same name don't evict each other. Pass ``cache_dir=None`` to disable caching.
+    """
+    rules_path = Path(rules_path)
+    raw = rules_path.read_bytes()
+    source_hash = hashlib.sha256(raw).hexdigest()[:16]
+
+    cache_file = None
+    if cache_dir is not None:
+        path_hash = hashlib.sha256(str(rules_path.resolve()).encode("utf-8")).hexdigest()[:8]
+        cache_file = Path(cache_dir) / f"{rules_path.stem}-{path_hash}-v{COMPILED_FORMAT}-{source_hash}.pickle"
+        compiled = _read_cache(cache_file, source_hash)
+        if compiled is not None:
+            return compiled
+
+    rules = json.loads(raw.decode("utf-8"))
+    app_index, domain_index = build_indexes(rules)
+    title_patterns, url_patterns = build_pattern_sets(rules)
+    compiled = CompiledRules(
+        source_hash=source_hash,
+        rules=rules,
+        app_index=app_index,
+        domain_index=domain_index,
+        title_patterns=title_patterns,
+        url_patterns=url_patterns,
+    )
+
+    if cache_file is not None:
+        _write_cache(cache_file, compiled)
+    return compiled
+
+
+def _read_cache(cache_file: Path, source_hash: str) -> Optional[CompiledRules]:
+    try:
+        with cache_file.open("rb") as fh:
+            compiled = pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(compiled, CompiledRules) or compiled.source_hash != source_hash:
+        return None
+    return compiled
+
+
+def _write_cache(cache_file: Path, compiled: CompiledRules) -> None:
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        with tmp_file.open("wb") as fh:
+            pickle.dump(compiled, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+        prefix = cache_file.name.rsplit("-", 1)[0] + "-"
+        for stale in cache_file.parent.glob(f"{prefix}*.pickle"):
+            if stale != cache_file:
+                stale.unlink(missing_ok=True)
+    except OSError:
+        # The cache is an optimization only.
+        pass
+
+
+class HotReloadingRules:
+    """
+    Holds the current ``CompiledRules`` for a file and swaps it when the file changes.
+
+    ``current()`` stats the file at most once per ``check_interval`` seconds; when
+    its mtime or size moved, the file is recompiled and the snapshot reference is
+    replaced in one assignment, so readers always see a complete, consistent set of
+    indexes. A file that fails to parse keeps the previous snapshot in place.
+    """
+
+    def __init__(
+        self,
+        rules_path: str | Path = DEFAULT_RULES_PATH,
+        cache_dir: Optional[str | Path] = DEFAULT_CACHE_DIR,
+        check_interval: float = 1.0,
+    ) -> None:
+        self.rules_path = Path(rules_path)
+        self.cache_dir = cache_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp = self._stat()
+        self._compiled = compile_rules(self.rules_path, cache_dir)
+        self._last_check = time.monotonic()
+
+    def current(self) -> CompiledRules:
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._stat() != self._stamp:
+                self.reload()
+        return self._compiled
+
+    def reload(self) -> CompiledRules:
+        """Recompile now (e.g. right after this process wrote the file)."""
+        with self._lock:
+            stamp = self._stat()
+            try:
+                compiled = compile_rules(self.rules_path, self.cache_dir)
+            except (OSError, ValueError) as exc:
+                print(f"[rules] keeping previous rules; failed to load {self.rules_path}: {exc}")
+                self._stamp = stamp
+                return self._compiled
+            self._stamp = stamp
+            self._compiled = compiled
+            return compiled
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            st = self.rules_path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
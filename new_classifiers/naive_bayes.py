@@ -0,0 +1,346 @@
+"""Local multinomial naive Bayes classifier trained from labelled history."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+from urllib.parse import urlparse
+
+import numpy as np
+
+from new_core.models import Classification, Event
+from new_core.ports import Classifier
+
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parent.parent / "data" / "local_model.npz"
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "category_rules.json"
+DEFAULT_N_FEATURES = 1 << 16
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Labels that carry no information about what the user was doing.
+IGNORED_LABELS = frozenset({"Unknown", "Idle"})
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def context_tokens(app: str, title: str, url: str) -> list[str]:
+    """
+    Turn an (app, title, url) context into namespaced string features.
+
+    - ``a:<app>`` for the normalized app name;
+    - ``h:<host>`` for the hostname and each parent domain (``github.com``);
+    - ``p:<host>/<segment>`` for the first path segment;
+    - ``t:<word>`` for each title word of two or more characters.
+    """
+    tokens: list[str] = []
+    normalized_app = (app or "").strip().lower()
+    if normalized_app:
+        tokens.append(f"a:{normalized_app}")
+
+    parsed = urlparse(url or "")
+    host = (parsed.hostname or "").lower()
+    if host:
+        labels = host.split(".")
+        for start in range(0, max(1, len(labels) - 1)):
+            tokens.append("h:" + ".".join(labels[start:]))
+        segment = (parsed.path or "").strip("/").split("/", 1)[0].lower()
+        if segment:
+            tokens.append(f"p:{host}/{segment}")
+
+    for word in _WORD_RE.findall((title or "").lower()):
+        if len(word) >= 2:
+            tokens.append(f"t:{word}")
+    return tokens
+
+
+def hash_tokens(tokens: Iterable[str], n_features: int) -> np.ndarray:
+    """Map tokens to stable feature ids (CRC32, identical across processes)."""
+    return np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) % n_features for token in tokens),
+        dtype=np.int64,
+    )
+
+
+class NaiveBayesClassifier(Classifier):
+    """
+    Multinomial naive Bayes over hashed app, host and title tokens.
+
+    The model is a dense ``(n_classes, n_features)`` table of log-likelihoods plus
+    class log-priors, so prediction is one fancy-indexed sum over the event's
+    feature ids. Results below ``min_confidence`` are reported as Unknown so a
+    later stage (such as the AI fallback) can take over.
+    """
+
+    engine_version = "local-nb-v1"
+
+    def __init__(
+        self,
+        classes: Sequence[str],
+        productive: Sequence[bool],
+        feature_log_prob: np.ndarray,
+        class_log_prior: np.ndarray,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> None:
+        self.classes = list(classes)
+        self.productive = [bool(flag) for flag in productive]
+        self.feature_log_prob = np.asarray(feature_log_prob, dtype=np.float32)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float32)
+        self.min_confidence = min_confidence
+
+    @property
+    def n_features(self) -> int:
+        return int(self.feature_log_prob.shape[1])
+
+    # -------- training --------
+    @classmethod
+    def train(
+        cls,
+        samples: Iterable[tuple[str, str, str, str]],
+        productive_by_category: Optional[dict[str, bool]] = None,
+        n_features: int = DEFAULT_N_FEATURES,
+        alpha: float = 1.0,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> "NaiveBayesClassifier":
+        """
+        Fit the model from ``(app, title, url, category_id)`` samples.
+
+        Feature counts for every class are accumulated in a single ``bincount``
+        over flattened ``(class, feature)`` ids. Samples labelled Unknown or Idle
+        are skipped.
+        """
+        productive_by_category = productive_by_category or {}
+        class_ids: dict[str, int] = {}
+        doc_labels: list[int] = []
+        feature_chunks: list[np.ndarray] = []
+
+        for app, title, url, category_id in samples:
+            if not category_id or category_id in IGNORED_LABELS:
+                continue
+            features = hash_tokens(context_tokens(app, title, url), n_features)
+            if features.size == 0:
+                continue
+            label = class_ids.setdefault(category_id, len(class_ids))
+            doc_labels.append(label)
+            feature_chunks.append(features)
+
+        if not doc_labels:
+            raise ValueError("No labelled samples to train on")
+
+        n_classes = len(class_ids)
+        labels = np.asarray(doc_labels, dtype=np.int64)
+        lengths = np.fromiter((chunk.size for chunk in feature_chunks), dtype=np.int64)
+        flat_features = np.concatenate(feature_chunks)
+        flat_labels = np.repeat(labels, lengths)
+
+        counts = np.bincount(
+            flat_labels * n_features + flat_features,
+            minlength=n_classes * n_features,
+        ).reshape(n_classes, n_features)
+        return cls._from_counts(
+            classes=list(class_ids),
+            productive=[bool(productive_by_category.get(name, False)) for name in class_ids],
+            class_count=np.bincount(labels, minlength=n_classes),
+            feature_count=counts,
+            alpha=alpha,
+            min_confidence=min_confidence,
+        )
+
+    @classmethod
+    def _from_counts(
+        cls,
+        classes: list[str],
+        productive: list[bool],
+        class_count: np.ndarray,
+        feature_count: np.ndarray,
+        alpha: float,
+        min_confidence: float,
+    ) -> "NaiveBayesClassifier":
+        smoothed = feature_count.astype(np.float64) + alpha
+        feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        class_log_prior = np.log(class_count) - np.log(class_count.sum())
+        model = cls(classes, productive, feature_log_prob, class_log_prior, min_confidence)
+        model._class_count = class_count
+        model._feature_count = feature_count
+        model._alpha = alpha
+        return model
+
+    # -------- persistence --------
+    def save(self, path: str | Path = DEFAULT_MODEL_PATH) -> Path:
+        """
+        Write the model as a compressed ``.npz`` holding only non-zero feature counts.
+        Only models produced by :meth:`train` (or loaded from disk) can be saved.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        nz_class, nz_feature = np.nonzero(self._feature_count)
+        np.savez_compressed(
+            path,
+            classes=np.asarray(self.classes),
+            productive=np.asarray(self.productive, dtype=bool),
+            class_count=self._class_count.astype(np.int64),
+            nz_class=nz_class.astype(np.int32),
+            nz_feature=nz_feature.astype(np.int32),
+            nz_count=self._feature_count[nz_class, nz_feature].astype(np.int32),
+            n_features=np.int64(self.n_features),
+            alpha=np.float64(self._alpha),
+        )
+        return path
+
+    @classmethod
+    def load(
+        cls,
+        path: str | Path = DEFAULT_MODEL_PATH,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> "NaiveBayesClassifier":
+        with np.load(Path(path)) as data:
+            classes = [str(name) for name in data["classes"]]
+            n_features = int(data["n_features"])
+            feature_count = np.zeros((len(classes), n_features), dtype=np.int64)
+            feature_count[data["nz_class"], data["nz_feature"]] = data["nz_count"]
+            return cls._from_counts(
+                classes=classes,
+                productive=[bool(flag) for flag in data["productive"]],
+                class_count=data["class_count"],
+                feature_count=feature_count,
+                alpha=float(data["alpha"]),
+                min_confidence=min_confidence,
+            )
+
+    @classmethod
+    def load_default(cls, path: str | Path = DEFAULT_MODEL_PATH) -> Optional["NaiveBayesClassifier"]:
+        """Load the model if one has been trained, otherwise return None."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            return cls.load(path)
+        except Exception as exc:
+            print(f"[local model] failed to load {path}: {exc}")
+            return None
+
+    # -------- prediction --------
+    def predict(self, app: str, title: str, url: str) -> tuple[str, bool, float]:
+        """
+        Return ``(category_id, productive, confidence)`` for the most likely class,
+        regardless of ``min_confidence``.
+        """
+        features = hash_tokens(context_tokens(app, title, url), self.n_features)
+        if features.size == 0:
+            return "Unknown", False, 0.0
+        scores = self.class_log_prior + self.feature_log_prob[:, features].sum(axis=1)
+        best = int(scores.argmax())
+        probabilities = np.exp(scores - scores[best])
+        confidence = float(1.0 / probabilities.sum())
+        return self.classes[best], self.productive[best], confidence
+
+    def classify(self, e: Event) -> Classification:
+        """
+        Classify an event; predictions under ``min_confidence`` become Unknown
+        with the model's confidence kept for inspection.
+        """
+        category_id, productive, confidence = self.predict(e.app, e.title, e.url)
+        if confidence < self.min_confidence:
+            return Classification(
+                category_id="Unknown",
+                confidence=confidence,
+                rule_id=None,
+                meta={"productive": False, "predicted": category_id},
+            )
+        return Classification(
+            category_id=category_id,
+            confidence=confidence,
+            rule_id="local-nb",
+            meta={"productive": productive},
+        )
+
+
+# -------- training data --------
+def iter_parquet_samples(log_dir: str | Path) -> Iterable[tuple[str, str, str, str]]:
+    """Yield ``(app, title, url, category)`` from the legacy monthly parquet logs."""
+    import pandas as pd
+
+    for file_path in sorted(Path(log_dir).glob("activity_*.parquet")):
+        df = pd.read_parquet(file_path, columns=None)
+        if "category" not in df.columns:
+            continue
+        urls = df["url"] if "url" in df.columns else [""] * len(df)
+        for app, title, url, category in zip(df["app"], df["title"], urls, df["category"]):
+            yield str(app or ""), str(title or ""), str(url or ""), str(category or "")
+
+
+def iter_sqlite_samples(
+    db_path: str | Path,
+    engine_version: str = "rules-v1",
+) -> Iterable[tuple[str, str, str, str]]:
+    """
+    Yield ``(app, title, url, category)`` from the new-stack SQLite database,
+    using the effective label: user override, else the given engine's label.
+    """
+    conn = sqlite3.connect(f"file:{Path(db_path)}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            """
+            SELECT e.app, e.title, e.url, COALESCE(o.category_id, c.category_id)
+            FROM events AS e
+            LEFT JOIN user_overrides AS o ON o.event_id = e.id
+            LEFT JOIN engine_classifications AS c
+                ON c.event_id = e.id AND c.engine_version = ?
+            WHERE COALESCE(o.category_id, c.category_id) IS NOT NULL
+            """,
+            (engine_version,),
+        )
+        for app, title, url, category in rows:
+            yield app or "", title or "", url or "", category
+    finally:
+        conn.close()
+
+
+def _load_productive_flags(rules_path: Path) -> dict[str, bool]:
+    try:
+        rules = json.loads(rules_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return {name: bool(data.get("productive", False)) for name, data in rules.items()}
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the local naive Bayes classifier.")
+    parser.add_argument("--parquet-dir", type=Path, help="Directory with legacy activity_*.parquet logs.")
+    parser.add_argument("--sqlite", type=Path, help="New-stack SQLite database.")
+    parser.add_argument(
+        "--engine-version",
+        default="rules-v1",
+        help="Engine whose labels are used for SQLite events without a user override.",
+    )
+    parser.add_argument("--out", type=Path, default=DEFAULT_MODEL_PATH, help=f"Defaults to {DEFAULT_MODEL_PATH}")
+    parser.add_argument("--features", type=int, default=DEFAULT_N_FEATURES, help="Hashed feature space size.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    if not args.parquet_dir and not args.sqlite:
+        raise SystemExit("Provide --parquet-dir and/or --sqlite")
+
+    def samples() -> Iterable[tuple[str, str, str, str]]:
+        if args.parquet_dir:
+            yield from iter_parquet_samples(args.parquet_dir)
+        if args.sqlite:
+            yield from iter_sqlite_samples(args.sqlite, engine_version=args.engine_version)
+
+    model = NaiveBayesClassifier.train(
+        samples(),
+        productive_by_category=_load_productive_flags(DEFAULT_RULES_PATH),
+        n_features=args.features,
+    )
+    path = model.save(args.out)
+    print(f"Trained {len(model.classes)} classes; model written to {path} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Glob and regex rules compiled into one linear-time automaton.
+
+All patterns for a field are parsed (with the standard library's regex parser)
+into a single Thompson NFA. Matching walks the text once, following a DFA whose
+states are built lazily from sets of NFA states and cached per character, in
+the style of RE2. There is no backtracking, so matching cost grows with the
+text length, not with the number of patterns.
+
+Supported syntax is the regular subset of Python regexes: literals, ``.``,
+character classes and ``\\d \\w \\s``, alternation, groups, ``* + ? {m,n}``
+(greedy or lazy; laziness is irrelevant for yes/no matching), and the anchors
+``^ $ \\A \\Z \\b \\B``. Backreferences, lookaround, atomic groups and
+possessive repeats are rejected. Matching is case-insensitive.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Iterable, Optional, Sequence
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+
+MAX_REPEAT_EXPANSION = 100
+MAX_DFA_STATES = 10_000
+
+_CHAR, _SPLIT, _ASSERT, _ACCEPT = range(4)
+_AT_START, _AT_END, _AT_BOUNDARY, _AT_NON_BOUNDARY = range(4)
+
+_ASSERTIONS = {
+    sre_constants.AT_BEGINNING: _AT_START,
+    sre_constants.AT_BEGINNING_STRING: _AT_START,
+    sre_constants.AT_END: _AT_END,
+    sre_constants.AT_END_STRING: _AT_END,
+    sre_constants.AT_BOUNDARY: _AT_BOUNDARY,
+    sre_constants.AT_NON_BOUNDARY: _AT_NON_BOUNDARY,
+}
+
+
+def glob_to_regex(glob: str) -> str:
+    """
+    Translate a shell-style glob (``* ? [...] [!...]``) into a regex that, used
+    with search semantics, matches exactly the texts the glob matches in full.
+
+    Leading and trailing ``*`` become unanchored ends rather than ``.*``, which
+    keeps the automaton from carrying a live ``.*`` state for every such glob.
+    """
+    head = "" if glob.startswith("*") else r"\A"
+    tail = "" if glob.endswith("*") else r"\Z"
+    glob = glob.strip("*")
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        i += 1
+        if c == "*":
+            out.append(".*")
+        elif c == "?":
+            out.append(".")
+        elif c == "[":
+            end = glob.find("]", i + 1 if i < n and glob[i] in "!]" else i)
+            if end == -1:
+                out.append(re.escape(c))
+                continue
+            body = glob[i:end]
+            i = end + 1
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+        else:
+            out.append(re.escape(c))
+    return head + "".join(out) + tail
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+# -------- character predicates (picklable, case-insensitive) --------
+class _Literal:
+    __slots__ = ("char",)
+
+    def __init__(self, char: str) -> None:
+        self.char = char.lower()
+
+    def __call__(self, ch: str) -> bool:
+        return ch.lower() == self.char
+
+
+class _NotLiteral(_Literal):
+    __slots__ = ()
+
+    def __call__(self, ch: str) -> bool:
+        return ch.lower() != self.char
+
+
+class _AnyChar:
+    __slots__ = ()
+
+    def __call__(self, ch: str) -> bool:
+        return True
+
+
+class _CharClass:
+    __slots__ = ("items", "negate")
+
+    def __init__(self, items: Sequence[tuple[Any, Any]]) -> None:
+        # Stored as plain tuples/strings: the parser's opcode constants do not pickle.
+        self.negate = False
+        converted: list[tuple[str, Any]] = []
+        for op, arg in items:
+            if op is sre_constants.NEGATE:
+                self.negate = True
+            elif op is sre_constants.LITERAL:
+                converted.append(("literal", arg))
+            elif op is sre_constants.RANGE:
+                converted.append(("range", tuple(arg)))
+            elif op is sre_constants.CATEGORY and str(arg) in _CATEGORIES:
+                converted.append(("category", str(arg)))
+            else:
+                raise ValueError(f"unsupported character class item: {op} {arg}")
+        self.items = tuple(converted)
+
+    def _contains(self, ch: str) -> bool:
+        code = ord(ch)
+        for op, arg in self.items:
+            if op == "literal":
+                if code == arg:
+                    return True
+            elif op == "range":
+                if arg[0] <= code <= arg[1]:
+                    return True
+            elif _CATEGORIES[arg](ch):
+                return True
+        return False
+
+    def __call__(self, ch: str) -> bool:
+        hit = self._contains(ch) or self._contains(ch.lower()) or self._contains(ch.upper())
+        return hit != self.negate
+
+
+_CATEGORIES = {
+    "CATEGORY_DIGIT": str.isdigit,
+    "CATEGORY_NOT_DIGIT": lambda ch: not ch.isdigit(),
+    "CATEGORY_SPACE": str.isspace,
+    "CATEGORY_NOT_SPACE": lambda ch: not ch.isspace(),
+    "CATEGORY_WORD": _is_word,
+    "CATEGORY_NOT_WORD": lambda ch: not _is_word(ch),
+}
+
+
+class _DState:
+    """
+    Lazily built DFA state: the NFA states live after some prefix of the text
+    (besides the pattern starts, which are always live) plus the context that
+    anchors and word boundaries need.
+    """
+
+    __slots__ = ("core", "at_start", "prev_word", "next", "moves", "end_match")
+
+    def __init__(self, core: frozenset[int], at_start: bool, prev_word: bool) -> None:
+        self.core = core
+        self.at_start = at_start
+        self.prev_word = prev_word
+        # char -> (next state, lowest pattern index matching just before that char)
+        self.next: dict[str, tuple["_DState", Optional[int]]] = {}
+        # next char is a word char (index 1) or not (index 0) -> _Moves of core
+        self.moves: list[Optional[_Moves]] = [None, None]
+        self.end_match: Any = _UNSET
+
+
+class _Moves:
+    """Char-consuming states reachable from a set, indexed by the char they need."""
+
+    __slots__ = ("literal", "always", "checked", "matched")
+
+    def __init__(self, literal: dict[str, list[int]], always: list[int], checked: list[int], matched: Optional[int]) -> None:
+        self.literal = literal  # lowercased char -> target states
+        self.always = always  # targets of ``.`` states
+        self.checked = checked  # states whose class predicate must be evaluated
+        self.matched = matched
+
+
+_UNSET = object()
+
+
+class PatternSet:
+    """
+    Many glob/regex patterns matched together in one pass over the text.
+
+    ``entries`` are ``(kind, pattern, payload)`` with kind ``"glob"`` (the whole
+    text must match) or ``"regex"`` (a match anywhere, like ``re.search``).
+    ``match`` returns the payload of the first entry, in input order, that
+    matches, or ``None``.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, str, Any]]) -> None:
+        self.entries = tuple(entries)
+        self._kind: list[int] = []
+        self._arg: list[Any] = []
+        self._out: list[Any] = []
+        self._starts: list[int] = []
+        for index, (kind, pattern, _) in enumerate(self.entries):
+            if kind == "glob":
+                source = glob_to_regex(pattern)
+            elif kind == "regex":
+                source = pattern
+            else:
+                raise ValueError(f"unknown pattern kind: {kind}")
+            try:
+                parsed = sre_parse.parse(source)
+            except re.error as exc:
+                raise ValueError(f"invalid {kind} {pattern!r}: {exc}") from exc
+            try:
+                accept = self._add(_ACCEPT, index, None)
+                self._starts.append(self._build(list(parsed), accept))
+            except ValueError as exc:
+                raise ValueError(f"unsupported {kind} {pattern!r}: {exc}") from exc
+        self._reset_cache()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PatternSet) and other.entries == self.entries
+
+    def __hash__(self) -> int:
+        return hash(self.entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = dict(self.__dict__)
+        for transient in ("_dstates", "_start_moves", "_initial", "_cache_lock"):
+            state.pop(transient, None)
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._reset_cache()
+
+    # -------- matching --------
+    def match(self, text: str) -> Any:
+        index = self.match_index(text)
+        return None if index is None else self.entries[index][2]
+
+    def match_index(self, text: str) -> Optional[int]:
+        """Index of the first matching entry, scanning ``text`` exactly once."""
+        state = self._initial
+        best: Optional[int] = None
+        for ch in text:
+            step = state.next.get(ch)
+            if step is None:
+                step = self._transition(state, ch)
+            state, matched = step
+            if matched is not None and (best is None or matched < best):
+                best = matched
+        end = state.end_match
+        if end is _UNSET:
+            _, end = self._closure(
+                list(state.core) + self._starts, state.at_start, state.prev_word, next_word=False, at_end=True
+            )
+            state.end_match = end
+        if end is not None and (best is None or end < best):
+            best = end
+        return best
+
+    def _reset_cache(self) -> None:
+        self._cache_lock = threading.Lock()
+        self._dstates: dict[tuple[frozenset[int], bool, bool], _DState] = {}
+        self._start_moves: dict[tuple[bool, bool, bool], _Moves] = {}
+        self._initial = self._dstate(frozenset(), True, False)
+
+    def _dstate(self, core: frozenset[int], at_start: bool, prev_word: bool) -> _DState:
+        key = (core, at_start, prev_word)
+        state = self._dstates.get(key)
+        if state is None:
+            if len(self._dstates) >= MAX_DFA_STATES:
+                # Bound memory like RE2: drop the whole lazy DFA and keep going. The
+                # old states' transitions are cleared too, so a match still walking
+                # them cannot keep the old graph alive, and matching restarts from a
+                # fresh initial state.
+                for old in self._dstates.values():
+                    old.next.clear()
+                initial = _DState(frozenset(), True, False)
+                self._dstates = {(initial.core, initial.at_start, initial.prev_word): initial}
+                self._initial = initial
+                state = self._dstates.get(key)
+            if state is None:
+                state = self._dstates[key] = _DState(core, at_start, prev_word)
+        return state
+
+    def _transition(self, state: _DState, ch: str) -> tuple[_DState, Optional[int]]:
+        next_word = _is_word(ch)
+        own = state.moves[next_word]
+        if own is None:
+            own = state.moves[next_word] = self._moves(state.core, state.at_start, state.prev_word, next_word)
+        context = (state.at_start, state.prev_word, next_word)
+        starts = self._start_moves.get(context)
+        if starts is None:
+            # Every position may begin a match (unanchored search), so the pattern
+            # starts are shared by all states; their moves are indexed once per context.
+            starts = self._start_moves[context] = self._moves(self._starts, *context)
+
+        arg, out = self._arg, self._out
+        lowered = ch.lower()
+        moved: set[int] = set()
+        matched: Optional[int] = None
+        for moves in (own, starts):
+            moved.update(moves.always)
+            moved.update(moves.literal.get(lowered, ()))
+            moved.update(out[s] for s in moves.checked if arg[s](ch))
+            if moves.matched is not None and (matched is None or moves.matched < matched):
+                matched = moves.matched
+
+        with self._cache_lock:
+            target = self._dstate(frozenset(moved), False, next_word)
+        step = (target, matched)
+        state.next[ch] = step
+        return step
+
+    def _moves(self, states: Iterable[int], at_start: bool, prev_word: bool, next_word: bool) -> _Moves:
+        chars, matched = self._closure(states, at_start, prev_word, next_word, at_end=False)
+        literal: dict[str, list[int]] = {}
+        always: list[int] = []
+        checked: list[int] = []
+        for s in chars:
+            pred = self._arg[s]
+            if type(pred) is _Literal:
+                literal.setdefault(pred.char, []).append(self._out[s])
+            elif type(pred) is _AnyChar:
+                always.append(self._out[s])
+            else:
+                checked.append(s)
+        return _Moves(literal, always, checked, matched)
+
+    def _closure(
+        self,
+        states: Iterable[int],
+        at_start: bool,
+        prev_word: bool,
+        next_word: bool,
+        at_end: bool,
+    ) -> tuple[list[int], Optional[int]]:
+        """Char-consuming states reachable without input, and the best accepted pattern."""
+        kind, arg, out = self._kind, self._arg, self._out
+        chars: list[int] = []
+        matched: Optional[int] = None
+        seen: set[int] = set()
+        stack = list(states)
+        while stack:
+            s = stack.pop()
+            if s in seen:
+                continue
+            seen.add(s)
+            k = kind[s]
+            if k == _CHAR:
+                chars.append(s)
+            elif k == _SPLIT:
+                stack.extend(out[s])
+            elif k == _ACCEPT:
+                if matched is None or arg[s] < matched:
+                    matched = arg[s]
+            else:
+                assertion = arg[s]
+                if assertion == _AT_START:
+                    ok = at_start
+                elif assertion == _AT_END:
+                    ok = at_end
+                elif assertion == _AT_BOUNDARY:
+                    ok = prev_word != next_word
+                else:
+                    ok = prev_word == next_word
+                if ok:
+                    stack.append(out[s])
+        return chars, matched
+
+    # -------- NFA construction --------
+    def _add(self, kind: int, arg: Any, out: Any) -> int:
+        self._kind.append(kind)
+        self._arg.append(arg)
+        self._out.append(out)
+        return len(self._kind) - 1
+
+    def _build(self, items: list[tuple[Any, Any]], cont: int) -> int:
+        """Build ``items`` followed by state ``cont``; returns the entry state."""
+        for op, av in reversed(items):
+            cont = self._build_item(op, av, cont)
+        return cont
+
+    def _build_item(self, op: Any, av: Any, cont: int) -> int:
+        c = sre_constants
+        if op is c.LITERAL:
+            return self._add(_CHAR, _Literal(chr(av)), cont)
+        if op is c.NOT_LITERAL:
+            return self._add(_CHAR, _NotLiteral(chr(av)), cont)
+        if op is c.ANY:
+            return self._add(_CHAR, _AnyChar(), cont)
+        if op is c.IN:
+            return self._add(_CHAR, _CharClass(av), cont)
+        if op is c.BRANCH:
+            return self._add(_SPLIT, None, [self._build(list(alt), cont) for alt in av[1]])
+        if op is c.SUBPATTERN:
+            return self._build(list(av[-1]), cont)
+        if op is c.AT:
+            if av not in _ASSERTIONS:
+                raise ValueError(f"unsupported anchor {av}")
+            return self._add(_ASSERT, _ASSERTIONS[av], cont)
+        if op in (c.MAX_REPEAT, c.MIN_REPEAT):
+            low, high, body = av
+            body = list(body)
+            if high is c.MAXREPEAT:
+                loop = self._add(_SPLIT, None, None)
+                self._out[loop] = [self._build(body, loop), cont]
+                entry = loop
+            else:
+                if high > MAX_REPEAT_EXPANSION:
+                    raise ValueError(f"repeat bound {high} exceeds {MAX_REPEAT_EXPANSION}")
+                entry = cont
+                for _ in range(high - low):
+                    entry = self._add(_SPLIT, None, [self._build(body, entry), cont])
+            if low > MAX_REPEAT_EXPANSION:
+                raise ValueError(f"repeat bound {low} exceeds {MAX_REPEAT_EXPANSION}")
+            for _ in range(low):
+                entry = self._build(body, entry)
+            return entry
+        raise ValueError(f"unsupported construct {op}")
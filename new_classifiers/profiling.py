@@ -0,0 +1,127 @@
+"""Opt-in rule hit counters and latency profiling for the rules classifiers."""
+
+from __future__ import annotations
+
+import json
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Optional
+
+
+# Upper bounds (microseconds) of the latency histogram buckets; the last bucket is open.
+DEFAULT_LATENCY_BUCKETS_US = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000)
+
+
+class _Shard:
+    """Counters owned and written by a single thread."""
+
+    __slots__ = ("generation", "calls", "total_seconds", "rules", "unmatched_apps", "unmatched_hosts", "latency")
+
+    def __init__(self, generation: int, n_buckets: int) -> None:
+        self.generation = generation
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.rules: dict[str, int] = {}
+        self.unmatched_apps: dict[str, int] = {}
+        self.unmatched_hosts: dict[str, int] = {}
+        self.latency = [0] * n_buckets
+
+
+class ClassificationProfile:
+    """
+    Per-rule hit counts, unmatched apps/hosts and a latency histogram.
+
+    Each thread records into its own shard, so ``record`` takes no lock; the
+    shard list is only locked when a thread records for the first time (or
+    first time after ``reset``). ``snapshot`` merges the shards. ``reset``
+    starts a new generation: threads drop their old shard on their next record.
+    """
+
+    def __init__(self, latency_buckets_us: tuple[int, ...] = DEFAULT_LATENCY_BUCKETS_US) -> None:
+        self.latency_buckets_us = tuple(latency_buckets_us)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._shards: list[_Shard] = []
+
+    def record(self, rule_id: Optional[str], app: str, host: str, seconds: float) -> None:
+        """Count one classification; ``rule_id=None`` means it fell through to Unknown."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None or shard.generation != self._generation:
+            shard = self._new_shard()
+
+        shard.calls += 1
+        shard.total_seconds += seconds
+        shard.latency[bisect_left(self.latency_buckets_us, seconds * 1_000_000)] += 1
+        if rule_id is not None:
+            shard.rules[rule_id] = shard.rules.get(rule_id, 0) + 1
+        else:
+            shard.unmatched_apps[app] = shard.unmatched_apps.get(app, 0) + 1
+            if host:
+                shard.unmatched_hosts[host] = shard.unmatched_hosts.get(host, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Merged counters across threads. Rule and unmatched counts are sorted by
+        frequency, so the hottest rules and the most common misses come first.
+        """
+        with self._lock:
+            shards = list(self._shards)
+
+        calls = 0
+        total_seconds = 0.0
+        rules: dict[str, int] = {}
+        unmatched_apps: dict[str, int] = {}
+        unmatched_hosts: dict[str, int] = {}
+        latency = [0] * (len(self.latency_buckets_us) + 1)
+        for shard in shards:
+            calls += shard.calls
+            total_seconds += shard.total_seconds
+            # dict() copies in one step, so a concurrent writer cannot break iteration.
+            for merged, counts in (
+                (rules, dict(shard.rules)),
+                (unmatched_apps, dict(shard.unmatched_apps)),
+                (unmatched_hosts, dict(shard.unmatched_hosts)),
+            ):
+                for key, count in counts.items():
+                    merged[key] = merged.get(key, 0) + count
+            for idx, count in enumerate(list(shard.latency)):
+                latency[idx] += count
+
+        bounds = [f"<={bound}us" for bound in self.latency_buckets_us]
+        bounds.append(f">{self.latency_buckets_us[-1]}us")
+        return {
+            "calls": calls,
+            "total_seconds": total_seconds,
+            "avg_microseconds": total_seconds / calls * 1_000_000 if calls else 0.0,
+            "rules": _by_count(rules),
+            "unmatched_apps": _by_count(unmatched_apps),
+            "unmatched_hosts": _by_count(unmatched_hosts),
+            "latency_histogram": dict(zip(bounds, latency)),
+        }
+
+    def dump(self, path: Optional[str | Path] = None) -> str:
+        """Return the snapshot as JSON, also writing it to ``path`` when given."""
+        text = json.dumps(self.snapshot(), indent=2)
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text + "\n", encoding="utf-8")
+        return text
+
+    def reset(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._shards = []
+
+    def _new_shard(self) -> _Shard:
+        with self._lock:
+            shard = _Shard(self._generation, len(self.latency_buckets_us) + 1)
+            self._shards.append(shard)
+        self._local.shard = shard
+        return shard
+
+
+def _by_count(counts: dict[str, int]) -> dict[str, int]:
+    return dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
@@ -1,37 +1,61 @@
 from __future__ import annotations
 
-import json
+import time
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import Any, Iterable, Optional, Sequence
 
-from new_core.models import Classification, Event
+from new_classifiers.compiled_rules import DEFAULT_CACHE_DIR, DEFAULT_RULES_PATH, CompiledRules, HotReloadingRules
+from new_classifiers.profiling import ClassificationProfile
+from new_core.models import Classification, Event, url_parts
 from new_core.ports import Classifier
 
 
-DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "config" / "category_rules.json"
+# (app, idle, host, path, title, url) as seen by the rules; see RulesClassifier._context_key.
+Context = tuple[str, bool, str, str, str, str]
 
 
 class RulesClassifier(Classifier):
     """
     Classify events using deterministic app and URL rules.
 
-    Tokens are normalized once while the rules file is loaded, keeping the hot
+    Tokens are normalized once while the rules file is compiled, keeping the hot
     classification path to dictionary lookups and a short path-prefix scan.
+    Compiled indexes are shared through an on-disk cache and swapped in when the
+    rules file changes, so edits apply without restarting.
 
     Rule priority:
     1. Idle app/title
     2. Exact app token match
-    3. Exact hostname match, with the most specific matching path prefix
-    4. Unknown
+    3. URL glob/regex patterns
+    4. Title glob/regex patterns
+    5. Exact hostname match, with the most specific matching path prefix
+    6. Unknown
     """
 
     engine_version = "rules-v1"
 
-    def __init__(self, rules_path: str | Path = DEFAULT_RULES_PATH) -> None:
-        """Load category rules and build the indexes used for classification."""
+    def __init__(
+        self,
+        rules_path: str | Path = DEFAULT_RULES_PATH,
+        reload_interval: float = 1.0,
+        profile: Optional[ClassificationProfile] = None,
+        cache_dir: Optional[str | Path] = DEFAULT_CACHE_DIR,
+    ) -> None:
+        """
+        Load the compiled category rules, checking for edits every ``reload_interval`` seconds.
+        ``cache_dir`` holds the compiled-rules cache; None disables it.
+
+        When ``profile`` is given (or assigned later), ``classify`` records rule
+        hits, unmatched apps/hosts and latency into it.
+        """
         self._rules_path = Path(rules_path)
-        self._rules = self._load_rules(self._rules_path)
-        self._app_index, self._domain_index = self._build_indexes(self._rules)
+        self._rules = HotReloadingRules(self._rules_path, cache_dir=cache_dir, check_interval=reload_interval)
+        self.profile = profile
+
+    @property
+    def cache_version(self) -> str:
+        """Engine version plus the hash of the loaded rules; changes when the rules file is edited."""
+        return f"{self.engine_version}+{self._rules.current().source_hash}"
 
     def classify(self, e: Event) -> Classification:
         """
@@ -41,7 +65,15 @@ class RulesClassifier(Classifier):
         1.0, the matching rule identifier (if any), and the category's
         ``productive`` flag in its metadata.
         """
-        category_id, productive, rule_id = self._classify(e.app, e.title, e.url)
+        profile = self.profile
+        if profile is None:
+            category_id, productive, rule_id = self._classify(e.app, e.title, e.url)
+        else:
+            started = time.perf_counter()
+            compiled = self._rules.current()
+            context = self._context_key(compiled, e.app, e.title, e.url)
+            category_id, productive, rule_id = self._classify_context(compiled, context)
+            profile.record(rule_id, context[0], context[2], time.perf_counter() - started)
         return Classification(
             category_id=category_id,
             confidence=1.0,
@@ -49,85 +81,172 @@ class RulesClassifier(Classifier):
             meta={"productive": productive},
         )
 
-    @staticmethod
-    def _load_rules(rules_path: Path) -> dict[str, dict[str, object]]:
-        """Read and return the category-rule mapping from a JSON file."""
-        return json.loads(rules_path.read_text(encoding="utf-8"))
-
-    @staticmethod
-    def _build_indexes(
-        rules: dict[str, dict[str, object]],
-    ) -> tuple[
-        dict[str, tuple[str, bool]],
-        dict[str, list[tuple[str, str, bool]]],
-    ]:
+    def classify_many(self, events: Iterable[Event]) -> list[Classification]:
         """
-        Convert raw rules into application and domain lookup indexes.
+        Classify a batch of events, evaluating each distinct context once.
 
-        Returns a pair containing:
-        - an app-name mapping to ``(category_id, productive)``;
-        - a hostname mapping to path-specific
-          ``(path_prefix, category_id, productive)`` entries.
-
-        Domain entries are ordered from longest to shortest path prefix so the
-        most specific matching rule wins.
+        Events are reduced to their ``(app, idle, host, path)`` context; rules run
+        once per unique context and the results are broadcast back in input
+        order. Events sharing a context share one ``Classification`` instance.
         """
-        app_index: dict[str, tuple[str, bool]] = {}
-        domain_index: dict[str, list[tuple[str, str, bool]]] = {}
-
-        for category_id, data in rules.items():
-            productive = bool(data.get("productive", False))
-
-            for app_token in data.get("apps", []):
-                normalized = str(app_token).strip().lower()
-                if normalized:
-                    app_index[normalized] = (category_id, productive)
-
-            for domain_token in data.get("domains", []):
-                token = str(domain_token).strip().lower()
-                if not token:
-                    continue
-
-                host, separator, path = token.partition("/")
-                host = host.strip()
-                if not host:
-                    continue
+        events = list(events)
+        results, inverse = self._classify_unique(
+            [e.app for e in events],
+            [e.title for e in events],
+            [e.url for e in events],
+        )
+        unique = [
+            Classification(
+                category_id=category_id,
+                confidence=1.0,
+                rule_id=rule_id,
+                meta={"productive": productive},
+            )
+            for category_id, productive, rule_id in results
+        ]
+        return [unique[idx] for idx in inverse]
+
+    def classify_columns(
+        self,
+        apps: Sequence[str | None],
+        titles: Sequence[str | None],
+        urls: Sequence[str | None],
+    ) -> dict[str, Any]:
+        """
+        Column variant of ``classify_many`` for aligned app/title/url sequences.
 
-                path_prefix = path.strip()
-                if separator and path_prefix and not path_prefix.startswith("/"):
-                    path_prefix = "/" + path_prefix
+        Returns NumPy arrays ``category_id`` (object), ``productive`` (bool),
+        ``rule_id`` (object, ``None`` when unmatched) and ``context_index``, the
+        per-row index into the unique contexts used to broadcast the results.
+        """
+        # Imported here so single-event classification stays free of NumPy.
+        import numpy as np
+
+        results, inverse = self._classify_unique(apps, titles, urls)
+        context_index = np.asarray(inverse, dtype=np.intp)
+        categories = np.empty(len(results), dtype=object)
+        rule_ids = np.empty(len(results), dtype=object)
+        categories[:] = [category_id for category_id, _, _ in results]
+        rule_ids[:] = [rule_id for _, _, rule_id in results]
+        productive = np.fromiter((p for _, p, _ in results), dtype=bool, count=len(results))
+        return {
+            "category_id": categories[context_index],
+            "productive": productive[context_index],
+            "rule_id": rule_ids[context_index],
+            "context_index": context_index,
+        }
+
+    def classify_table(self, table: Any) -> Any:
+        """
+        Classify a pandas DataFrame or pyarrow Table with ``app``/``title``/``url`` columns.
 
-                domain_index.setdefault(host, []).append((path_prefix, category_id, productive))
+        Returns the same kind of object with ``category_id``, ``productive`` and
+        ``rule_id`` columns appended.
+        """
+        if hasattr(table, "column_names"):
+            import pyarrow as pa
+
+            columns = self.classify_columns(
+                table.column("app").to_pylist(),
+                table.column("title").to_pylist(),
+                table.column("url").to_pylist(),
+            )
+            for name in ("category_id", "productive", "rule_id"):
+                table = table.append_column(name, pa.array(columns[name]))
+            return table
+
+        columns = self.classify_columns(
+            table["app"].tolist(),
+            table["title"].tolist(),
+            table["url"].tolist(),
+        )
+        return table.assign(
+            category_id=columns["category_id"],
+            productive=columns["productive"],
+            rule_id=columns["rule_id"],
+        )
 
-        for host, entries in domain_index.items():
-            domain_index[host] = sorted(entries, key=lambda item: len(item[0]), reverse=True)
+    def _classify_unique(
+        self,
+        apps: Iterable[str | None],
+        titles: Iterable[str | None],
+        urls: Iterable[str | None],
+    ) -> tuple[list[tuple[str, bool, str | None]], list[int]]:
+        """
+        Classify each distinct context in aligned columns once.
 
-        return app_index, domain_index
+        Returns ``(results, inverse)`` where ``results[inverse[i]]`` is the
+        ``(category_id, productive, rule_id)`` for row ``i``. Identical raw rows
+        are recognised before any normalization or URL parsing happens.
+        """
+        compiled = self._rules.current()
+        row_index: dict[tuple[Any, Any, Any], int] = {}
+        context_index: dict[Context, int] = {}
+        results: list[tuple[str, bool, str | None]] = []
+        inverse: list[int] = []
+
+        for row in zip(apps, titles, urls):
+            idx = row_index.get(row)
+            if idx is None:
+                context = self._context_key(compiled, *row)
+                idx = context_index.get(context)
+                if idx is None:
+                    idx = len(results)
+                    context_index[context] = idx
+                    results.append(self._classify_context(compiled, context))
+                row_index[row] = idx
+            inverse.append(idx)
+        return results, inverse
 
     def _classify(self, app: str, title: str, url: str) -> tuple[str, bool, str | None]:
         """
         Apply rule priority to normalized event fields.
 
         Returns ``(category_id, productive, rule_id)``. ``rule_id`` identifies
-        the idle, app, or domain rule that matched and is ``None`` when the
-        event falls back to the Unknown category.
+        the idle, app, pattern or domain rule that matched and is ``None`` when
+        the event falls back to the Unknown category.
+        """
+        compiled = self._rules.current()
+        return self._classify_context(compiled, self._context_key(compiled, app, title, url))
+
+    @staticmethod
+    def _context_key(compiled: CompiledRules, app: str | None, title: str | None, url: str | None) -> Context:
+        """
+        Reduce event fields to everything the rules can see:
+        ``(app, idle, host, path, title, url)``. The full title and URL are only
+        kept when pattern rules exist for them, so contexts stay coarse otherwise.
         """
         normalized_app = (app or "").strip().lower()
-        normalized_title = (title or "").strip().lower()
+        stripped_title = (title or "").strip()
+        idle = normalized_app == "idle" or stripped_title.lower() == "idle"
+        host, path = url_parts(url or "")
+        title_key = stripped_title if compiled.title_patterns is not None else ""
+        url_key = (url or "").strip() if compiled.url_patterns is not None else ""
+        return normalized_app, idle, host, path, title_key, url_key
 
-        if normalized_app == "idle" or normalized_title == "idle":
+    @staticmethod
+    def _classify_context(compiled: CompiledRules, context: Context) -> tuple[str, bool, str | None]:
+        normalized_app, idle, host, path, title, url = context
+
+        if idle:
             return "Idle", False, "idle"
 
-        app_match = self._app_index.get(normalized_app)
+        app_match = compiled.app_index.get(normalized_app)
         if app_match:
             category_id, productive = app_match
             return category_id, productive, f"app:{normalized_app}"
 
-        parsed = urlparse(url or "")
-        host = (parsed.hostname or "").strip().lower()
-        path = (parsed.path or "").strip().lower()
+        if compiled.url_patterns is not None and url:
+            url_match = compiled.url_patterns.match(url)
+            if url_match is not None:
+                return url_match
+
+        if compiled.title_patterns is not None and title:
+            title_match = compiled.title_patterns.match(title)
+            if title_match is not None:
+                return title_match
 
-        for path_prefix, category_id, productive in self._domain_index.get(host, []):
+        for path_prefix, category_id, productive in compiled.domain_index.get(host, []):
             if not path_prefix or path.startswith(path_prefix):
                 token = f"{host}{path_prefix}"
                 return category_id, productive, f"domain:{token}"
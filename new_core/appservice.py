@@ -1,8 +1,34 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional
-from .models import Event
-from .ports import EventSource, Storage, Classifier, Publisher
+import queue
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+from .memo import ClassificationMemo
+from .metrics import REGISTRY
+from .models import Classification, Event, content_hash
+from .ports import EventSource, Storage, Classifier, Publisher, ContextStore
+
+
+# -------- metrics --------
+EVENTS_RECEIVED = REGISTRY.counter("activity_events_received", "Finalized events handed to AppService.")
+EVENTS_REJECTED = REGISTRY.counter("activity_events_rejected", "Events ignored for a missing or inverted end_ts.")
+EVENTS_INGESTED = REGISTRY.counter("activity_events_ingested", "Events written to storage.")
+INGEST_ERRORS = REGISTRY.counter("activity_ingest_errors", "Events lost to storage errors.")
+INGEST_BATCH_RETRIES = REGISTRY.counter(
+    "activity_ingest_batch_retries", "Group-commit batches rolled back and retried one event at a time."
+)
+LABEL_WRITE_ERRORS = REGISTRY.counter("activity_label_write_errors", "Classifications that could not be stored.")
+CLASSIFY_FAILURES = REGISTRY.counter(
+    "activity_classification_failures", "Classifier calls that raised; the event is stored unlabeled."
+)
+CLASSIFY_SECONDS = REGISTRY.histogram("activity_classification_seconds", "Time to classify one event, memo included.")
+QUEUE_DEPTH = REGISTRY.gauge("activity_ingest_queue_depth", "Events waiting in the ingestion queue.")
+QUEUE_DROPPED = REGISTRY.counter("activity_ingest_queue_dropped", "Events dropped by the queue overflow policy.")
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "activity_ingest_queue_wait_seconds", "Time events wait in the ingestion queue."
+)
 
 
 class NoopPublisher:
@@ -17,6 +43,65 @@ class AppServiceConfig:
     Tweak behavior without changing logic.
     """
     classify_on_ingest: bool = True  # classify immediately as events arrive
+    memo_max_entries: int = 4096  # contexts remembered in memory; 0 disables the memo
+    # "sync": persist and classify on the source's thread.
+    # "queued": the source thread only enqueues; a worker thread persists and classifies.
+    ingest_mode: str = "sync"
+    queue_max_events: int = 1024
+    # What a full queue does with a new event: "block" the source (up to
+    # queue_block_seconds, then drop it), "drop_newest" or "drop_oldest".
+    queue_overflow: str = "block"
+    queue_block_seconds: Optional[float] = None  # None blocks until there is room
+    drain_timeout_seconds: float = 10.0  # how long stop() waits for queued events
+    # Group commit (queued mode only): write up to commit_max_events events and
+    # their labels per transaction, waiting at most commit_max_seconds for a
+    # batch to fill. 1 commits every event on its own.
+    commit_max_events: int = 1
+    commit_max_seconds: float = 0.25
+    # Provisional labels waiting for a classifier's late result (and late
+    # results waiting for their event id) are forgotten after this long, e.g.
+    # when the provisional write failed and the id never arrives.
+    late_label_max_age_seconds: float = 300.0
+
+
+INGEST_MODES = ("sync", "queued")
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+_STOP = object()
+
+
+@dataclass
+class IngestQueueStats:
+    """
+    Counters for the queued ingestion mode. ``depth`` is the number of events
+    waiting; ``max_depth`` the highest depth seen since start.
+    """
+    enqueued: int = 0
+    processed: int = 0
+    dropped: int = 0
+    errors: int = 0
+    batches: int = 0  # write batches; one per event without group commit
+    batch_retries: int = 0  # failed batches retried event by event
+    last_error: str = ""  # most recent storage error, for diagnostics
+    depth: int = 0
+    max_depth: int = 0
+    capacity: int = 0
+    total_wait_seconds: float = 0.0  # enqueue-to-start time summed over processed events
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "batches": self.batches,
+            "batch_retries": self.batch_retries,
+            "last_error": self.last_error,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "capacity": self.capacity,
+            "avg_wait_seconds": self.total_wait_seconds / self.processed if self.processed else 0.0,
+        }
 
 
 class AppService:
@@ -24,6 +109,11 @@ class AppService:
     Orchestrates finalized-event ingestion:
       EventSource -> Storage (raw segments) -> Classifier -> Storage (derived labels)
     Also provides methods for user overrides that the dashboard can call.
+
+    With ``ingest_mode="queued"`` the source callback only validates and
+    enqueues; a single worker thread does the storage writes and
+    classification in arrival order, so slow commits or classifiers do not
+    delay capture. ``stop()`` stops the source and then drains the queue.
     """
 
     def __init__(
@@ -33,12 +123,39 @@ class AppService:
         classifier: Optional[Classifier] = None,
         publisher: Optional[Publisher] = None,
         config: Optional[AppServiceConfig] = None,
+        context_store: Optional[ContextStore] = None,
     ) -> None:
         self._source = source
         self._storage = storage
         self._classifier = classifier
         self._publisher = publisher or NoopPublisher()
         self._config = config or AppServiceConfig()
+        # Repeated contexts reuse the first classification (persisted when a context store is given).
+        self._memo = (
+            ClassificationMemo(self._config.memo_max_entries, store=context_store)
+            if self._config.memo_max_entries > 0
+            else None
+        )
+        # Classifiers with an async completion path (e.g. CascadeClassifier) return
+        # provisional labels (meta["pending"]) and report the final label later.
+        self._late_lock = threading.Lock()
+        # Both maps are keyed by event and hold (monotonic time added, value).
+        self._awaiting_late: OrderedDict[Event, tuple[float, int]] = OrderedDict()
+        self._unclaimed_late: OrderedDict[Event, tuple[float, Optional[Classification]]] = OrderedDict()
+        add_late_listener = getattr(classifier, "add_late_listener", None)
+        if add_late_listener is not None:
+            add_late_listener(self._on_late_classification)
+
+        if self._config.ingest_mode not in INGEST_MODES:
+            raise ValueError(f"unknown ingest_mode: {self._config.ingest_mode}")
+        if self._config.queue_overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown queue_overflow policy: {self._config.queue_overflow}")
+        if self._config.commit_max_events > 1 and self._config.ingest_mode != "queued":
+            raise ValueError("commit_max_events > 1 needs ingest_mode='queued'")
+        self._queue: Optional[queue.Queue] = None
+        self._worker: Optional[threading.Thread] = None
+        self._stats = IngestQueueStats(capacity=self._config.queue_max_events)
+        self._stats_lock = threading.Lock()
 
         self._running = False
 
@@ -47,12 +164,24 @@ class AppService:
         """
         Start listening. Typically run this from a backend process.
         """
+        if self._config.ingest_mode == "queued" and self._worker is None:
+            self._queue = queue.Queue(maxsize=max(1, self._config.queue_max_events))
+            self._worker = threading.Thread(target=self._drain_queue, name="appservice-ingest", daemon=True)
+            self._worker.start()
         self._running = True
         self._source.start(self._on_event)
 
     def stop(self) -> None:
         self._running = False
         self._source.stop()
+        self._stop_worker()
+
+    def queue_stats(self) -> dict[str, Any]:
+        """Snapshot of the ingestion queue counters (all zero in sync mode)."""
+        with self._stats_lock:
+            if self._queue is not None:
+                self._stats.depth = self._queue.qsize()
+            return self._stats.as_dict()
 
     # -------- ingestion callback --------
     def _on_event(self, e: Event) -> None:
@@ -63,26 +192,281 @@ class AppService:
         if not self._running:
             return
 
+        EVENTS_RECEIVED.inc()
         if e.end_ts is None or e.end_ts < e.start_ts:
+            EVENTS_REJECTED.inc()
+            return
+
+        if self._queue is not None:
+            self._enqueue(e)
             return
+        try:
+            self._ingest(e)
+        except Exception:
+            INGEST_ERRORS.inc()
+            raise
+
+    def _ingest(self, e: Event) -> None:
+        e = self._with_hash(e)
 
         # 1) Persist the finalized segment as-is.
         new_id = self._storage.insert_event(e)
+        EVENTS_INGESTED.inc()
         self._publisher.event_recorded(new_id)
 
         # 2) Classify immediately (optional)
-        if self._config.classify_on_ingest and self._classifier is not None:
-            try:
-                c = self._classifier.classify(e)
-                self._storage.upsert_engine_classification(
-                    event_id=new_id,
-                    engine_version=self._classifier.engine_version,
-                    c=c,
-                )
+        c = self._classify(e)
+        if c is None:
+            return
+        try:
+            self._storage.upsert_engine_classification(
+                event_id=new_id,
+                engine_version=self._classifier.engine_version,
+                c=c,
+            )
+            self._publisher.label_updated(new_id)
+            if c.meta and c.meta.get("pending"):
+                self._await_late(e, new_id)
+        except Exception:
+            # Never stop ingestion; the raw event is already stored.
+            LABEL_WRITE_ERRORS.inc()
+            return
+
+    def _write_batch(self, events: list[Event], labels: list[Optional[Classification]]) -> None:
+        """
+        Group commit: write hashed, classified events and their labels in one
+        storage unit of work. Any write error rolls back the whole unit.
+        Publisher callbacks run after the commit.
+        """
+        # Storages with batched writes (SQLiteStorage.insert_events and
+        # upsert_engine_classifications) take the whole batch in one executemany.
+        insert_events = getattr(self._storage, "insert_events", None)
+        upsert_many = getattr(self._storage, "upsert_engine_classifications", None)
+        with self._storage.unit_of_work():
+            if insert_events is not None:
+                ids = list(insert_events(events))
+            else:
+                ids = [self._storage.insert_event(e) for e in events]
+            labeled = [(new_id, c) for new_id, c in zip(ids, labels) if c is not None]
+            if labeled and upsert_many is not None:
+                upsert_many(self._classifier.engine_version, labeled)
+            else:
+                for new_id, c in labeled:
+                    self._storage.upsert_engine_classification(
+                        event_id=new_id,
+                        engine_version=self._classifier.engine_version,
+                        c=c,
+                    )
+        EVENTS_INGESTED.inc(len(ids))
+
+        for e, new_id, c in zip(events, ids, labels):
+            self._publisher.event_recorded(new_id)
+            if c is not None:
                 self._publisher.label_updated(new_id)
-            except Exception:
-                # In production: log + metric, but never stop ingestion.
+                if c.meta and c.meta.get("pending"):
+                    self._await_late(e, new_id)
+
+    @staticmethod
+    def _with_hash(e: Event) -> Event:
+        if e.content_hash is None:
+            return replace(e, content_hash=content_hash(e.app, e.title, e.url))
+        return e
+
+    def _classify(self, e: Event) -> Optional[Classification]:
+        """Classification for ``e``, or None when disabled or the classifier failed."""
+        if not self._config.classify_on_ingest or self._classifier is None:
+            return None
+        try:
+            with CLASSIFY_SECONDS.time():
+                if self._memo is not None:
+                    return self._memo.classify(self._classifier, e)
+                return self._classifier.classify(e)
+        except Exception:
+            # Classifier errors never stop ingestion; the raw event is still stored.
+            CLASSIFY_FAILURES.inc()
+            return None
+
+    # -------- ingestion queue --------
+    def _enqueue(self, e: Event) -> None:
+        assert self._queue is not None
+        item = (time.monotonic(), e)
+        policy = self._config.queue_overflow
+        dropped = 0
+        try:
+            if policy == "block":
+                self._queue.put(item, timeout=self._config.queue_block_seconds)
+            elif policy == "drop_newest":
+                self._queue.put_nowait(item)
+            else:
+                while True:
+                    try:
+                        self._queue.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            self._queue.get_nowait()
+                            self._queue.task_done()
+                            dropped += 1
+                        except queue.Empty:
+                            pass
+        except queue.Full:
+            QUEUE_DROPPED.inc()
+            with self._stats_lock:
+                self._stats.dropped += 1
+            return
+
+        depth = self._queue.qsize()
+        QUEUE_DEPTH.set(depth)
+        QUEUE_DROPPED.inc(dropped)
+        with self._stats_lock:
+            self._stats.enqueued += 1
+            self._stats.dropped += dropped
+            self._stats.max_depth = max(self._stats.max_depth, depth)
+
+    def _drain_queue(self) -> None:
+        assert self._queue is not None
+        batch_size = max(1, self._config.commit_max_events)
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            if items[0] is not _STOP and batch_size > 1:
+                # Collect up to batch_size events, waiting at most commit_max_seconds
+                # for more once the queue runs dry.
+                deadline = time.monotonic() + self._config.commit_max_seconds
+                while len(items) < batch_size and items[-1] is not _STOP:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            items.append(self._queue.get(timeout=remaining))
+                        else:
+                            items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+            if items[-1] is _STOP:
+                stopping = True
+                items.pop()
+            try:
+                if items:
+                    self._process(items)
+            finally:
+                for _ in range(len(items) + stopping):
+                    self._queue.task_done()
+
+    def _process(self, items: list[tuple[float, Event]]) -> None:
+        started = time.monotonic()
+        waited = 0.0
+        for enqueued_at, _ in items:
+            waited += started - enqueued_at
+            QUEUE_WAIT_SECONDS.observe(started - enqueued_at)
+        QUEUE_DEPTH.set(self._queue.qsize() if self._queue is not None else 0)
+        failed = 0
+        commits = 0
+        retried = False
+        if self._config.commit_max_events > 1:
+            events = [self._with_hash(e) for _, e in items]
+            labels = [self._classify(e) for e in events]
+            try:
+                self._write_batch(events, labels)
+                commits = 1
+            except Exception as exc:
+                # The batch was rolled back as a whole; retry its events (with the
+                # labels already computed) one per unit of work, so only the event
+                # that fails again is lost.
+                self._note_error(exc)
+                INGEST_BATCH_RETRIES.inc()
+                retried = True
+            if retried:
+                for e, c in zip(events, labels):
+                    try:
+                        self._write_batch([e], [c])
+                        commits += 1
+                    except Exception as exc:
+                        self._note_error(exc)
+                        failed += 1
+        else:
+            for _, e in items:
+                try:
+                    self._ingest(e)
+                    commits += 1
+                except Exception as exc:
+                    # Storage errors lose this event but must not kill the worker.
+                    self._note_error(exc)
+                    failed += 1
+        INGEST_ERRORS.inc(failed)
+        with self._stats_lock:
+            self._stats.processed += len(items)
+            self._stats.errors += failed
+            self._stats.batches += commits
+            self._stats.batch_retries += retried
+            self._stats.total_wait_seconds += waited
+
+    def _note_error(self, exc: Exception) -> None:
+        with self._stats_lock:
+            self._stats.last_error = f"{type(exc).__name__}: {exc}"
+
+    def _stop_worker(self) -> None:
+        if self._worker is None or self._queue is None:
+            return
+        deadline = time.monotonic() + self._config.drain_timeout_seconds
+        try:
+            # The source is stopped, so the queue only shrinks; the marker goes in behind the backlog.
+            self._queue.put(_STOP, timeout=self._config.drain_timeout_seconds)
+        except queue.Full:
+            pass
+        self._worker.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._worker.is_alive():
+            print(f"[appservice] stop: {self._queue.qsize()} queued events not written before the drain timeout")
+            return
+        self._worker = None
+        self._queue = None
+
+    def _await_late(self, e: Event, event_id: int) -> None:
+        with self._late_lock:
+            self._prune_late()
+            if e not in self._unclaimed_late:
+                self._awaiting_late[e] = (time.monotonic(), event_id)
+                self._awaiting_late.move_to_end(e)
                 return
+            _, c = self._unclaimed_late.pop(e)
+        self._store_late(event_id, c)
+
+    def _on_late_classification(self, e: Event, c: Optional[Classification]) -> None:
+        """
+        Called from classifier worker threads with the final label for an event
+        that was stored with a provisional one (or None when no stage was sure).
+        """
+        with self._late_lock:
+            self._prune_late()
+            awaiting = self._awaiting_late.pop(e, None)
+            if awaiting is None:
+                # Finished before _on_event registered the id; _await_late picks it up.
+                self._unclaimed_late[e] = (time.monotonic(), c)
+                self._unclaimed_late.move_to_end(e)
+                return
+        self._store_late(awaiting[1], c)
+
+    def _prune_late(self) -> None:
+        """Drop late-label entries older than late_label_max_age_seconds. Call with _late_lock held."""
+        cutoff = time.monotonic() - self._config.late_label_max_age_seconds
+        for entries in (self._awaiting_late, self._unclaimed_late):
+            while entries:
+                added, _ = next(iter(entries.values()))
+                if added > cutoff:
+                    break
+                entries.popitem(last=False)
+
+    def _store_late(self, event_id: int, c: Optional[Classification]) -> None:
+        if c is None or self._classifier is None:
+            return
+        try:
+            self._storage.upsert_engine_classification(
+                event_id=event_id,
+                engine_version=self._classifier.engine_version,
+                c=c,
+            )
+            self._publisher.label_updated(event_id)
+        except Exception:
+            return
 
     # -------- dashboard override API --------
     def set_override(self, event_id: int, category_id: str, note: Optional[str] = None) -> None:
@@ -0,0 +1,104 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Optional
+from .models import Classification, Event, content_hash
+from .ports import Classifier, ContextStore
+
+
+def memo_version(classifier: Classifier) -> str:
+    """
+    Version string results are memoized under.
+
+    Classifiers whose output can change without an ``engine_version`` bump
+    (e.g. hot-reloaded rules) expose a finer ``cache_version``.
+    """
+    return getattr(classifier, "cache_version", None) or classifier.engine_version
+
+
+def is_cacheable(classifier: Classifier, c: Classification) -> bool:
+    """
+    Whether ``c`` is a settled answer worth remembering.
+
+    Provisional results, cascades where a stage errored or was deferred, and
+    ``Unknown`` from a classifier flagged ``fallible`` (one that answers
+    ``Unknown`` when e.g. a network call fails) may come out differently next
+    time, so they are classified again instead.
+    """
+    meta = c.meta or {}
+    if meta.get("pending"):
+        return False
+    if any(step.get("status") in ("error", "deferred") for step in meta.get("cascade") or ()):
+        return False
+    return not (c.category_id == "Unknown" and getattr(classifier, "fallible", False))
+
+
+class ClassificationMemo:
+    """
+    Bounded LRU of classifications keyed by (content_hash, version), optionally
+    backed by a persistent ContextStore so repeated contexts skip the classifier
+    across restarts too. When the classifier's version changes, results stored
+    under other versions are pruned.
+    """
+
+    def __init__(self, max_entries: int = 4096, store: Optional[ContextStore] = None) -> None:
+        self.max_entries = max_entries
+        self._store = store
+        self._entries: OrderedDict[tuple[str, str], Classification] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def classify(self, classifier: Classifier, e: Event) -> Classification:
+        """Return the memoized classification for ``e``, classifying it on a miss."""
+        key = (e.content_hash or content_hash(e.app, e.title, e.url), memo_version(classifier))
+        if key[1] != self._version:
+            self._switch_version(key[1])
+        with self._lock:
+            c = self._entries.get(key)
+            if c is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return c
+
+        if self._store is not None:
+            c = self._store.get_context_classification(*key)
+            if c is not None:
+                self.store_hits += 1
+                self._remember(key, c)
+                return c
+
+        c = classifier.classify(e)
+        self.misses += 1
+        if not is_cacheable(classifier, c):
+            return c
+        if self._store is not None:
+            self._store.put_context_classification(key[0], key[1], c)
+        self._remember(key, c)
+        return c
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _switch_version(self, version: str) -> None:
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            for key in [k for k in self._entries if k[1] != version]:
+                del self._entries[key]
+        if self._store is not None:
+            self._store.prune_context_classifications(version)
+
+    def _remember(self, key: tuple[str, str], c: Classification) -> None:
+        with self._lock:
+            self._entries[key] = c
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
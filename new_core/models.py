@@ -1,6 +1,9 @@
 from __future__ import annotations
+import hashlib
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Any
+from urllib.parse import urlparse
 
 
 @dataclass(frozen=True)
@@ -15,6 +18,28 @@ class Event:
     title: str
     url: str = ""
     content_hash: Optional[str] = None  # optional: hash(app|title|url) for caching/rules
+    device: str = ""  # id of the machine that captured it; "" when unknown
+
+
+def content_hash(app: str, title: str, url: str) -> str:
+    """
+    Stable 64-bit hex digest of the normalized (app, title, url) context.
+
+    Fields are stripped and inner whitespace collapsed, so cosmetic differences
+    in window titles do not split one context into several.
+    """
+    normalized = "\x1f".join(" ".join((part or "").split()) for part in (app, title, url))
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=8192)
+def url_parts(url: str) -> tuple[str, str]:
+    """
+    Lowercased ``(host, path)`` of a URL, as the rules match them. Cached, so a
+    URL parsed during enrichment is not parsed again by the classifier.
+    """
+    parsed = urlparse(url)
+    return (parsed.hostname or "").strip().lower(), (parsed.path or "").strip().lower()
 
 
 @dataclass(frozen=True)
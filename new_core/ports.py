@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Protocol, Callable, Optional
+from typing import ContextManager, Protocol, Callable, Optional
 from .models import Event, Classification
 
 
@@ -53,11 +53,32 @@ class Storage(Protocol):
     def clear_user_override(self, event_id: int) -> None:
         ...
 
+    # Unit of work
+    def unit_of_work(self) -> ContextManager[None]:
+        """
+        Group the writes made inside the ``with`` block into one transaction
+        (one commit), rolled back if the block raises.
+        """
+        ...
+
+
+class ContextStore(Protocol):
+    """
+    Persistent classification results per distinct context, keyed by the
+    event content hash and the classifier version that produced them.
+    """
+    def get_context_classification(self, content_hash: str, engine_version: str) -> Optional[Classification]: ...
+    def put_context_classification(self, content_hash: str, engine_version: str, c: Classification) -> None: ...
+    def prune_context_classifications(self, keep_version: str) -> int:
+        """Delete results stored under any version other than ``keep_version``; return the count."""
+        ...
+
 
 class Publisher(Protocol):
     """
     Used by AppService to notify UI/dashboard about changes.
-    Current implementation is no-op, future implementations can be in-process callbacks or websocket broadcast.
+    Implementations: NoopPublisher, and new_publish.CoalescingPublisher, which
+    batches notifications for in-process subscribers and the SSE endpoint.
     """
     def event_recorded(self, event_id: int) -> None: ...
     def label_updated(self, event_id: int) -> None: ...
@@ -0,0 +1,14 @@
+"""Capture-loop metrics shared by the macOS source and the legacy logger loop."""
+
+from __future__ import annotations
+
+from new_core.metrics import REGISTRY
+
+
+CAPTURE_POLLS = REGISTRY.counter(
+    "activity_capture_polls", "Capture loop iterations, by source and state (active/idle/empty).", ("source", "state")
+)
+CAPTURE_SAMPLE_SECONDS = REGISTRY.histogram(
+    "activity_capture_sample_seconds", "Time to read the foreground app, title and URL.", ("source",)
+)
+CAPTURE_SEGMENTS = REGISTRY.counter("activity_capture_segments", "Finalized segments emitted.", ("source",))
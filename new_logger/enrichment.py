@@ -0,0 +1,280 @@
+"""
+Enrichment stages applied to events between an EventSource and AppService.
+
+Sources only report what they observed; ``EnrichedEventSource`` wraps any of
+them and runs each finalized event through an ``EnrichmentPipeline``:
+
+    sanitize URL -> normalize title -> content hash -> pre-parse URL
+
+Every stage is keyed on the fields it reads and memoized in its own LRU, so a
+context seen before (the same tab revisited, a replayed trace) costs a dict
+lookup per stage. Per-stage calls, cache hits, errors and time are kept in
+``stats()`` and exported as ``activity_enrichment_*`` metrics.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Hashable, Optional, Protocol, Sequence
+
+from new_core.metrics import REGISTRY
+from new_core.models import Event, content_hash, url_parts
+from new_core.ports import EventSource
+from new_logger.sanitization.url_sanitizer import sanitize_http_url
+
+
+ENRICH_SECONDS = REGISTRY.histogram(
+    "activity_enrichment_stage_seconds", "Time spent in one enrichment stage, cache hits included.", ("stage",)
+)
+ENRICH_CACHE_HITS = REGISTRY.counter(
+    "activity_enrichment_cache_hits", "Enrichment stage results served from the stage cache.", ("stage",)
+)
+ENRICH_ERRORS = REGISTRY.counter(
+    "activity_enrichment_errors", "Enrichment stage calls that raised; the event passes through unchanged.", ("stage",)
+)
+
+
+class EnrichmentStage(Protocol):
+    """
+    One step of the pipeline. ``compute`` returns the Event fields to replace
+    (an empty dict leaves the event as is) and must depend only on ``key(e)``,
+    which is what its results are cached under.
+    """
+
+    name: str
+    cacheable: bool
+
+    def key(self, e: Event) -> Hashable: ...
+
+    def compute(self, e: Event) -> dict[str, Any]: ...
+
+
+# -------- stages --------
+class SanitizeURLStage:
+    """Drop fragments, credentials and secret-looking query values from http(s) URLs."""
+
+    name = "sanitize_url"
+    cacheable = True
+
+    def key(self, e: Event) -> Hashable:
+        return e.url
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        url = sanitize_http_url(e.url)
+        return {"url": url} if url != e.url else {}
+
+
+# Zero-width, bidi and BOM characters that browsers and chat apps leave in titles.
+_INVISIBLE_RE = re.compile("[\u200b-\u200f\u202a-\u202e\u2060-\u2064\u2066-\u2069\ufeff]")
+_CONTROL_RE = re.compile("[\x00-\x1f\x7f-\x9f]")
+# "(3) Inbox" / "(12+) Slack": unread counters that split one context into many.
+_COUNTER_RE = re.compile(r"^\(\d+\+?\)\s+")
+
+
+class NormalizeTitleStage:
+    """
+    NFC-normalize the title, drop invisible and control characters and collapse
+    whitespace. With ``strip_counters`` a leading unread counter such as
+    ``(3) `` is removed too.
+    """
+
+    name = "normalize_title"
+    cacheable = True
+
+    def __init__(self, strip_counters: bool = False) -> None:
+        self.strip_counters = strip_counters
+
+    def key(self, e: Event) -> Hashable:
+        return e.title
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        title = normalize_title(e.title, strip_counters=self.strip_counters)
+        return {"title": title} if title != e.title else {}
+
+
+class HashStage:
+    """Fill ``content_hash`` so the classification memo and storage don't recompute it."""
+
+    name = "content_hash"
+    cacheable = True
+
+    def key(self, e: Event) -> Hashable:
+        return (e.app, e.title, e.url)
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        return {"content_hash": content_hash(e.app, e.title, e.url)}
+
+
+class DeviceStage:
+    """Stamp events that arrive without one with this machine's device id."""
+
+    name = "device"
+    cacheable = False
+
+    def __init__(self, device: str) -> None:
+        self.device = device
+
+    def key(self, e: Event) -> Hashable:
+        return e.device
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        return {} if e.device else {"device": self.device}
+
+
+class ParseURLStage:
+    """
+    Parse the URL into the host and path the rules match on. The result lives
+    in ``url_parts``' own cache, where the classifier picks it up; the event
+    is not changed.
+    """
+
+    name = "parse_url"
+    cacheable = False
+
+    def key(self, e: Event) -> Hashable:
+        return e.url
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        if e.url:
+            url_parts(e.url)
+        return {}
+
+
+def normalize_title(title: str, strip_counters: bool = False) -> str:
+    value = unicodedata.normalize("NFC", title or "")
+    value = _INVISIBLE_RE.sub("", value)
+    value = _CONTROL_RE.sub(" ", value)
+    value = " ".join(value.split())
+    if strip_counters:
+        value = _COUNTER_RE.sub("", value)
+    return value
+
+
+# -------- pipeline --------
+@dataclass
+class StageStats:
+    calls: int = 0
+    cache_hits: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return 1000.0 * self.seconds / self.calls if self.calls else 0.0
+
+
+class EnrichmentPipeline:
+    """
+    Runs events through ``stages`` in order, each with an LRU of up to
+    ``cache_size`` results. A stage that raises is counted and skipped for
+    that event, so enrichment never loses an event.
+    """
+
+    def __init__(self, stages: Sequence[EnrichmentStage], cache_size: int = 4096) -> None:
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"stage names must be unique: {names}")
+        self.stages = list(stages)
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._caches: dict[str, OrderedDict[Hashable, dict[str, Any]]] = {name: OrderedDict() for name in names}
+        self._stats = {name: StageStats() for name in names}
+
+    def enrich(self, e: Event) -> Event:
+        for stage in self.stages:
+            e = self._run_stage(stage, e)
+        return e
+
+    def stats(self) -> dict[str, StageStats]:
+        with self._lock:
+            return {name: replace(s) for name, s in self._stats.items()}
+
+    def clear_caches(self) -> None:
+        with self._lock:
+            for cache in self._caches.values():
+                cache.clear()
+
+    def _run_stage(self, stage: EnrichmentStage, e: Event) -> Event:
+        started = time.perf_counter()
+        updates: Optional[dict[str, Any]] = None
+        hit = False
+        failed = False
+        try:
+            key = stage.key(e)
+            if stage.cacheable:
+                updates = self._cached(stage.name, key)
+                hit = updates is not None
+            if updates is None:
+                updates = stage.compute(e)
+                if stage.cacheable:
+                    self._remember(stage.name, key, updates)
+            if updates:
+                e = replace(e, **updates)
+        except Exception as exc:
+            failed = True
+            print(f"[enrichment] stage {stage.name} failed: {exc}")
+        seconds = time.perf_counter() - started
+
+        ENRICH_SECONDS.labels(stage=stage.name).observe(seconds)
+        if hit:
+            ENRICH_CACHE_HITS.labels(stage=stage.name).inc()
+        if failed:
+            ENRICH_ERRORS.labels(stage=stage.name).inc()
+        with self._lock:
+            s = self._stats[stage.name]
+            s.calls += 1
+            s.cache_hits += hit
+            s.errors += failed
+            s.seconds += seconds
+        return e
+
+    def _cached(self, name: str, key: Hashable) -> Optional[dict[str, Any]]:
+        with self._lock:
+            cache = self._caches[name]
+            updates = cache.get(key)
+            if updates is not None:
+                cache.move_to_end(key)
+            return updates
+
+    def _remember(self, name: str, key: Hashable, updates: dict[str, Any]) -> None:
+        with self._lock:
+            cache = self._caches[name]
+            cache[key] = updates
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+
+def default_pipeline(
+    cache_size: int = 4096,
+    strip_title_counters: bool = False,
+    device: Optional[str] = None,
+) -> EnrichmentPipeline:
+    """Sanitize URL, normalize title, hash, pre-parse URL; with ``device``, stamp it first."""
+    stages: list[EnrichmentStage] = [] if device is None else [DeviceStage(device)]
+    stages += [
+        SanitizeURLStage(),
+        NormalizeTitleStage(strip_counters=strip_title_counters),
+        HashStage(),
+        ParseURLStage(),
+    ]
+    return EnrichmentPipeline(stages, cache_size=cache_size)
+
+
+class EnrichedEventSource:
+    """EventSource that runs another source's events through an EnrichmentPipeline."""
+
+    def __init__(self, source: EventSource, pipeline: Optional[EnrichmentPipeline] = None) -> None:
+        self.source = source
+        self.pipeline = pipeline if pipeline is not None else default_pipeline()
+
+    def start(self, emit: Callable[[Event], None]) -> None:
+        self.source.start(lambda e: emit(self.pipeline.enrich(e)))
+
+    def stop(self) -> None:
+        self.source.stop()
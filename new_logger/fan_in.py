@@ -0,0 +1,210 @@
+"""Composite EventSource that merges several sources into one timeline."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Optional, Sequence
+
+from new_core.models import Event
+from new_core.ports import EventSource
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """
+    One child source of a FanInEventSource. Where segments from different
+    sources overlap, the higher ``priority`` keeps the overlapping time.
+    """
+
+    name: str
+    source: EventSource
+    priority: int = 0
+
+
+class _Child:
+    def __init__(self, spec: SourceSpec) -> None:
+        self.spec = spec
+        self.watermark = float("-inf")  # end_ts of the latest event received
+        self.done = False
+        self.thread: Optional[threading.Thread] = None
+
+
+# Heap entries: (start_ts, -priority, seq, end_ts, event, child index)
+_Entry = tuple[float, int, int, float, Event, int]
+
+
+class FanInEventSource:
+    """
+    Runs each child source on its own thread and emits their events as one
+    non-overlapping timeline in start-time order.
+
+    A child's segments do not overlap each other, so once a child has emitted
+    a segment ending at ``t`` its later segments start at or after ``t``. The
+    watermark is the lowest such ``t`` over children still running; an event
+    is released once the watermark passes its end, when every segment that
+    could overlap it has arrived. Overlaps are then resolved by priority: the
+    lower-priority segment is trimmed or split around the higher one (equal
+    priorities: the earlier segment keeps the time).
+
+    A child that is quiet for a long time would hold the watermark back, so
+    with ``max_delay_seconds`` the watermark also advances to wall-clock
+    ``now - max_delay_seconds`` (for live sources, whose timestamps are epoch
+    seconds). Segments arriving behind the emitted timeline are counted as
+    ``late`` and trimmed to it. At most ``max_buffered`` events are held; beyond
+    that the earliest is released without waiting for the watermark.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[SourceSpec],
+        max_buffered: int = 1024,
+        max_delay_seconds: Optional[float] = None,
+        poll_seconds: float = 0.5,
+    ) -> None:
+        if not sources:
+            raise ValueError("FanInEventSource needs at least one source")
+        names = [spec.name for spec in sources]
+        if len(set(names)) != len(names):
+            raise ValueError(f"source names must be unique: {names}")
+        self._children = [_Child(spec) for spec in sources]
+        self.max_buffered = max_buffered
+        self.max_delay_seconds = max_delay_seconds
+        self.poll_seconds = poll_seconds
+        self._cond = threading.Condition()
+        self._heap: list[_Entry] = []
+        self._seq = itertools.count()
+        self._cursor = float("-inf")  # end of the emitted timeline
+        self._counts = {"received": 0, "emitted": 0, "trimmed": 0, "split": 0, "dropped": 0, "late": 0, "invalid": 0}
+        self._by_source = {spec.name: 0 for spec in sources}
+
+    # -------- EventSource --------
+    def start(self, emit: Callable[[Event], None]) -> None:
+        """Start every child and emit the merged events; returns once all children have finished."""
+        for idx, child in enumerate(self._children):
+            child.done = False
+            child.thread = threading.Thread(
+                target=self._run_child,
+                args=(idx,),
+                name=f"fan-in-{child.spec.name}",
+                daemon=True,
+            )
+            child.thread.start()
+
+        while True:
+            with self._cond:
+                ready = self._release()
+                finished = all(child.done for child in self._children) and not self._heap
+                if not ready and not finished:
+                    self._cond.wait(self.poll_seconds)
+                    ready = self._release()
+            for e in ready:
+                emit(e)
+            if finished:
+                return
+
+    def stop(self) -> None:
+        """Stop every child; ``start`` returns after emitting what they produced."""
+        for child in self._children:
+            try:
+                child.spec.source.stop()
+            except Exception as exc:
+                print(f"[fan-in] stopping {child.spec.name} failed: {exc}")
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {**self._counts, "buffered": len(self._heap), "by_source": dict(self._by_source)}
+
+    # -------- children --------
+    def _run_child(self, idx: int) -> None:
+        child = self._children[idx]
+        try:
+            child.spec.source.start(lambda e: self._receive(idx, e))
+        except Exception as exc:
+            print(f"[fan-in] source {child.spec.name} failed: {exc}")
+        finally:
+            with self._cond:
+                child.done = True
+                self._cond.notify_all()
+
+    def _receive(self, idx: int, e: Event) -> None:
+        with self._cond:
+            self._counts["received"] += 1
+            self._by_source[self._children[idx].spec.name] += 1
+            if e.end_ts is None or e.end_ts < e.start_ts:
+                self._counts["invalid"] += 1
+                return
+            if e.start_ts < self._cursor:
+                self._counts["late"] += 1
+            child = self._children[idx]
+            child.watermark = max(child.watermark, e.end_ts)
+            self._push(e, idx)
+            self._cond.notify_all()
+
+    # -------- merging (caller holds self._cond) --------
+    def _push(self, e: Event, idx: int) -> None:
+        priority = self._children[idx].spec.priority
+        heapq.heappush(self._heap, (e.start_ts, -priority, next(self._seq), e.end_ts, e, idx))
+
+    def _watermark(self) -> float:
+        running = [child.watermark for child in self._children if not child.done]
+        if not running:
+            return float("inf")
+        watermark = min(running)
+        if self.max_delay_seconds is not None:
+            watermark = max(watermark, time.time() - self.max_delay_seconds)
+        return watermark
+
+    def _release(self) -> list[Event]:
+        ready: list[Event] = []
+        watermark = self._watermark()
+        while self._heap:
+            start, neg_priority, _, end, e, idx = self._heap[0]
+            if end > watermark and len(self._heap) <= self.max_buffered:
+                break
+            heapq.heappop(self._heap)
+            piece = self._resolve(start, end, -neg_priority, e, idx)
+            if piece is not None:
+                ready.append(piece)
+        return ready
+
+    def _resolve(self, start: float, end: float, priority: int, e: Event, idx: int) -> Optional[Event]:
+        """
+        Return the part of ``e`` that belongs on the timeline now, pushing back
+        any part after a higher-priority segment still waiting in the heap.
+        """
+        if start < self._cursor:
+            # Covered by segments already emitted (earlier or higher-priority).
+            if end <= self._cursor:
+                self._counts["dropped"] += 1
+                return None
+            self._counts["trimmed"] += 1
+            start = self._cursor
+
+        # Earliest higher-priority segment overlapping [start, end).
+        blocker: Optional[_Entry] = None
+        for entry in self._heap:
+            if -entry[1] > priority and entry[0] < end and entry[3] > start:
+                if blocker is None or entry[0] < blocker[0]:
+                    blocker = entry
+
+        if blocker is not None:
+            blocker_start, blocker_end = blocker[0], blocker[3]
+            if blocker_end < end:
+                # Resume after the blocker; the remainder may be trimmed again later.
+                self._push(replace(e, start_ts=blocker_end), idx)
+                self._counts["split" if blocker_start > start else "trimmed"] += 1
+            else:
+                self._counts["trimmed" if blocker_start > start else "dropped"] += 1
+            if blocker_start <= start:
+                return None
+            end = blocker_start
+
+        if (start, end) != (e.start_ts, e.end_ts):
+            e = replace(e, start_ts=start, end_ts=end)
+        self._cursor = max(self._cursor, end)
+        self._counts["emitted"] += 1
+        return e
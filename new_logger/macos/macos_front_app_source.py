@@ -3,14 +3,14 @@ from __future__ import annotations
 import threading
 import time
 from typing import Callable, Optional, Tuple, Dict
-from urllib.parse import urlsplit
 from AppKit import NSWorkspace, NSAppleScript
 
 from new_core.models import Event
 from new_core.ports import EventSource, AppOverride
+from new_logger.capture_metrics import CAPTURE_POLLS, CAPTURE_SAMPLE_SECONDS, CAPTURE_SEGMENTS
 from new_logger.macos.macos_idle import make_idle_monitor
 from new_logger.macos.app_overrides import FirefoxOverride
-from new_logger.sanitization.url_sanitizer import sanitize_url
+from new_logger.sanitization.url_sanitizer import sanitize_http_url
 
 
 class MacOSFrontAppSourceAdaptive(EventSource):
@@ -66,17 +66,7 @@ class MacOSFrontAppSourceAdaptive(EventSource):
 
     @staticmethod
     def _sanitize_http_url(url: str) -> str:
-        value = (url or "").strip()
-        if not value:
-            return ""
-
-        try:
-            scheme = urlsplit(value).scheme.lower()
-            if scheme not in {"http", "https"}:
-                return value
-            return sanitize_url(value).sanitized_url
-        except Exception:
-            return value
+        return sanitize_http_url(url)
 
     def _key_changed(self, old_key: Tuple[str, str, str], new_key: Tuple[str, str, str]) -> bool:
         """Determines if the application state has shifted enough to trigger a new event."""
@@ -110,6 +100,7 @@ class MacOSFrontAppSourceAdaptive(EventSource):
         # print(event)
 
         self.emit(event)
+        CAPTURE_SEGMENTS.labels(source="macos").inc()
         
         # Reset state
         self._open_start_ts = None
@@ -122,19 +113,26 @@ class MacOSFrontAppSourceAdaptive(EventSource):
         idle_monitor = make_idle_monitor(user_idle_seconds=int(self.IDLE_AFTER))
         
         print("MacOS Source Started. Monitoring frontmost app...")
+        idle_polls = CAPTURE_POLLS.labels(source="macos", state="idle")
+        empty_polls = CAPTURE_POLLS.labels(source="macos", state="empty")
+        active_polls = CAPTURE_POLLS.labels(source="macos", state="active")
+        sample_seconds = CAPTURE_SAMPLE_SECONDS.labels(source="macos")
 
         try:
             while not self.stop_signal.is_set():
                 # if idle, poll slowly
                 if idle_monitor.is_idle():
+                    idle_polls.inc()
                     if self._prev_key:
                         self._flush_open_segment()
                     self.stop_signal.wait(self.IDLE_INTERVAL)
                     continue
 
                 # 1. Capture Current State
+                sample_started = time.perf_counter()
                 active_app = self.workspace.frontmostApplication()
                 if not active_app:
+                    empty_polls.inc()
                     self.stop_signal.wait(self.POLL_INTERVAL)
                     continue
 
@@ -149,12 +147,15 @@ class MacOSFrontAppSourceAdaptive(EventSource):
                     url = parts[1] if len(parts) > 1 else ""
                     # mostly triggered by closing one app without clicking or focusing on another
                     if title == "frontProcess Error":
+                        empty_polls.inc()
                         self.stop_signal.wait(self.POLL_INTERVAL)
                         continue
 
                 # 3. Apply Title and URL Override for specific apps
                 title, url = self._apply_override(app_name, title, url)
                 url = self._sanitize_http_url(url)
+                sample_seconds.observe(time.perf_counter() - sample_started)
+                active_polls.inc()
 
                 current_key = (app_name, title, url)
                 ## DEBUG ##
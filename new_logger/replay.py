@@ -0,0 +1,276 @@
+"""
+Replay recorded history through the EventSource protocol.
+
+``ReplayEventSource`` emits finalized events read from the legacy monthly
+Parquet logs, a new-stack SQLite database or a JSONL trace, either as fast as
+possible or paced at real time or a multiple of it. It runs anywhere, so the
+AppService pipeline can be backfilled or load-tested off macOS:
+
+    python -m new_logger.replay logs/ --db data/activity.sqlite3
+    python -m new_logger.replay trace.jsonl --db /tmp/bench.sqlite3 --speed 60x
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from new_core.models import Event
+
+
+PARQUET_GLOB = "activity_*.parquet"
+SQLITE_SUFFIXES = (".sqlite3", ".sqlite", ".db")
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+
+class ReplayEventSource:
+    """
+    EventSource that emits recorded events in the order the history yields them.
+
+    ``speed=None`` emits as fast as AppService accepts them; ``speed=1.0``
+    reproduces the original pacing, emitting each event at its ``end_ts`` the
+    way a live source finalizes segments; ``speed=60.0`` plays an hour per
+    minute. ``start`` blocks until the history is exhausted or ``stop`` is
+    called, like the live macOS source.
+    """
+
+    def __init__(self, events: Iterable[Event] | str | Path, speed: Optional[float] = None) -> None:
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for as fast as possible")
+        self._events = open_history(events) if isinstance(events, (str, Path)) else events
+        self.speed = speed
+        self.emitted = 0
+        self.stop_signal = threading.Event()
+
+    def start(self, emit: Callable[[Event], None]) -> None:
+        self.stop_signal.clear()
+        wall_start: Optional[float] = None
+        trace_start = 0.0
+        for e in self._events:
+            if self.stop_signal.is_set():
+                break
+            if self.speed is not None:
+                emit_at = e.end_ts if e.end_ts is not None else e.start_ts
+                if wall_start is None:
+                    wall_start, trace_start = time.monotonic(), emit_at
+                delay = wall_start + (emit_at - trace_start) / self.speed - time.monotonic()
+                if delay > 0 and self.stop_signal.wait(delay):
+                    break
+            emit(e)
+            self.emitted += 1
+
+    def stop(self) -> None:
+        self.stop_signal.set()
+
+
+# -------- history readers --------
+def open_history(path: str | Path) -> Iterator[Event]:
+    """
+    Events from ``path``, picked by its type: a directory or ``.parquet`` file
+    of legacy logs, a SQLite database, or a JSONL file.
+    """
+    path = Path(path)
+    if path.is_dir() or path.suffix == ".parquet":
+        return iter_parquet_events(path)
+    if path.suffix in SQLITE_SUFFIXES:
+        return iter_sqlite_events(path)
+    if path.suffix in JSONL_SUFFIXES:
+        return iter_jsonl_events(path)
+    raise ValueError(f"don't know how to replay {path} (expected a log directory, .parquet, .sqlite3 or .jsonl)")
+
+
+def iter_parquet_events(path: str | Path) -> Iterator[Event]:
+    """
+    Sessions from legacy Parquet logs, a single file or every
+    ``activity_*.parquet`` in a directory. Files of the same month (one per
+    device) are merged and each month is sorted by start time.
+
+    Legacy timestamps are naive local time, as written by ``LogBuffer``. The
+    device comes from the ``device_id`` column, or the file name without one.
+    """
+    import pandas as pd
+
+    path = Path(path)
+    files = [path] if path.is_file() else sorted(path.glob(PARQUET_GLOB))
+    by_month: dict[str, list[Path]] = {}
+    for file_path in files:
+        # activity_<year>_<month>_<device>.parquet
+        parts = file_path.stem.split("_")
+        by_month.setdefault("_".join(parts[1:3]), []).append(file_path)
+
+    for month in sorted(by_month):
+        frames = []
+        for file_path in by_month[month]:
+            frame = pd.read_parquet(file_path)
+            if "device_id" not in frame.columns:
+                frame["device_id"] = "_".join(file_path.stem.split("_")[3:])
+            frames.append(frame)
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if df.empty:
+            continue
+        df = df.sort_values("start_time", kind="stable")
+        urls = df["url"] if "url" in df.columns else [None] * len(df)
+        rows = zip(df["start_time"], df["end_time"], df["app"], df["title"], urls, df["device_id"])
+        for start, end, app, title, url, device in rows:
+            if pd.isna(start) or pd.isna(end):
+                continue
+            yield Event(
+                start_ts=_local_timestamp(start),
+                end_ts=_local_timestamp(end),
+                app=_text(app),
+                title=_text(title),
+                url=_text(url),
+                device=_text(device),
+            )
+
+
+def iter_sqlite_events(db_path: str | Path, batch_size: int = 5000) -> Iterator[Event]:
+    """Raw events from a new-stack database, opened read-only, in start-time order."""
+    conn = sqlite3.connect(f"file:{Path(db_path)}?mode=ro", uri=True)
+    try:
+        last: tuple[float, int] = (float("-inf"), 0)
+        while True:
+            rows = conn.execute(
+                """
+                SELECT start_ts, id, end_ts, app, title, url, content_hash, device
+                FROM events
+                WHERE (start_ts, id) > (?, ?)
+                ORDER BY start_ts, id
+                LIMIT ?
+                """,
+                (last[0], last[1], batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for start_ts, _, end_ts, app, title, url, digest, device in rows:
+                yield Event(
+                    start_ts=start_ts,
+                    end_ts=end_ts,
+                    app=app or "",
+                    title=title or "",
+                    url=url or "",
+                    content_hash=digest,
+                    device=device or "",
+                )
+            last = (rows[-1][0], rows[-1][1])
+    finally:
+        conn.close()
+
+
+def iter_jsonl_events(path: str | Path) -> Iterator[Event]:
+    """
+    Events from a JSONL file, one object per line with ``app``, ``title``,
+    ``url``, an optional ``device`` and either epoch-second
+    ``start_ts``/``end_ts`` or ISO-8601 ``start_time``/``end_time`` (naive
+    values are local time). Lines are replayed in file order.
+    """
+    with Path(path).open(encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                yield Event(
+                    start_ts=_json_timestamp(row, "start_ts", "start_time"),
+                    end_ts=_json_timestamp(row, "end_ts", "end_time"),
+                    app=_text(row.get("app")),
+                    title=_text(row.get("title")),
+                    url=_text(row.get("url")),
+                    device=_text(row.get("device")),
+                )
+            except (ValueError, KeyError, TypeError) as exc:
+                raise ValueError(f"{path}:{line_no}: {exc}") from exc
+
+
+def _json_timestamp(row: dict, epoch_key: str, iso_key: str) -> float:
+    if row.get(epoch_key) is not None:
+        return float(row[epoch_key])
+    return datetime.fromisoformat(row[iso_key]).timestamp()
+
+
+def _local_timestamp(value) -> float:
+    # pandas Timestamp.timestamp() reads naive values as UTC; datetime's reads them as local.
+    return value.to_pydatetime().timestamp()
+
+
+def _text(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+# -------- command line --------
+def parse_speed(text: str) -> Optional[float]:
+    """``max`` -> None, ``realtime`` -> 1.0, ``60x`` or ``60`` -> 60.0."""
+    text = text.strip().lower()
+    if text == "max":
+        return None
+    if text == "realtime":
+        return 1.0
+    return float(text[:-1] if text.endswith("x") else text)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay recorded history through AppService.")
+    parser.add_argument("history", type=Path, help="Legacy log directory or .parquet, .sqlite3 or .jsonl file.")
+    parser.add_argument("--db", type=Path, required=True, help="SQLite database to write.")
+    parser.add_argument("--speed", type=parse_speed, default=None, help="max (default), realtime, or N / Nx.")
+    parser.add_argument("--no-classify", action="store_true", help="Store events without classifying them.")
+    parser.add_argument("--commit-batch", type=int, default=500, help="Events per transaction (group commit).")
+    parser.add_argument(
+        "--layout", choices=("wide", "normalized"), help="Schema layout of a new --db (default: wide)."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from new_classifiers.rules import RulesClassifier
+    from new_core.appservice import AppService, AppServiceConfig
+    from new_storage.sqlite import SQLiteStorage
+
+    args = parse_args(argv)
+    if args.history.resolve() == args.db.resolve():
+        raise SystemExit("replaying a database into itself would duplicate every event")
+
+    source = ReplayEventSource(args.history, speed=args.speed)
+    classifier = None if args.no_classify else RulesClassifier()
+    storage = SQLiteStorage(
+        args.db,
+        rollup_engine_version=None if classifier is None else classifier.engine_version,
+        layout=args.layout,
+    )
+    service = AppService(
+        source=source,
+        storage=storage,
+        classifier=classifier,
+        context_store=storage,
+        config=AppServiceConfig(
+            ingest_mode="queued",
+            commit_max_events=max(1, args.commit_batch),
+            drain_timeout_seconds=600.0,
+        ),
+    )
+    started = time.perf_counter()
+    try:
+        service.start()
+    except KeyboardInterrupt:
+        print("[replay] interrupted")
+    finally:
+        service.stop()
+        storage.close()
+    seconds = time.perf_counter() - started
+    rate = source.emitted / seconds if seconds > 0 else 0.0
+    print(f"[replay] {source.emitted} events in {seconds:.1f}s ({rate:,.0f} events/s)")
+    print(f"[replay] ingestion queue: {service.queue_stats()}")
+
+
+if __name__ == "__main__":
+    main()
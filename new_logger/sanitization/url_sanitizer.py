@@ -110,6 +110,24 @@ def sanitize_url(url: str) -> SanitizeResult:
     )
 
 
+def sanitize_http_url(url: str) -> str:
+    """
+    Sanitized form of an http(s) URL; other schemes (file:, about:, ...) and
+    unparseable values are returned stripped but otherwise unchanged.
+    """
+    value = (url or "").strip()
+    if not value:
+        return ""
+
+    try:
+        scheme = urlsplit(value).scheme.lower()
+        if scheme not in {"http", "https"}:
+            return value
+        return sanitize_url(value).sanitized_url
+    except Exception:
+        return value
+
+
 # -----------------------------
 # Helpers
 # -----------------------------
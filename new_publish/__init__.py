@@ -0,0 +1 @@
+"""Publisher adapters that push storage changes to the UI."""
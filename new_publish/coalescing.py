@@ -0,0 +1,229 @@
+"""In-process pub/sub publisher that batches change notifications."""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+
+# Looks up (start_ts, end_ts) for event ids; ids that no longer exist are left out.
+SpanLookup = Callable[[Iterable[int]], dict[int, tuple[float, float]]]
+Subscriber = Callable[["ChangeSet"], None]
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """
+    Everything that changed during one coalescing window.
+
+    ``ranges`` are the merged ``(start_ts, end_ts)`` spans of all affected
+    events, so a view only needs to reload those time ranges.
+    """
+
+    seq: int
+    recorded: tuple[int, ...] = ()
+    labeled: tuple[int, ...] = ()
+    overridden: tuple[int, ...] = ()
+    ranges: tuple[tuple[float, float], ...] = ()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "recorded": list(self.recorded),
+            "labeled": list(self.labeled),
+            "overridden": list(self.overridden),
+            "ranges": [list(span) for span in self.ranges],
+        }
+
+
+@dataclass
+class _Pending:
+    recorded: set[int] = field(default_factory=set)
+    labeled: set[int] = field(default_factory=set)
+    overridden: set[int] = field(default_factory=set)
+    first_at: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.recorded) + len(self.labeled) + len(self.overridden)
+
+
+class CoalescingPublisher:
+    """
+    Publisher that collects notifications and delivers them as ChangeSets.
+
+    The first notification after a quiet period opens a window of
+    ``window_seconds``; everything that arrives until it closes (or until
+    ``max_pending`` notifications are waiting) is delivered as one ChangeSet,
+    with repeated ids collapsed. Delivery runs on a background thread, so the
+    Publisher methods only take a lock and return.
+
+    The last ``history`` change sets are kept so reconnecting subscribers can
+    catch up with ``changes_since``. ``seq`` restarts at 0 in every process;
+    ``epoch`` identifies the process, so ids from before a restart can be told
+    apart.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 0.25,
+        max_pending: int = 1000,
+        span_lookup: Optional[SpanLookup] = None,
+        history: int = 256,
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.max_pending = max_pending
+        self._span_lookup = span_lookup
+        self._cond = threading.Condition()
+        self._deliver_lock = threading.Lock()
+        self._pending = _Pending()
+        self._subscribers: list[Subscriber] = []
+        self._history: deque[ChangeSet] = deque(maxlen=history)
+        self._seq = 0
+        self.epoch = uuid.uuid4().hex[:12]
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    # -------- Publisher protocol --------
+    def event_recorded(self, event_id: int) -> None:
+        self._note("recorded", event_id)
+
+    def label_updated(self, event_id: int) -> None:
+        self._note("labeled", event_id)
+
+    def override_updated(self, event_id: int) -> None:
+        self._note("overridden", event_id)
+
+    # -------- subscribers --------
+    def subscribe(self, subscriber: Subscriber) -> Callable[[], None]:
+        """
+        Call ``subscriber(change_set)`` for every delivered ChangeSet, on the
+        delivery thread. Returns a function that unsubscribes.
+        """
+        with self._cond:
+            self._subscribers.append(subscriber)
+
+        def unsubscribe() -> None:
+            with self._cond:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    @property
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    def changes_since(self, seq: int) -> Optional[list[ChangeSet]]:
+        """
+        Change sets delivered after ``seq``, or None if some of them are no
+        longer in the history, or ``seq`` is ahead of this publisher (it came
+        from an earlier process); the caller should then reload everything.
+        """
+        with self._cond:
+            history = list(self._history)
+            current = self._seq
+        if seq > current:
+            return None
+        if seq == current:
+            return []
+        missed = [cs for cs in history if cs.seq > seq]
+        if not missed or missed[0].seq != seq + 1:
+            return None
+        return missed
+
+    def flush(self) -> Optional[ChangeSet]:
+        """Deliver whatever is pending now, on the calling thread."""
+        with self._deliver_lock:
+            with self._cond:
+                pending = self._take()
+                if pending is None:
+                    return None
+                self._seq += 1
+                seq = self._seq
+            change_set = self._build(seq, pending)
+            with self._cond:
+                self._history.append(change_set)
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                try:
+                    subscriber(change_set)
+                except Exception as exc:
+                    print(f"[publisher] subscriber error: {exc}")
+            return change_set
+
+    def close(self) -> None:
+        """Stop the delivery thread after delivering what is pending."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5.0)
+        self.flush()
+
+    # -------- coalescing --------
+    def _note(self, kind: str, event_id: int) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            pending = self._pending
+            if not len(pending):
+                pending.first_at = time.monotonic()
+            getattr(pending, kind).add(event_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="coalescing-publisher", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not len(self._pending) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                deadline = self._pending.first_at + self.window_seconds
+                while not self._closed and len(self._pending) < self.max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not len(self._pending):
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+    def _take(self) -> Optional[_Pending]:
+        if not len(self._pending):
+            return None
+        pending, self._pending = self._pending, _Pending()
+        return pending
+
+    def _build(self, seq: int, pending: _Pending) -> ChangeSet:
+        ranges: tuple[tuple[float, float], ...] = ()
+        if self._span_lookup is not None:
+            ids = pending.recorded | pending.labeled | pending.overridden
+            try:
+                ranges = merge_spans(self._span_lookup(sorted(ids)).values())
+            except Exception as exc:
+                print(f"[publisher] span lookup failed: {exc}")
+        return ChangeSet(
+            seq=seq,
+            recorded=tuple(sorted(pending.recorded)),
+            labeled=tuple(sorted(pending.labeled)),
+            overridden=tuple(sorted(pending.overridden)),
+            ranges=ranges,
+        )
+
+
+def merge_spans(spans: Iterable[tuple[float, float]]) -> tuple[tuple[float, float], ...]:
+    """Merge overlapping or touching ``(start, end)`` spans, sorted by start."""
+    merged: list[list[float]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return tuple((start, end) for start, end in merged)
@@ -0,0 +1,191 @@
+"""Server-Sent Events endpoint that streams CoalescingPublisher change sets."""
+
+from __future__ import annotations
+
+import json
+import queue
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Sequence
+
+from .coalescing import ChangeSet, CoalescingPublisher
+
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+_RESYNC = object()
+
+
+class _IPv6HTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_INET6
+
+
+def loopback_http_server(host: str, port: int, handler: type[BaseHTTPRequestHandler]) -> ThreadingHTTPServer:
+    """A ThreadingHTTPServer bound to ``host``, one of ``LOOPBACK_HOSTS``, over IPv6 for ``::1``."""
+    server_class = _IPv6HTTPServer if host == "::1" else ThreadingHTTPServer
+    httpd = server_class((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def server_url(httpd: ThreadingHTTPServer, path: str) -> str:
+    host, port = httpd.server_address[:2]
+    if httpd.address_family == socket.AF_INET6:
+        host = f"[{host}]"
+    return f"http://{host}:{port}{path}"
+
+
+class SSEServer:
+    """
+    Serves ``GET /events`` as a ``text/event-stream`` on a loopback address.
+
+    Each change set is sent as ``event: changes`` with ``<epoch>-<seq>`` as the
+    event id and its ``to_dict()`` as JSON data. A client that reconnects with
+    ``Last-Event-ID`` receives the change sets it missed. When that is
+    impossible (the id is from another publisher process, or too old), or a
+    client falls more than ``client_queue_size`` change sets behind, it
+    receives ``event: resync`` and should reload everything. Comment lines are sent every ``keepalive_seconds`` so idle
+    connections stay open.
+    """
+
+    def __init__(
+        self,
+        publisher: CoalescingPublisher,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        client_queue_size: int = 256,
+        keepalive_seconds: float = 15.0,
+        allow_origins: Sequence[str] = (),
+    ) -> None:
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"SSE endpoint only binds to loopback addresses, not {host!r}")
+        self.publisher = publisher
+        self.client_queue_size = client_queue_size
+        self.keepalive_seconds = keepalive_seconds
+        self.allow_origins = tuple(allow_origins)
+        self._stopping = threading.Event()
+        self._httpd = loopback_http_server(host, port, _make_handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return int(self._httpd.server_address[1])
+
+    @property
+    def url(self) -> str:
+        return server_url(self._httpd, "/events")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="sse-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+
+
+def _make_handler(server: SSEServer) -> type[BaseHTTPRequestHandler]:
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/events":
+                self.send_error(404)
+                return
+
+            # Subscribe before reading the history so nothing falls in between.
+            inbox: queue.Queue = queue.Queue(maxsize=server.client_queue_size)
+
+            def deliver(change_set: ChangeSet) -> None:
+                try:
+                    inbox.put_nowait(change_set)
+                except queue.Full:
+                    _replace_with_resync(inbox)
+
+            unsubscribe = server.publisher.subscribe(deliver)
+            # Read once: anything published from here on is already in the inbox.
+            current = server.publisher.last_seq
+            try:
+                self._send_headers(current)
+                last_seq = self._replay(current)
+                while not server._stopping.is_set():
+                    try:
+                        item = inbox.get(timeout=server.keepalive_seconds)
+                    except queue.Empty:
+                        self._write(": keepalive\n\n")
+                        continue
+                    if item is _RESYNC:
+                        self._write("event: resync\ndata: {}\n\n")
+                        continue
+                    if item.seq <= last_seq:
+                        continue  # already replayed
+                    last_seq = item.seq
+                    self._send_change_set(item)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                unsubscribe()
+                self.close_connection = True
+
+        def _send_headers(self, current: int) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "keep-alive")
+            origin = self.headers.get("Origin")
+            if origin and origin in server.allow_origins:
+                self.send_header("Access-Control-Allow-Origin", origin)
+            self.end_headers()
+            self._write(f"retry: 2000\n: connected, seq {current}\n\n")
+
+        def _replay(self, current: int) -> int:
+            last_event_id = self.headers.get("Last-Event-ID")
+            if last_event_id is None:
+                return current
+            since = _parse_event_id(last_event_id, server.publisher.epoch)
+            missed = server.publisher.changes_since(since) if since is not None else None
+            if missed is None:
+                self._write("event: resync\ndata: {}\n\n")
+                return current
+            for change_set in missed:
+                self._send_change_set(change_set)
+            return missed[-1].seq if missed else since
+
+        def _send_change_set(self, change_set: ChangeSet) -> None:
+            data = json.dumps(change_set.to_dict(), separators=(",", ":"))
+            self._write(f"id: {server.publisher.epoch}-{change_set.seq}\nevent: changes\ndata: {data}\n\n")
+
+        def _write(self, text: str) -> None:
+            self.wfile.write(text.encode("utf-8"))
+            self.wfile.flush()
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return _Handler
+
+
+def _parse_event_id(event_id: str, epoch: str) -> Optional[int]:
+    """The seq in ``<epoch>-<seq>``, or None if it is malformed or from another epoch."""
+    event_epoch, _, seq = event_id.strip().rpartition("-")
+    if event_epoch != epoch or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+def _replace_with_resync(inbox: queue.Queue) -> None:
+    """Drop a slow client's backlog and tell it to reload instead."""
+    while True:
+        try:
+            inbox.get_nowait()
+        except queue.Empty:
+            break
+    try:
+        inbox.put_nowait(_RESYNC)
+    except queue.Full:
+        pass
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+from new_core.models import Event, content_hash
+from new_storage.sqlite import SQLiteStorage
+
+
+def _events(count: int) -> Iterator[Event]:
+    apps = ["Visual Studio Code", "Slack", "Terminal", "Finder", "Firefox"]
+    for i in range(count):
+        app = apps[i % len(apps)]
+        title = f"window {i % 5000}"
+        url = f"https://example.com/page/{i % 20000}" if app == "Firefox" else ""
+        yield Event(
+            start_ts=1_700_000_000.0 + 5.0 * i,
+            end_ts=1_700_000_000.0 + 5.0 * i + 4.0,
+            app=app,
+            title=title,
+            url=url,
+            content_hash=content_hash(app, title, url),
+        )
+
+
+def _run(db_path: Path, count: int, load: Callable[[SQLiteStorage, int], None], layout: str) -> tuple[float, int]:
+    storage = SQLiteStorage(db_path, layout=layout)
+    started = time.perf_counter()
+    load(storage, count)
+    seconds = time.perf_counter() - started
+    storage._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    storage.close()
+    return seconds, db_path.stat().st_size
+
+
+def _per_event(storage: SQLiteStorage, count: int) -> None:
+    for e in _events(count):
+        storage.insert_event(e)
+
+
+def _batched(storage: SQLiteStorage, count: int) -> None:
+    storage.insert_events(_events(count))
+
+
+def _bulk_load(storage: SQLiteStorage, count: int) -> None:
+    with storage.bulk_load():
+        storage.insert_events(_events(count))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare insert_event with insert_events and bulk_load.")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument(
+        "--per-event", type=int, default=20_000, help="events for the commit-per-event baseline (it is slow)"
+    )
+    parser.add_argument("--layout", choices=("wide", "normalized"), default="wide")
+    args = parser.parse_args()
+
+    runs = [
+        ("insert_event, commit each", min(args.per_event, args.events), _per_event),
+        ("insert_events", args.events, _batched),
+        ("insert_events + bulk_load", args.events, _bulk_load),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        print(f"{args.layout} layout")
+        for i, (name, count, load) in enumerate(runs):
+            seconds, size = _run(Path(tmp) / f"run{i}.sqlite3", count, load, args.layout)
+            rate = count / seconds
+            baseline = baseline or rate
+            print(
+                f"{name:28s} {count:>9,} events {seconds:8.2f} s  {rate:10,.0f} events/s  "
+                f"({rate / baseline:6.1f}x)  {size / 2**20:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from new_classifiers.rules import RulesClassifier
+from new_core.models import Event
+
+
+# (app, url) pairs; titles vary per row so raw rows rarely repeat.
+CONTEXTS = [
+    ("Visual Studio Code", ""),
+    ("Slack", ""),
+    ("Firefox", "https://www.google.com/search?q={n}"),
+    ("Firefox", "https://github.com/org/repo/pull/{n}"),
+    ("Google Chrome", "https://www.youtube.com/watch?v={n}"),
+    ("Google Chrome", "https://docs.python.org/3/library/{n}.html"),
+    ("Safari", "https://unknown{n}.example/page"),
+    ("Terminal", ""),
+]
+
+
+def _events(count: int, seed: int) -> list[Event]:
+    rng = random.Random(seed)
+    events = []
+    for i in range(count):
+        app, url = rng.choice(CONTEXTS)
+        n = rng.randrange(500)
+        events.append(
+            Event(start_ts=float(i), end_ts=float(i) + 1.0, app=app, title=f"window {n}", url=url.format(n=n))
+        )
+    return events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-event and batched rules classification.")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    classifier = RulesClassifier()
+    events = _events(args.events, args.seed)
+
+    started = time.perf_counter()
+    single = [classifier.classify(e) for e in events]
+    single_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = classifier.classify_many(events)
+    batched_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = classifier.classify_columns(
+        [e.app for e in events], [e.title for e in events], [e.url for e in events]
+    )
+    columns_s = time.perf_counter() - started
+
+    assert [r.category_id for r in single] == [r.category_id for r in batched]
+    assert list(columns["category_id"]) == [r.category_id for r in single]
+    contexts = int(columns["context_index"].max()) + 1 if len(events) else 0
+
+    print(f"{len(events)} events, {contexts} unique contexts")
+    print(f"classify() per event   {single_s:8.3f} s")
+    print(f"classify_many()        {batched_s:8.3f} s  ({single_s / batched_s:5.1f}x)")
+    print(f"classify_columns()     {columns_s:8.3f} s  ({single_s / columns_s:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from new_classifiers.rules import RulesClassifier
+from new_core.appservice import AppService, AppServiceConfig
+from new_core.models import Event
+from new_storage.sqlite import SQLiteStorage
+
+
+class _ListSource:
+    """Emits a prepared list of events as fast as AppService accepts them."""
+
+    def __init__(self, events: list[Event]) -> None:
+        self.events = events
+        self.emit: Optional[Callable[[Event], None]] = None
+
+    def start(self, emit: Callable[[Event], None]) -> None:
+        for e in self.events:
+            emit(e)
+
+    def stop(self) -> None:
+        pass
+
+
+def _events(count: int) -> list[Event]:
+    apps = ["Visual Studio Code", "Slack", "Terminal", "Finder"]
+    return [
+        Event(start_ts=float(i), end_ts=float(i) + 1.0, app=apps[i % len(apps)], title=f"window {i % 300}")
+        for i in range(count)
+    ]
+
+
+def _run(db_path: Path, events: list[Event], config: AppServiceConfig) -> tuple[float, dict]:
+    storage = SQLiteStorage(db_path)
+    service = AppService(
+        source=_ListSource(events),
+        storage=storage,
+        classifier=RulesClassifier(),
+        config=config,
+        context_store=storage,
+    )
+    started = time.perf_counter()
+    service.start()
+    service.stop()
+    seconds = time.perf_counter() - started
+    storage.close()
+    return seconds, service.queue_stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-event commits with group commit.")
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument("--batch", type=int, default=256, help="commit_max_events for the batched run")
+    args = parser.parse_args()
+
+    events = _events(args.events)
+    runs = [
+        ("sync, commit per write", AppServiceConfig()),
+        ("queued, commit per write", AppServiceConfig(ingest_mode="queued", drain_timeout_seconds=600)),
+        (
+            f"queued, group commit {args.batch}",
+            AppServiceConfig(ingest_mode="queued", commit_max_events=args.batch, drain_timeout_seconds=600),
+        ),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{len(events)} events")
+        baseline = None
+        for i, (name, config) in enumerate(runs):
+            seconds, stats = _run(Path(tmp) / f"run{i}.sqlite3", events, config)
+            rate = len(events) / seconds
+            baseline = baseline or rate
+            batches = f"{stats['batches']} batches" if stats["batches"] else ""
+            print(f"{name:28s} {seconds:8.3f} s  {rate:10,.0f} events/s  ({rate / baseline:5.1f}x)  {batches}")
+
+
+if __name__ == "__main__":
+    main()
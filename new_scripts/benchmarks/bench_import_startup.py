@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Each snippet runs in a fresh interpreter and prints elapsed milliseconds.
+SNIPPETS = {
+    "import logger.categorize": (
+        "import time; t = time.perf_counter(); import logger.categorize; "
+        "print((time.perf_counter() - t) * 1000)"
+    ),
+    "import logger.ai_callback": (
+        "import time; t = time.perf_counter(); import logger.ai_callback; "
+        "print((time.perf_counter() - t) * 1000)"
+    ),
+    "import + first categorize()": (
+        "import time; t = time.perf_counter(); from logger.categorize import categorize; "
+        "categorize('Code', 'main.py', ''); print((time.perf_counter() - t) * 1000)"
+    ),
+    "import openai (eager cost avoided)": (
+        "import time; t = time.perf_counter(); import openai; "
+        "print((time.perf_counter() - t) * 1000)"
+    ),
+}
+
+
+def _run(snippet: str) -> float:
+    out = subprocess.check_output([sys.executable, "-c", snippet], cwd=ROOT, text=True)
+    return float(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure cold import time of the classification modules."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement.")
+    args = parser.parse_args()
+
+    loaded = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            "import sys, logger.parquet_writer, logger.categorize; "
+            "print('openai' in sys.modules, logger.categorize._LOADED)",
+        ],
+        cwd=ROOT,
+        text=True,
+    ).split()
+    print(f"after `import logger.parquet_writer`: openai imported={loaded[0]} rules loaded={loaded[1]}")
+
+    for label, snippet in SNIPPETS.items():
+        try:
+            samples = [_run(snippet) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError:
+            print(f"{label:<40} unavailable")
+            continue
+        print(f"{label:<40} median {statistics.median(samples):8.2f} ms  min {min(samples):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from new_classifiers.patterns import PatternSet
+
+
+WORDS = [
+    "jira", "confluence", "sprint", "invoice", "budget", "roadmap", "standup", "review", "design",
+    "figma", "notion", "ticket", "release", "deploy", "incident", "oncall", "metrics", "dashboard",
+]
+
+
+def _patterns(count: int, rng: random.Random) -> list[tuple[str, str]]:
+    patterns = []
+    for i in range(count):
+        word = f"{rng.choice(WORDS)}{i}"
+        shape = i % 3
+        if shape == 0:
+            patterns.append(("regex", rf"\b{word}\b"))
+        elif shape == 1:
+            patterns.append(("regex", rf"{word}-\d+"))
+        else:
+            patterns.append(("glob", f"*{word}*"))
+    return patterns
+
+
+def _titles(count: int, n_patterns: int, rng: random.Random) -> list[str]:
+    titles = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(6)]
+        if rng.random() < 0.3:
+            words.append(f"{rng.choice(WORDS)}{rng.randrange(n_patterns)}")
+        titles.append(" ".join(words) + " - Mozilla Firefox")
+    return titles
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare one-pass pattern matching with per-pattern re.search.")
+    parser.add_argument("--patterns", type=int, default=5000)
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    specs = _patterns(args.patterns, rng)
+    titles = _titles(args.titles, args.patterns, rng)
+
+    started = time.perf_counter()
+    pattern_set = PatternSet((kind, source, i) for i, (kind, source) in enumerate(specs))
+    compile_s = time.perf_counter() - started
+
+    import fnmatch
+
+    compiled = [
+        re.compile(source if kind == "regex" else fnmatch.translate(source), re.IGNORECASE)
+        for kind, source in specs
+    ]
+
+    def naive(title: str):
+        lowered = title.lower()
+        for i, (spec, regex) in enumerate(zip(specs, compiled)):
+            hit = regex.search(title) if spec[0] == "regex" else regex.match(lowered)
+            if hit:
+                return i
+        return None
+
+    started = time.perf_counter()
+    cold = [pattern_set.match(t) for t in titles]
+    cold_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    warm = [pattern_set.match(t) for t in titles]
+    warm_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [naive(t) for t in titles]
+    naive_s = time.perf_counter() - started
+
+    assert cold == warm == expected
+    per = 1_000_000 / len(titles)
+    print(f"{len(specs)} patterns, {len(titles)} titles, {sum(m is not None for m in warm)} matched")
+    print(f"compile PatternSet            {compile_s * 1000:9.1f} ms")
+    print(f"PatternSet, cold DFA cache    {cold_s * per:9.1f} us/title")
+    print(f"PatternSet, warm DFA cache    {warm_s * per:9.1f} us/title")
+    print(f"re.search per pattern         {naive_s * per:9.1f} us/title")
+
+
+if __name__ == "__main__":
+    main()
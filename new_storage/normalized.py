@@ -0,0 +1,160 @@
+"""
+Normalized events layout for SQLiteStorage.
+
+Instead of repeating the app, title and URL text on every row, events are
+stored in ``event_facts`` with integer keys into the ``apps``, ``titles`` and
+``urls`` dimension tables (URLs also point at their host in ``hosts``). An
+``events`` view joins them back into the wide shape, so every query written
+against ``events`` keeps working, and adds ``app_id``, ``url_id``,
+``host_id`` and ``host`` for grouping on integers.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from collections import OrderedDict
+from typing import Optional
+
+from new_core.models import Event, url_parts
+
+
+LAYOUTS = ("wide", "normalized")
+FACTS_TABLE = "event_facts"
+
+NORMALIZED_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS apps (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS titles (
+        id INTEGER PRIMARY KEY,
+        text TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS hosts (
+        id INTEGER PRIMARY KEY,
+        host TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS urls (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE,
+        host_id INTEGER NOT NULL REFERENCES hosts(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS event_facts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        start_ts REAL NOT NULL,
+        end_ts REAL NOT NULL,
+        app_id INTEGER NOT NULL REFERENCES apps(id),
+        title_id INTEGER NOT NULL REFERENCES titles(id),
+        url_id INTEGER NOT NULL REFERENCES urls(id),
+        content_hash TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        device TEXT NOT NULL DEFAULT ''
+    );
+
+    CREATE VIEW IF NOT EXISTS events AS
+    SELECT
+        f.id,
+        f.start_ts,
+        f.end_ts,
+        a.name AS app,
+        t.text AS title,
+        u.url AS url,
+        f.content_hash,
+        f.created_at,
+        f.device,
+        f.app_id,
+        f.title_id,
+        f.url_id,
+        u.host_id,
+        h.host
+    FROM event_facts AS f
+    JOIN apps AS a ON a.id = f.app_id
+    JOIN titles AS t ON t.id = f.title_id
+    JOIN urls AS u ON u.id = f.url_id
+    JOIN hosts AS h ON h.id = u.host_id;
+"""
+
+INSERT_FACT_SQL = """
+    INSERT INTO event_facts (
+        start_ts,
+        end_ts,
+        app_id,
+        title_id,
+        url_id,
+        content_hash,
+        device
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# dimension table -> its text column
+_DIMENSIONS = {"apps": "name", "titles": "text", "hosts": "host", "urls": "url"}
+
+
+class InternCache:
+    """
+    Integer ids of app, title, host and URL strings, kept in per-dimension
+    LRUs of up to ``max_entries`` and created in the dimension tables on a
+    miss. Used only under the storage's writer lock; call ``clear`` when a
+    transaction rolls back, since ids created inside it are gone.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, max_entries: int = 100_000) -> None:
+        self._conn = conn
+        self.max_entries = max_entries
+        self._ids: dict[str, OrderedDict[str, int]] = {table: OrderedDict() for table in _DIMENSIONS}
+        self.hits = 0
+        self.misses = 0
+
+    def fact_row(self, e: Event) -> tuple:
+        """Parameters of ``INSERT_FACT_SQL`` for ``e``."""
+        return (
+            e.start_ts,
+            e.end_ts,
+            self.intern("apps", e.app),
+            self.intern("titles", e.title),
+            self.url_id(e.url),
+            e.content_hash,
+            e.device,
+        )
+
+    def url_id(self, url: str) -> int:
+        return self.intern("urls", url or "")
+
+    def intern(self, table: str, value: str) -> int:
+        cache = self._ids[table]
+        value_id = cache.get(value)
+        if value_id is not None:
+            cache.move_to_end(value)
+            self.hits += 1
+            return value_id
+        self.misses += 1
+        value_id = self._lookup(table, value)
+        if value_id is None:
+            value_id = self._create(table, value)
+        cache[value] = value_id
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+        return value_id
+
+    def clear(self) -> None:
+        for cache in self._ids.values():
+            cache.clear()
+
+    def _lookup(self, table: str, value: str) -> Optional[int]:
+        row = self._conn.execute(f"SELECT id FROM {table} WHERE {_DIMENSIONS[table]} = ?", (value,)).fetchone()
+        return None if row is None else int(row[0])
+
+    def _create(self, table: str, value: str) -> int:
+        if table == "urls":
+            host, _ = url_parts(value)
+            cursor = self._conn.execute(
+                "INSERT INTO urls (url, host_id) VALUES (?, ?)",
+                (value, self.intern("hosts", host)),
+            )
+        else:
+            cursor = self._conn.execute(f"INSERT INTO {table} ({_DIMENSIONS[table]}) VALUES (?)", (value,))
+        return int(cursor.lastrowid)
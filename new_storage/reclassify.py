@@ -0,0 +1,201 @@
+"""
+Resumable reclassification of stored events with a chosen classifier.
+
+Runs a ``Classifier`` over every event that has no ``engine_classifications``
+row for its ``engine_version``. Events are read in keyset-paginated chunks,
+classified in a process pool, and written back with one batched upsert per
+chunk. The last written event id is stored as a checkpoint in the same
+transaction, so an interrupted run resumes where it stopped.
+
+    python -m new_storage.reclassify --db data/activity.sqlite3 --classifier rules
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+from new_core.models import Classification, Event
+from new_core.ports import Classifier
+from new_storage.sqlite import SQLiteStorage
+
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "activity.sqlite3"
+DEFAULT_CHUNK_SIZE = 2000
+
+ClassifierFactory = Callable[[], Classifier]
+Rows = list[tuple[int, Event]]
+
+
+@dataclass(frozen=True)
+class ReclassifyResult:
+    engine_version: str
+    classified: int
+    last_event_id: int
+    seconds: float
+
+
+def checkpoint_name(engine_version: str) -> str:
+    return f"reclassify:{engine_version}"
+
+
+def reclassify(
+    storage: SQLiteStorage,
+    classifier_factory: ClassifierFactory,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: Optional[int] = None,
+    restart: bool = False,
+    log: Optional[Callable[[str], None]] = print,
+) -> ReclassifyResult:
+    """
+    Classify every event lacking a row for the classifier's engine version.
+
+    ``classifier_factory`` is called once here (for ``engine_version``) and once
+    in each worker process, so it must be picklable, e.g. a class or a
+    ``functools.partial``. ``workers=0`` classifies in this process; ``None``
+    uses one worker per CPU. ``restart`` ignores a stored checkpoint.
+    """
+    classifier = classifier_factory()
+    engine_version = classifier.engine_version
+    name = checkpoint_name(engine_version)
+    after_id = 0 if restart else storage.get_checkpoint(name) or 0
+    if log and after_id:
+        log(f"[reclassify] {engine_version}: resuming after event {after_id}")
+
+    started = time.perf_counter()
+    classified = 0
+
+    def write(rows_end: int, results: list[tuple[int, Classification]]) -> None:
+        nonlocal classified
+        classified += storage.upsert_engine_classifications(
+            engine_version, results, checkpoint=(name, rows_end)
+        )
+        if log:
+            elapsed = time.perf_counter() - started
+            rate = classified / elapsed if elapsed > 0 else 0.0
+            log(f"[reclassify] {engine_version}: {classified} events, {rate:,.0f} events/s, last id {rows_end}")
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 0:
+        while True:
+            rows = storage.unclassified_events(engine_version, after_id=after_id, limit=chunk_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            write(after_id, classify_rows(classifier, rows))
+    else:
+        # Chunks are written in read order so the checkpoint only ever moves forward
+        # past rows that are stored; a few chunks stay queued to keep workers busy.
+        pending: deque[tuple[int, Future]] = deque()
+        exhausted = False
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(classifier_factory,),
+        ) as pool:
+            while True:
+                while not exhausted and len(pending) < workers * 2:
+                    rows = storage.unclassified_events(engine_version, after_id=after_id, limit=chunk_size)
+                    if not rows:
+                        exhausted = True
+                        break
+                    after_id = rows[-1][0]
+                    pending.append((after_id, pool.submit(_classify_in_worker, rows)))
+                if not pending:
+                    break
+                rows_end, future = pending.popleft()
+                write(rows_end, future.result())
+
+    seconds = time.perf_counter() - started
+    if log:
+        log(f"[reclassify] {engine_version}: done, {classified} events in {seconds:.1f}s")
+    return ReclassifyResult(
+        engine_version=engine_version,
+        classified=classified,
+        last_event_id=after_id,
+        seconds=seconds,
+    )
+
+
+def classify_rows(classifier: Classifier, rows: Rows) -> list[tuple[int, Classification]]:
+    """Classify ``(event_id, event)`` rows, using ``classify_many`` when the classifier has it."""
+    events = [event for _, event in rows]
+    classify_many = getattr(classifier, "classify_many", None)
+    if classify_many is not None:
+        results = classify_many(events)
+    else:
+        results = [classifier.classify(event) for event in events]
+    return [(event_id, c) for (event_id, _), c in zip(rows, results)]
+
+
+# -------- worker processes --------
+_WORKER_CLASSIFIER: Optional[Classifier] = None
+
+
+def _init_worker(classifier_factory: ClassifierFactory) -> None:
+    global _WORKER_CLASSIFIER
+    _WORKER_CLASSIFIER = classifier_factory()
+
+
+def _classify_in_worker(rows: Rows) -> list[tuple[int, Classification]]:
+    assert _WORKER_CLASSIFIER is not None
+    return classify_rows(_WORKER_CLASSIFIER, rows)
+
+
+# -------- command line --------
+def classifier_factory_for(
+    name: str,
+    rules_path: Optional[Path] = None,
+    model_path: Optional[Path] = None,
+) -> ClassifierFactory:
+    if name == "rules":
+        from new_classifiers.rules import RulesClassifier
+
+        return functools.partial(RulesClassifier, rules_path) if rules_path else RulesClassifier
+    if name == "local-nb":
+        from new_classifiers.naive_bayes import DEFAULT_MODEL_PATH, NaiveBayesClassifier
+
+        return functools.partial(NaiveBayesClassifier.load, model_path or DEFAULT_MODEL_PATH)
+    raise ValueError(f"unknown classifier: {name}")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reclassify stored events that lack a label for an engine version.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help=f"Defaults to {DEFAULT_DB_PATH}")
+    parser.add_argument("--classifier", choices=("rules", "local-nb"), default="rules")
+    parser.add_argument("--rules", type=Path, help="Rules file for --classifier rules.")
+    parser.add_argument("--model", type=Path, help="Model file for --classifier local-nb.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, help="Worker processes (0 = in-process). Defaults to the CPU count.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored checkpoint.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    storage = SQLiteStorage(args.db)
+    try:
+        reclassify(
+            storage,
+            classifier_factory_for(args.classifier, rules_path=args.rules, model_path=args.model),
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            restart=args.restart,
+        )
+    except KeyboardInterrupt:
+        print("[reclassify] interrupted; rerun to resume from the checkpoint")
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
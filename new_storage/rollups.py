@@ -0,0 +1,119 @@
+"""
+Hourly and daily time rollups of the effective label.
+
+``rollup_hourly`` and ``rollup_daily`` hold the seconds spent per bucket,
+category, productive flag and device. ``SQLiteStorage`` keeps them current on
+every write when it is opened with ``rollup_engine_version``; events crossing
+a bucket boundary are split at it. Buckets follow the local time zone of the
+writing process. This module has the bucket arithmetic and the rebuild
+command, for after a time-zone move or a database written without rollups:
+
+    python -m new_storage.rollups --db data/activity.sqlite3 --engine-version rules-v1
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "activity.sqlite3"
+
+ROLLUP_TABLES = {"hour": "rollup_hourly", "day": "rollup_daily"}
+_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# (category_id, productive); unlabeled time is ("", 0).
+Label = tuple[str, int]
+UNLABELED: Label = ("", 0)
+# (table, bucket_start, category_id, productive, device)
+RollupKey = tuple[str, float, str, int, str]
+
+
+@dataclass(frozen=True)
+class RollupRow:
+    bucket_start: float
+    category_id: str
+    productive: bool
+    device: str
+    seconds: float
+
+
+def bucket_start(ts: float, unit: str) -> float:
+    """Epoch seconds of the local hour or day containing ``ts``."""
+    local = datetime.fromtimestamp(ts)
+    if unit == "hour":
+        return local.replace(minute=0, second=0, microsecond=0).timestamp()
+    return local.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def split_by_bucket(start: float, end: float, unit: str) -> Iterator[tuple[float, float]]:
+    """``(bucket_start, seconds)`` for each local hour or day that ``[start, end)`` touches."""
+    if end <= start:
+        return
+    step = _STEPS[unit]
+    local = datetime.fromtimestamp(bucket_start(start, unit))
+    lower = local.timestamp()
+    while lower < end:
+        upper = (local + step).timestamp()
+        if upper <= lower:  # DST edge: naive arithmetic landed on the same instant
+            upper = lower + step.total_seconds()
+        seconds = min(end, upper) - max(start, lower)
+        if seconds > 0:
+            yield lower, seconds
+        local = datetime.fromtimestamp(upper)
+        lower = upper
+
+
+class RollupDeltas:
+    """Seconds to add to (or, negative, remove from) rollup rows, merged by key."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[RollupKey, float] = {}
+
+    def add(self, start: float, end: float, label: Label, device: str, sign: float = 1.0) -> None:
+        category_id, productive = label
+        for unit, table in ROLLUP_TABLES.items():
+            for lower, seconds in split_by_bucket(start, end, unit):
+                key = (table, lower, category_id, productive, device)
+                self.seconds[key] = self.seconds.get(key, 0.0) + sign * seconds
+
+    def move(self, start: float, end: float, device: str, old: Optional[Label], new: Optional[Label]) -> None:
+        """Move an event's time from label ``old`` to ``new``; None means not counted."""
+        if old == new:
+            return
+        if old is not None:
+            self.add(start, end, old, device, sign=-1.0)
+        if new is not None:
+            self.add(start, end, new, device)
+
+    def __bool__(self) -> bool:
+        return bool(self.seconds)
+
+
+# -------- command line --------
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rebuild the hourly and daily rollup tables from events.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB_PATH, help=f"Defaults to {DEFAULT_DB_PATH}")
+    parser.add_argument("--engine-version", required=True, help="Engine version whose labels are rolled up.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from new_storage.sqlite import SQLiteStorage
+
+    args = parse_args(argv)
+    storage = SQLiteStorage(args.db)
+    try:
+        started = time.perf_counter()
+        rows = storage.rebuild_rollups(args.engine_version)
+        print(f"[rollups] {rows} rollup rows for {args.engine_version} in {time.perf_counter() - started:.1f}s")
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
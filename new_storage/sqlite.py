@@ -1,12 +1,220 @@
 from __future__ import annotations
 
 import json
+import queue
 import sqlite3
+import functools
 import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence, TypeVar
 
+from new_core.metrics import REGISTRY
 from new_core.models import Classification, Event
+from new_storage.normalized import FACTS_TABLE, INSERT_FACT_SQL, LAYOUTS, NORMALIZED_SCHEMA, InternCache
+from new_storage.rollups import ROLLUP_TABLES, UNLABELED, Label, RollupDeltas, RollupRow
+
+
+_INSERT_EVENT_SQL = """
+    INSERT INTO events (
+        start_ts,
+        end_ts,
+        app,
+        title,
+        url,
+        content_hash,
+        device
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Secondary indexes on events; bulk_load() drops and rebuilds them. The
+# (start_ts, end_ts) index covers the overlap test of effective_labels().
+# ``{table}`` is the physical events table of the layout.
+_EVENT_INDEXES = {
+    "idx_events_start_end": "CREATE INDEX IF NOT EXISTS idx_events_start_end ON {table}(start_ts, end_ts)",
+}
+
+_EFFECTIVE_LABEL_COLUMNS = (
+    "event_id",
+    "start_ts",
+    "end_ts",
+    "duration",
+    "app",
+    "category_id",
+    "productive",
+    "overridden",
+)
+
+_SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+_UPSERT_CLASSIFICATION_SQL = """
+    INSERT INTO engine_classifications (
+        event_id,
+        engine_version,
+        category_id,
+        confidence,
+        rule_id,
+        meta_json,
+        productive
+    ) VALUES (?1, ?2, ?3, ?4, ?5, ?6, json_extract(?6, '$.productive'))
+    ON CONFLICT(event_id, engine_version) DO UPDATE SET
+        category_id = excluded.category_id,
+        confidence = excluded.confidence,
+        rule_id = excluded.rule_id,
+        meta_json = excluded.meta_json,
+        productive = excluded.productive,
+        created_at = CURRENT_TIMESTAMP
+"""
+
+# Effective label of events for one engine version, for rollup upkeep.
+_ROLLUP_LABEL_SQL = """
+    SELECT
+        e.id,
+        e.start_ts,
+        e.end_ts,
+        e.device,
+        c.category_id,
+        c.productive,
+        o.category_id
+    FROM events AS e
+    LEFT JOIN engine_classifications AS c
+        ON c.event_id = e.id AND c.engine_version = ?
+    LEFT JOIN user_overrides AS o
+        ON o.event_id = e.id
+"""
+
+_SET_CHECKPOINT_SQL = """
+    INSERT INTO job_checkpoints (name, position) VALUES (?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        position = excluded.position,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+STORAGE_SECONDS = REGISTRY.histogram(
+    "activity_storage_operation_seconds", "SQLiteStorage call latency, lock wait included.", ("op",)
+)
+STORAGE_ERRORS = REGISTRY.counter("activity_storage_errors", "SQLiteStorage calls that raised.", ("op",))
+READER_WAITS = REGISTRY.counter(
+    "activity_storage_reader_waits", "Queries that waited for a free pooled reader connection."
+)
+READER_FALLBACKS = REGISTRY.counter(
+    "activity_storage_reader_fallbacks", "Queries sent to the writer because no pooled reader freed up in time."
+)
+
+_F = TypeVar("_F", bound=Callable)
+
+
+def _instrumented(op: str) -> Callable[[_F], _F]:
+    """Record latency and errors of a storage method under ``op``."""
+    seconds = STORAGE_SECONDS.labels(op=op)
+    errors = STORAGE_ERRORS.labels(op=op)
+
+    def decorate(method: _F) -> _F:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - started)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+class _ReaderPool:
+    """
+    Up to ``size`` query-only connections, handed out one thread at a time.
+    In WAL mode each reads its own snapshot, concurrently with the writer.
+
+    A query nested in another on the same thread (e.g. inside a streaming
+    ``effective_labels`` loop) reuses that thread's reader and its snapshot.
+    ``connection()`` yields None when no reader frees up within
+    ``wait_seconds``; the caller then queries elsewhere.
+    """
+
+    def __init__(self, db_path: Path, size: int, wait_seconds: float) -> None:
+        self._db_path = db_path
+        self._size = size
+        self._wait_seconds = wait_seconds
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._opened: list[sqlite3.Connection] = []
+        self._checked_out: set[sqlite3.Connection] = set()
+        self._held = threading.local()  # this thread's reader, while it has one
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[Optional[sqlite3.Connection]]:
+        held = getattr(self._held, "conn", None)
+        if held is not None:
+            yield held
+            return
+        conn = self._checkout()
+        if conn is None:
+            yield None
+            return
+        self._held.conn = conn
+        try:
+            yield conn
+        finally:
+            self._held.conn = None
+            self._checkin(conn)
+
+    def close(self) -> None:
+        """Close idle readers now; readers still checked out close when returned."""
+        with self._lock:
+            self._closed = True
+            for conn in self._opened:
+                if conn not in self._checked_out:
+                    conn.close()
+            self._opened = list(self._checked_out)
+            while not self._idle.empty():
+                self._idle.get_nowait()
+
+    def _checkout(self) -> Optional[sqlite3.Connection]:
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+            if conn is None and len(self._opened) < self._size:
+                conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA query_only = ON;")
+                self._opened.append(conn)
+            if conn is not None:
+                self._checked_out.add(conn)
+                return conn
+        READER_WAITS.inc()
+        try:
+            conn = self._idle.get(timeout=self._wait_seconds)
+        except queue.Empty:
+            READER_FALLBACKS.inc()
+            return None
+        with self._lock:
+            self._checked_out.add(conn)
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._checked_out.discard(conn)
+            if self._closed:
+                self._opened.remove(conn)
+                conn.close()
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
 
 
 class SQLiteStorage:
@@ -17,41 +225,175 @@ class SQLiteStorage:
     event is valid or what classification should be written.
     """
 
-    def __init__(self, db_path: str | Path) -> None:
+    def __init__(
+        self,
+        db_path: str | Path,
+        rollup_engine_version: Optional[str] = None,
+        productive_by_category: Optional[Mapping[str, bool]] = None,
+        readers: int = 4,
+        layout: Optional[str] = None,
+        intern_cache_size: int = 100_000,
+        reader_wait_seconds: float = 5.0,
+    ) -> None:
+        """
+        ``layout="normalized"`` creates a new database with app, title and URL
+        strings interned into dimension tables (see ``new_storage.normalized``)
+        behind an ``events`` view; an existing database keeps the layout it
+        was created with, ``"wide"`` by default.
+        Writes go through one connection. Queries use a pool of up to
+        ``readers`` query-only connections, so they read a committed snapshot
+        without waiting for the writer (``readers=0`` queries on the writer).
+        A query that finds every reader busy for ``reader_wait_seconds`` runs
+        on the writer instead.
+
+        ``rollup_engine_version`` turns on upkeep of the hourly and daily
+        rollup tables for that engine version's labels; they are rebuilt on
+        open if they were built for another version or went stale.
+        ``productive_by_category`` gives the productive flag of overridden
+        categories; otherwise it is taken from stored engine labels.
+        """
         self._db_path = Path(db_path)
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
         self._lock = threading.RLock()
         self._conn = sqlite3.connect(str(self._db_path), check_same_thread=False)
         self._conn.row_factory = sqlite3.Row
+        self._uow_depth = 0
+        self._uow_thread: Optional[int] = None
+        self._readers = _ReaderPool(self._db_path, readers, reader_wait_seconds) if readers > 0 else None
+        self._layout = self._detect_layout(layout)
+        if self._layout == "normalized":
+            self._events_table = FACTS_TABLE
+            self._interner: Optional[InternCache] = InternCache(self._conn, intern_cache_size)
+        else:
+            self._events_table = "events"
+            self._interner = None
+        self._rollup_version = rollup_engine_version
+        self._productive_by_category = {k: int(bool(v)) for k, v in (productive_by_category or {}).items()}
+        self._rollups_invalidated = False
         self._configure_connection()
         self._init_schema()
+        if rollup_engine_version is not None and self._rollup_state() != rollup_engine_version:
+            print(f"[sqlite] rebuilding rollups for {rollup_engine_version}")
+            self.rebuild_rollups(rollup_engine_version)
 
     @property
     def db_path(self) -> Path:
         return self._db_path
 
+    @property
+    def layout(self) -> str:
+        return self._layout
+
     def close(self) -> None:
         with self._lock:
             self._conn.close()
+        if self._readers is not None:
+            self._readers.close()
 
-    def insert_event(self, e: Event) -> int:
+    @contextmanager
+    def unit_of_work(self) -> Iterator[None]:
+        """
+        Run the writes made inside the block as one transaction.
+
+        Write methods called inside the block skip their own commit; the block
+        commits once on exit, or rolls everything back if it raises. The
+        connection lock is held for the whole block (other threads wait), so
+        keep it to the writes themselves. Nested blocks join the outermost one.
+        """
         with self._lock:
-            cursor = self._conn.execute(
-                """
-                INSERT INTO events (
-                    start_ts,
-                    end_ts,
-                    app,
-                    title,
-                    url,
-                    content_hash
-                ) VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (e.start_ts, e.end_ts, e.app, e.title, e.url, e.content_hash),
-            )
-            self._conn.commit()
+            if self._uow_depth:
+                self._uow_depth += 1
+                try:
+                    yield
+                finally:
+                    self._uow_depth -= 1
+                return
+
+            self._uow_thread = threading.get_ident()
+            self._uow_depth = 1
+            rollups_invalidated = self._rollups_invalidated
+            try:
+                yield
+            except BaseException:
+                self._conn.rollback()
+                # In-memory state that mirrors rolled-back rows goes back with them.
+                self._rollups_invalidated = rollups_invalidated
+                if self._interner is not None:
+                    self._interner.clear()
+                raise
+            else:
+                self._commit_unit_of_work()
+            finally:
+                self._uow_depth = 0
+                self._uow_thread = None
+
+    @_instrumented("insert_event")
+    def insert_event(self, e: Event) -> int:
+        with self.unit_of_work():
+            cursor = self._conn.execute(self._insert_event_sql(), self._event_row(e))
+            self._rollup_inserted([e])
             return int(cursor.lastrowid)
 
+    @_instrumented("insert_events")
+    def insert_events(self, events: Iterable[Event], chunk_size: int = 10_000) -> range:
+        """
+        Insert many events in one transaction and return their ids.
+
+        Rows go to ``executemany`` in chunks of ``chunk_size``, so a generator
+        of any length is streamed rather than materialized. Ids are assigned
+        consecutively (the transaction holds the only writer), so the result
+        is ``range(first_id, last_id + 1)``, in the order ``events`` yielded.
+        Inside ``unit_of_work`` the rows join the surrounding transaction.
+        """
+        events = iter(events)
+        count = 0
+        with self.unit_of_work():
+            while True:
+                chunk = list(islice(events, chunk_size))
+                if not chunk:
+                    break
+                self._conn.executemany(self._insert_event_sql(), [self._event_row(e) for e in chunk])
+                self._rollup_inserted(chunk)
+                count += len(chunk)
+            if not count:
+                return range(0)
+            last_id = int(self._conn.execute("SELECT last_insert_rowid()").fetchone()[0])
+        return range(last_id - count + 1, last_id + 1)
+
+    @contextmanager
+    def bulk_load(self, synchronous: str = "OFF", defer_indexes: bool = True) -> Iterator[None]:
+        """
+        Trade durability for speed while loading a large backfill.
+
+        Inside the block ``PRAGMA synchronous`` is relaxed (a crash may lose
+        the last transactions, never corrupt the file, in WAL mode) and the
+        secondary indexes on ``events`` are dropped, so inserts only append to
+        the table; they are rebuilt in one sorted pass on exit, even if the
+        block raises. Queries by time are slow until then, so keep the block
+        to the load itself.
+        """
+        if synchronous.upper() not in _SYNCHRONOUS_LEVELS:
+            raise ValueError(f"synchronous must be one of {_SYNCHRONOUS_LEVELS}, got {synchronous!r}")
+        with self._lock:
+            if self._uow_depth:
+                raise RuntimeError("bulk_load() cannot start inside unit_of_work()")
+            previous = int(self._conn.execute("PRAGMA synchronous").fetchone()[0])
+            self._conn.execute(f"PRAGMA synchronous = {synchronous}")
+            if defer_indexes:
+                for name in _EVENT_INDEXES:
+                    self._conn.execute(f"DROP INDEX IF EXISTS {name}")
+                self._conn.commit()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if defer_indexes:
+                    for ddl in _EVENT_INDEXES.values():
+                        self._conn.execute(ddl.format(table=self._events_table))
+                    self._conn.commit()
+                self._conn.execute(f"PRAGMA synchronous = {previous}")
+
+    @_instrumented("upsert_engine_classification")
     def upsert_engine_classification(
         self,
         event_id: int,
@@ -59,42 +401,306 @@ class SQLiteStorage:
         c: Classification,
     ) -> None:
         meta_json = self._encode_meta(c.meta)
+        with self.unit_of_work(), self._tracking_rollups([event_id], engine_version):
+            self._conn.execute(
+                _UPSERT_CLASSIFICATION_SQL,
+                (
+                    event_id,
+                    engine_version,
+                    c.category_id,
+                    c.confidence,
+                    c.rule_id,
+                    meta_json,
+                ),
+            )
+
+    @_instrumented("upsert_engine_classifications")
+    def upsert_engine_classifications(
+        self,
+        engine_version: str,
+        items: Iterable[tuple[int, Classification]],
+        checkpoint: Optional[tuple[str, int]] = None,
+    ) -> int:
+        """
+        Upsert many ``(event_id, classification)`` pairs in one transaction.
+
+        ``checkpoint=(name, position)`` is stored in the same transaction, so a
+        resumable job never records progress for rows that were not written.
+        Returns the number of rows written.
+        """
+        rows = [
+            (event_id, engine_version, c.category_id, c.confidence, c.rule_id, self._encode_meta(c.meta))
+            for event_id, c in items
+        ]
+        with self.unit_of_work():
+            with self._tracking_rollups([row[0] for row in rows], engine_version):
+                self._conn.executemany(_UPSERT_CLASSIFICATION_SQL, rows)
+            if checkpoint is not None:
+                self._conn.execute(_SET_CHECKPOINT_SQL, checkpoint)
+        return len(rows)
+
+    @_instrumented("unclassified_events")
+    def unclassified_events(
+        self,
+        engine_version: str,
+        after_id: int = 0,
+        limit: int = 1000,
+    ) -> list[tuple[int, Event]]:
+        """
+        Return up to ``limit`` events with ``id > after_id`` that have no row for
+        ``engine_version``, in id order.
+
+        Callers page through history by passing the last returned id back as
+        ``after_id`` (keyset pagination), so each page is an index range scan.
+        """
+        with self._reading() as conn:
+            rows = conn.execute(
+                """
+                SELECT e.id, e.start_ts, e.end_ts, e.app, e.title, e.url, e.content_hash, e.device
+                FROM events AS e
+                WHERE e.id > ?
+                  AND NOT EXISTS (
+                      SELECT 1
+                      FROM engine_classifications AS c
+                      WHERE c.event_id = e.id AND c.engine_version = ?
+                  )
+                ORDER BY e.id
+                LIMIT ?
+                """,
+                (after_id, engine_version, limit),
+            ).fetchall()
+        return [
+            (
+                int(row["id"]),
+                Event(
+                    start_ts=row["start_ts"],
+                    end_ts=row["end_ts"],
+                    app=row["app"],
+                    title=row["title"],
+                    url=row["url"],
+                    content_hash=row["content_hash"],
+                    device=row["device"],
+                ),
+            )
+            for row in rows
+        ]
+
+    @_instrumented("event_spans")
+    def event_spans(self, event_ids: Iterable[int]) -> dict[int, tuple[float, float]]:
+        """Return ``{event_id: (start_ts, end_ts)}`` for the ids that exist."""
+        ids = list(event_ids)
+        spans: dict[int, tuple[float, float]] = {}
+        with self._reading() as conn:
+            # Stay well under SQLite's bound-parameter limit.
+            for offset in range(0, len(ids), 500):
+                chunk = ids[offset:offset + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT id, start_ts, end_ts FROM events WHERE id IN ({placeholders})",
+                    chunk,
+                ):
+                    spans[int(row["id"])] = (row["start_ts"], row["end_ts"])
+        return spans
+
+    # -------- queries --------
+    @_instrumented("effective_labels")
+    def effective_labels(
+        self,
+        start: float,
+        end: float,
+        engine_version: str,
+        apps: Optional[Sequence[str]] = None,
+        categories: Optional[Sequence[str]] = None,
+        productive_by_category: Optional[Mapping[str, bool]] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[dict[str, list[Any]]]:
+        """
+        Events overlapping ``[start, end)`` with their effective label, as
+        column batches of at most ``batch_size`` rows in start-time order.
+
+        Each batch maps the names in ``_EFFECTIVE_LABEL_COLUMNS`` to lists.
+        ``category_id`` is the user override if there is one, else the
+        ``engine_version`` classification, else None. ``duration`` is the
+        part of the event inside the window. ``productive`` comes from the
+        engine's metadata; when an override changed the category it is looked
+        up in ``productive_by_category`` (None if absent). ``apps`` and
+        ``categories`` restrict the rows to those values.
+
+        Rows stream from one cursor on a pooled reader, walking
+        ``idx_events_start_end`` in ``(start_ts, end_ts, id)`` order, so every
+        batch comes from the same snapshot and a slow consumer never blocks
+        writers.
+        """
+        productive_by_category = productive_by_category or {}
+        sql = """
+            SELECT
+                e.id,
+                e.start_ts,
+                e.end_ts,
+                e.app,
+                c.category_id AS engine_category,
+                c.productive AS engine_productive,
+                o.category_id AS override_category
+            FROM events AS e
+            LEFT JOIN engine_classifications AS c
+                ON c.event_id = e.id AND c.engine_version = ?
+            LEFT JOIN user_overrides AS o
+                ON o.event_id = e.id
+            WHERE e.start_ts < ? AND e.end_ts > ?
+        """
+        filters: list[Any] = []
+        if apps is not None:
+            sql += f" AND e.app IN ({','.join('?' * len(apps))})"
+            filters.extend(apps)
+        if categories is not None:
+            sql += f" AND COALESCE(o.category_id, c.category_id) IN ({','.join('?' * len(categories))})"
+            filters.extend(categories)
+        sql += " ORDER BY e.start_ts, e.end_ts, e.id"
+
+        with self._reading() as conn:
+            cursor = conn.execute(sql, (engine_version, end, start, *filters))
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield self._label_batch(rows, start, end, productive_by_category)
+            finally:
+                cursor.close()
+
+    @staticmethod
+    def _label_batch(
+        rows: list[sqlite3.Row],
+        start: float,
+        end: float,
+        productive_by_category: Mapping[str, bool],
+    ) -> dict[str, list[Any]]:
+        batch: dict[str, list[Any]] = {name: [] for name in _EFFECTIVE_LABEL_COLUMNS}
+        for event_id, start_ts, end_ts, app, engine_category, engine_productive, override_category in rows:
+            if override_category is not None and override_category != engine_category:
+                category_id = override_category
+                productive = productive_by_category.get(override_category)
+            else:
+                category_id = engine_category
+                productive = None if engine_productive is None else bool(engine_productive)
+            batch["event_id"].append(event_id)
+            batch["start_ts"].append(start_ts)
+            batch["end_ts"].append(end_ts)
+            batch["duration"].append(min(end_ts, end) - max(start_ts, start))
+            batch["app"].append(app)
+            batch["category_id"].append(category_id)
+            batch["productive"].append(productive)
+            batch["overridden"].append(override_category is not None)
+        return batch
+
+    def effective_labels_arrow(self, start: float, end: float, engine_version: str, **kwargs: Any) -> Any:
+        """``effective_labels`` as a ``pyarrow.RecordBatchReader``; takes the same arguments."""
+        import pyarrow as pa
+
+        schema = pa.schema(
+            [
+                ("event_id", pa.int64()),
+                ("start_ts", pa.float64()),
+                ("end_ts", pa.float64()),
+                ("duration", pa.float64()),
+                ("app", pa.string()),
+                ("category_id", pa.string()),
+                ("productive", pa.bool_()),
+                ("overridden", pa.bool_()),
+            ]
+        )
+        batches = (
+            pa.RecordBatch.from_pydict(columns, schema=schema)
+            for columns in self.effective_labels(start, end, engine_version, **kwargs)
+        )
+        return pa.RecordBatchReader.from_batches(schema, batches)
+
+    # -------- distinct contexts --------
+    @_instrumented("get_context_classification")
+    def get_context_classification(
+        self,
+        content_hash: str,
+        engine_version: str,
+    ) -> Optional[Classification]:
+        with self._reading() as conn:
+            row = conn.execute(
+                """
+                SELECT category_id, confidence, rule_id, meta_json
+                FROM context_classifications
+                WHERE content_hash = ? AND engine_version = ?
+                """,
+                (content_hash, engine_version),
+            ).fetchone()
+        if row is None:
+            return None
+        return Classification(
+            category_id=row["category_id"],
+            confidence=row["confidence"],
+            rule_id=row["rule_id"],
+            meta=json.loads(row["meta_json"]) if row["meta_json"] is not None else None,
+        )
+
+    @_instrumented("put_context_classification")
+    def put_context_classification(
+        self,
+        content_hash: str,
+        engine_version: str,
+        c: Classification,
+    ) -> None:
         with self._lock:
             self._conn.execute(
                 """
-                INSERT INTO engine_classifications (
-                    event_id,
+                INSERT OR REPLACE INTO context_classifications (
+                    content_hash,
                     engine_version,
                     category_id,
                     confidence,
                     rule_id,
                     meta_json
                 ) VALUES (?, ?, ?, ?, ?, ?)
-                ON CONFLICT(event_id, engine_version) DO UPDATE SET
-                    category_id = excluded.category_id,
-                    confidence = excluded.confidence,
-                    rule_id = excluded.rule_id,
-                    meta_json = excluded.meta_json,
-                    created_at = CURRENT_TIMESTAMP
                 """,
-                (
-                    event_id,
-                    engine_version,
-                    c.category_id,
-                    c.confidence,
-                    c.rule_id,
-                    meta_json,
-                ),
+                (content_hash, engine_version, c.category_id, c.confidence, c.rule_id, self._encode_meta(c.meta)),
             )
-            self._conn.commit()
+            self._commit()
+
+    @_instrumented("prune_context_classifications")
+    def prune_context_classifications(self, keep_version: str) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM context_classifications WHERE engine_version != ?",
+                (keep_version,),
+            )
+            self._commit()
+        return cur.rowcount
+
+    # -------- job checkpoints --------
+    def get_checkpoint(self, name: str) -> Optional[int]:
+        """Return the position stored for a resumable job, or ``None``."""
+        with self._reading() as conn:
+            row = conn.execute(
+                "SELECT position FROM job_checkpoints WHERE name = ?",
+                (name,),
+            ).fetchone()
+        return None if row is None else int(row["position"])
+
+    def set_checkpoint(self, name: str, position: int) -> None:
+        with self._lock:
+            self._conn.execute(_SET_CHECKPOINT_SQL, (name, position))
+            self._commit()
+
+    def clear_checkpoint(self, name: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM job_checkpoints WHERE name = ?", (name,))
+            self._commit()
 
+    @_instrumented("set_user_override")
     def set_user_override(
         self,
         event_id: int,
         category_id: str,
         note: Optional[str] = None,
     ) -> None:
-        with self._lock:
+        with self.unit_of_work(), self._tracking_rollups([event_id]):
             self._conn.execute(
                 """
                 INSERT INTO user_overrides (
@@ -109,14 +715,227 @@ class SQLiteStorage:
                 """,
                 (event_id, category_id, note),
             )
-            self._conn.commit()
 
+    @_instrumented("clear_user_override")
     def clear_user_override(self, event_id: int) -> None:
-        with self._lock:
+        with self.unit_of_work(), self._tracking_rollups([event_id]):
             self._conn.execute(
                 "DELETE FROM user_overrides WHERE event_id = ?",
                 (event_id,),
             )
+
+    # -------- rollups --------
+    @_instrumented("rollups")
+    def rollups(
+        self,
+        unit: str,
+        start: float,
+        end: float,
+        device: Optional[str] = None,
+    ) -> list[RollupRow]:
+        """
+        Rollup rows of ``unit`` (``"hour"`` or ``"day"``) whose bucket starts
+        in ``[start, end)``, by bucket, category, productive flag and device.
+        Unlabeled time has category ``""``.
+        """
+        sql = f"""
+            SELECT bucket_start, category_id, productive, device, seconds
+            FROM {ROLLUP_TABLES[unit]}
+            WHERE bucket_start >= ? AND bucket_start < ? AND seconds > 0
+        """
+        params: list[Any] = [start, end]
+        if device is not None:
+            sql += " AND device = ?"
+            params.append(device)
+        sql += " ORDER BY bucket_start, category_id, productive, device"
+        with self._reading() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [RollupRow(row[0], row[1], bool(row[2]), row[3], row[4]) for row in rows]
+
+    @_instrumented("rebuild_rollups")
+    def rebuild_rollups(self, engine_version: str) -> int:
+        """Recompute both rollup tables from events for ``engine_version``; returns the row count."""
+        with self.unit_of_work():
+            for table in ROLLUP_TABLES.values():
+                self._conn.execute(f"DELETE FROM {table}")
+            deltas = RollupDeltas()
+            for _, start_ts, end_ts, device, category, productive, override in self._conn.execute(
+                _ROLLUP_LABEL_SQL, (engine_version,)
+            ):
+                deltas.add(start_ts, end_ts, self._effective_label(category, productive, override), device)
+            self._apply_rollup_deltas(deltas)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rollup_state (id, engine_version) VALUES (1, ?)",
+                (engine_version,),
+            )
+            self._rollups_invalidated = False
+        return len(deltas.seconds)
+
+    def _rollup_state(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT engine_version FROM rollup_state WHERE id = 1").fetchone()
+        return None if row is None else row[0]
+
+    def _invalidate_rollups(self) -> None:
+        # Written without rollup upkeep: the next open with rollups rebuilds them.
+        if not self._rollups_invalidated:
+            self._conn.execute("DELETE FROM rollup_state")
+            self._rollups_invalidated = True
+
+    def _rollup_inserted(self, events: Sequence[Event]) -> None:
+        """New events count as unlabeled until a label is written for them."""
+        if self._rollup_version is None:
+            self._invalidate_rollups()
+            return
+        deltas = RollupDeltas()
+        for e in events:
+            deltas.add(e.start_ts, e.end_ts, UNLABELED, e.device)
+        self._apply_rollup_deltas(deltas)
+
+    @contextmanager
+    def _tracking_rollups(self, event_ids: Sequence[int], engine_version: Optional[str] = None) -> Iterator[None]:
+        """
+        Move the rollup time of ``event_ids`` from their effective labels before
+        the block to those after it. Caller holds a unit of work. Label writes
+        for other engine versions do not touch the rollups.
+        """
+        if self._rollup_version is None:
+            self._invalidate_rollups()
+            yield
+            return
+        if engine_version is not None and engine_version != self._rollup_version:
+            yield
+            return
+        before = self._rollup_labels(event_ids)
+        yield
+        after = self._rollup_labels(event_ids)
+        deltas = RollupDeltas()
+        for event_id, (start_ts, end_ts, device, label) in after.items():
+            old = before.get(event_id)
+            deltas.move(start_ts, end_ts, device, None if old is None else old[3], label)
+        self._apply_rollup_deltas(deltas)
+
+    def _rollup_labels(self, event_ids: Sequence[int]) -> dict[int, tuple[float, float, str, Label]]:
+        labels: dict[int, tuple[float, float, str, Label]] = {}
+        ids = list(event_ids)
+        for offset in range(0, len(ids), 500):
+            chunk = ids[offset:offset + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for event_id, start_ts, end_ts, device, category, productive, override in self._conn.execute(
+                f"{_ROLLUP_LABEL_SQL} WHERE e.id IN ({placeholders})",
+                (self._rollup_version, *chunk),
+            ):
+                labels[event_id] = (start_ts, end_ts, device, self._effective_label(category, productive, override))
+        return labels
+
+    def _effective_label(
+        self,
+        engine_category: Optional[str],
+        engine_productive: Optional[int],
+        override_category: Optional[str],
+    ) -> Label:
+        if override_category is not None and override_category != engine_category:
+            return override_category, self._productive_of(override_category)
+        if engine_category is None:
+            return UNLABELED
+        return engine_category, int(bool(engine_productive))
+
+    def _productive_of(self, category_id: str) -> int:
+        productive = self._productive_by_category.get(category_id)
+        if productive is None:
+            row = self._conn.execute(
+                """
+                SELECT productive
+                FROM engine_classifications
+                WHERE category_id = ? AND productive IS NOT NULL
+                LIMIT 1
+                """,
+                (category_id,),
+            ).fetchone()
+            if row is None:
+                return 0
+            productive = self._productive_by_category[category_id] = int(bool(row[0]))
+        return productive
+
+    def _apply_rollup_deltas(self, deltas: RollupDeltas) -> None:
+        if not deltas:
+            return
+        by_table: dict[str, list[tuple[float, str, int, str, float]]] = {}
+        emptied: dict[str, list[tuple[float, str, int, str]]] = {}
+        for (table, bucket, category_id, productive, device), seconds in deltas.seconds.items():
+            by_table.setdefault(table, []).append((bucket, category_id, productive, device, seconds))
+            if seconds < 0:
+                emptied.setdefault(table, []).append((bucket, category_id, productive, device))
+        for table, rows in by_table.items():
+            self._conn.executemany(
+                f"""
+                INSERT INTO {table} (bucket_start, category_id, productive, device, seconds)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(bucket_start, category_id, productive, device) DO UPDATE SET
+                    seconds = seconds + excluded.seconds
+                """,
+                rows,
+            )
+        for table, keys in emptied.items():
+            # Drop rows whose time all moved elsewhere (float residue included).
+            self._conn.executemany(
+                f"""
+                DELETE FROM {table}
+                WHERE bucket_start = ? AND category_id = ? AND productive = ? AND device = ?
+                  AND seconds < 1e-6
+                """,
+                keys,
+            )
+
+    def _insert_event_sql(self) -> str:
+        return _INSERT_EVENT_SQL if self._interner is None else INSERT_FACT_SQL
+
+    def _event_row(self, e: Event) -> tuple:
+        if self._interner is not None:
+            return self._interner.fact_row(e)
+        return (e.start_ts, e.end_ts, e.app, e.title, e.url, e.content_hash, e.device)
+
+    def _detect_layout(self, requested: Optional[str]) -> str:
+        if requested is not None and requested not in LAYOUTS:
+            raise ValueError(f"layout must be one of {LAYOUTS}, got {requested!r}")
+        row = self._conn.execute("SELECT type FROM sqlite_master WHERE name = 'events'").fetchone()
+        if row is None:
+            return requested or "wide"
+        existing = "normalized" if row[0] == "view" else "wide"
+        if requested is not None and requested != existing:
+            raise ValueError(
+                f"{self._db_path} already uses the {existing} layout; "
+                f"replay it into a new database to convert (python -m new_logger.replay ... --layout {requested})"
+            )
+        return existing
+
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Connection]:
+        """
+        Connection for a query. Inside this thread's unit of work that is the
+        writer, so the query sees the block's own uncommitted writes;
+        otherwise a pooled reader (or the writer, under the lock, without a
+        pool or when no reader frees up in time).
+        """
+        if self._uow_depth and self._uow_thread == threading.get_ident():
+            yield self._conn
+        elif self._readers is None:
+            with self._lock:
+                yield self._conn
+        else:
+            with self._readers.connection() as conn:
+                if conn is not None:
+                    yield conn
+                else:
+                    with self._lock:
+                        yield self._conn
+
+    @_instrumented("commit")
+    def _commit_unit_of_work(self) -> None:
+        self._conn.commit()
+
+    def _commit(self) -> None:
+        if not self._uow_depth:
             self._conn.commit()
 
     def _configure_connection(self) -> None:
@@ -125,19 +944,31 @@ class SQLiteStorage:
 
     def _init_schema(self) -> None:
         with self._lock:
+            if self._layout == "normalized":
+                self._conn.executescript(NORMALIZED_SCHEMA)
+            else:
+                self._conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS events (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        start_ts REAL NOT NULL,
+                        end_ts REAL NOT NULL,
+                        app TEXT NOT NULL,
+                        title TEXT NOT NULL,
+                        url TEXT NOT NULL DEFAULT '',
+                        content_hash TEXT,
+                        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                        device TEXT NOT NULL DEFAULT ''
+                    );
+                    """
+                )
+                columns = {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}
+                if "device" not in columns:
+                    self._conn.execute("ALTER TABLE events ADD COLUMN device TEXT NOT NULL DEFAULT ''")
+
+            # Foreign keys must name the physical events table, not the view.
             self._conn.executescript(
                 """
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    start_ts REAL NOT NULL,
-                    end_ts REAL NOT NULL,
-                    app TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    url TEXT NOT NULL DEFAULT '',
-                    content_hash TEXT,
-                    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-                );
-
                 CREATE TABLE IF NOT EXISTS engine_classifications (
                     event_id INTEGER NOT NULL,
                     engine_version TEXT NOT NULL,
@@ -146,8 +977,9 @@ class SQLiteStorage:
                     rule_id TEXT,
                     meta_json TEXT,
                     created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    productive INTEGER,  -- meta["productive"], kept out of meta_json for the label index
                     PRIMARY KEY (event_id, engine_version),
-                    FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+                    FOREIGN KEY (event_id) REFERENCES {events_table}(id) ON DELETE CASCADE
                 );
 
                 CREATE TABLE IF NOT EXISTS user_overrides (
@@ -155,11 +987,70 @@ class SQLiteStorage:
                     category_id TEXT NOT NULL,
                     note TEXT,
                     created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE
+                    FOREIGN KEY (event_id) REFERENCES {events_table}(id) ON DELETE CASCADE
                 );
 
-                CREATE INDEX IF NOT EXISTS idx_events_start_ts
-                ON events(start_ts);
+                CREATE TABLE IF NOT EXISTS context_classifications (
+                    content_hash TEXT NOT NULL,
+                    engine_version TEXT NOT NULL,
+                    category_id TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    rule_id TEXT,
+                    meta_json TEXT,
+                    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (content_hash, engine_version)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS job_checkpoints (
+                    name TEXT PRIMARY KEY,
+                    position INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+
+                CREATE TABLE IF NOT EXISTS rollup_hourly (
+                    bucket_start REAL NOT NULL,
+                    category_id TEXT NOT NULL,
+                    productive INTEGER NOT NULL,
+                    device TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    PRIMARY KEY (bucket_start, category_id, productive, device)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS rollup_daily (
+                    bucket_start REAL NOT NULL,
+                    category_id TEXT NOT NULL,
+                    productive INTEGER NOT NULL,
+                    device TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    PRIMARY KEY (bucket_start, category_id, productive, device)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS rollup_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    engine_version TEXT NOT NULL,
+                    built_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+                """.replace("{events_table}", self._events_table)
+            )
+            # Superseded by idx_events_start_end.
+            self._conn.execute("DROP INDEX IF EXISTS idx_events_start_ts")
+            for ddl in _EVENT_INDEXES.values():
+                self._conn.execute(ddl.format(table=self._events_table))
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(engine_classifications)")}
+            if "productive" not in columns:
+                self._conn.execute("ALTER TABLE engine_classifications ADD COLUMN productive INTEGER")
+                self._conn.execute("UPDATE engine_classifications SET productive = json_extract(meta_json, '$.productive')")
+            # Covers the effective-label join, so it never reads the table. Earlier
+            # versions indexed the whole meta_json instead of the productive flag.
+            index_sql = self._conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_engine_classifications_lookup'"
+            ).fetchone()
+            if index_sql is not None and "meta_json" in index_sql[0]:
+                self._conn.execute("DROP INDEX idx_engine_classifications_lookup")
+            self._conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_engine_classifications_lookup
+                ON engine_classifications(event_id, engine_version, category_id, productive)
                 """
             )
             self._conn.commit()
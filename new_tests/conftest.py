@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+
+
+def pytest_configure(config) -> None:
+    # Keep compiled-rules cache files out of the repository's data/cache.
+    cache_dir = tempfile.mkdtemp(prefix="rules-cache-")
+    os.environ["ACTIVITY_RULES_CACHE_DIR"] = cache_dir
+    config.add_cleanup(lambda: shutil.rmtree(cache_dir, ignore_errors=True))
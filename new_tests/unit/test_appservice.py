@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import threading
+from contextlib import contextmanager
+
 import pytest
 
-from dataclasses import dataclass, field
-from typing import Callable, Optional
+from dataclasses import dataclass, field, replace
+from typing import Callable, Iterator, Optional
 
-from new_core.appservice import AppService
-from new_core.models import Classification, Event
+from new_core.appservice import AppService, AppServiceConfig
+from new_core.models import Classification, Event, content_hash
 
 
 class FakeSource:
@@ -27,6 +30,13 @@ class FakeStorage:
     engine_labels: list[tuple[int, str, Classification]] = field(default_factory=list)
     overrides_set: list[tuple[int, str, Optional[str]]] = field(default_factory=list)
     overrides_cleared: list[int] = field(default_factory=list)
+    units_of_work: list[int] = field(default_factory=list)  # events inserted per unit of work
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator[None]:
+        before = len(self.inserted_events)
+        yield
+        self.units_of_work.append(len(self.inserted_events) - before)
 
     def insert_event(self, e: Event) -> int:
         self.inserted_events.append(e)
@@ -55,10 +65,31 @@ class FakeStorage:
 class FakeClassifier:
     engine_version = "rules-v1"
 
+    def __init__(self) -> None:
+        self.calls = 0
+
     def classify(self, e: Event) -> Classification:
+        self.calls += 1
         return Classification(category_id="work", confidence=0.9)
 
 
+@dataclass
+class FakeContextStore:
+    rows: dict[tuple[str, str], Classification] = field(default_factory=dict)
+
+    def get_context_classification(self, content_hash: str, engine_version: str) -> Optional[Classification]:
+        return self.rows.get((content_hash, engine_version))
+
+    def put_context_classification(self, content_hash: str, engine_version: str, c: Classification) -> None:
+        self.rows[(content_hash, engine_version)] = c
+
+    def prune_context_classifications(self, keep_version: str) -> int:
+        stale = [key for key in self.rows if key[1] != keep_version]
+        for key in stale:
+            del self.rows[key]
+        return len(stale)
+
+
 @dataclass
 class FakePublisher:
     recorded_ids: list[int] = field(default_factory=list)
@@ -99,7 +130,9 @@ def test_appservice_persists_and_classifies_finalized_events() -> None:
     )
     source.emit(event)
 
-    assert storage.inserted_events == [event]
+    assert storage.inserted_events == [
+        replace(event, content_hash=content_hash("Safari", "Docs", "https://example.com"))
+    ]
     assert publisher.recorded_ids == [1]
     assert storage.engine_labels == [
         (1, "rules-v1", Classification(category_id="work", confidence=0.9))
@@ -135,3 +168,334 @@ def test_appservice_override_api_updates_storage_and_publisher() -> None:
     assert storage.overrides_set == [(7, "focus", "manual correction")]
     assert storage.overrides_cleared == [7]
     assert publisher.override_ids == [7, 7]
+
+
+@pytest.mark.unit
+def test_content_hash_is_stable_and_whitespace_insensitive() -> None:
+    assert content_hash("Safari", "Docs", "https://example.com") == content_hash(
+        " Safari", "Docs  ", "https://example.com"
+    )
+    assert content_hash("Safari", "Docs", "") != content_hash("Safari", "Doc", "s")
+    assert len(content_hash("Safari", "Docs", "")) == 16
+
+
+@pytest.mark.unit
+def test_appservice_memoizes_repeated_contexts() -> None:
+    source = FakeSource()
+    storage = FakeStorage()
+    classifier = FakeClassifier()
+    context_store = FakeContextStore()
+    app = AppService(
+        source=source,
+        storage=storage,
+        classifier=classifier,
+        context_store=context_store,
+    )
+
+    app.start()
+    assert source.emit is not None
+    for i in range(3):
+        source.emit(Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title="main.py"))
+    source.emit(Event(start_ts=5.0, end_ts=6.0, app="Code", title="other.py"))
+
+    assert classifier.calls == 2
+    assert len(storage.engine_labels) == 4
+    assert len(context_store.rows) == 2
+
+    # A fresh service (e.g. after a restart) answers known contexts from the store.
+    restarted_classifier = FakeClassifier()
+    restarted = AppService(
+        source=source,
+        storage=storage,
+        classifier=restarted_classifier,
+        context_store=context_store,
+    )
+    restarted.start()
+    source.emit(Event(start_ts=7.0, end_ts=8.0, app="Code", title="main.py"))
+
+    assert restarted_classifier.calls == 0
+    assert storage.engine_labels[-1][2] == Classification(category_id="work", confidence=0.9)
+
+    # A new classifier version prunes results stored under the old one.
+    upgraded_classifier = FakeClassifier()
+    upgraded_classifier.engine_version = "rules-v2"
+    upgraded = AppService(
+        source=source,
+        storage=storage,
+        classifier=upgraded_classifier,
+        context_store=context_store,
+    )
+    upgraded.start()
+    source.emit(Event(start_ts=9.0, end_ts=10.0, app="Code", title="main.py"))
+
+    assert upgraded_classifier.calls == 1
+    assert [version for _, version in context_store.rows] == ["rules-v2"]
+
+
+@pytest.mark.unit
+def test_appservice_memo_can_be_disabled() -> None:
+    source = FakeSource()
+    classifier = FakeClassifier()
+    app = AppService(
+        source=source,
+        storage=FakeStorage(),
+        classifier=classifier,
+        config=AppServiceConfig(memo_max_entries=0),
+    )
+
+    app.start()
+    assert source.emit is not None
+    for i in range(3):
+        source.emit(Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title="main.py"))
+
+    assert classifier.calls == 3
+
+
+class GatedStorage(FakeStorage):
+    """Blocks inserts until the gate opens, to fill the ingestion queue."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+        self.entered = threading.Event()
+
+    def insert_event(self, e: Event) -> int:
+        self.entered.set()
+        assert self.gate.wait(timeout=5.0)
+        return super().insert_event(e)
+
+
+def _segment(i: int) -> Event:
+    return Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title=f"file{i}.py")
+
+
+@pytest.mark.unit
+def test_queued_ingestion_drains_in_order_on_stop() -> None:
+    source = FakeSource()
+    storage = FakeStorage()
+    publisher = FakePublisher()
+    app = AppService(
+        source=source,
+        storage=storage,
+        classifier=FakeClassifier(),
+        publisher=publisher,
+        config=AppServiceConfig(ingest_mode="queued"),
+    )
+
+    app.start()
+    assert source.emit is not None
+    for i in range(50):
+        source.emit(_segment(i))
+    app.stop()
+
+    assert source.stopped
+    assert [e.title for e in storage.inserted_events] == [f"file{i}.py" for i in range(50)]
+    assert len(storage.engine_labels) == 50
+    assert publisher.labeled_ids == list(range(1, 51))
+    stats = app.queue_stats()
+    assert stats["enqueued"] == stats["processed"] == 50
+    assert stats["dropped"] == 0
+    assert stats["depth"] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("policy", "kept"),
+    [("drop_newest", [0, 1, 2]), ("drop_oldest", [0, 4, 5]), ("block", [0, 1, 2])],
+)
+def test_queued_ingestion_overflow_policies(policy: str, kept: list[int]) -> None:
+    source = FakeSource()
+    storage = GatedStorage()
+    app = AppService(
+        source=source,
+        storage=storage,
+        config=AppServiceConfig(
+            ingest_mode="queued",
+            queue_max_events=2,
+            queue_overflow=policy,
+            queue_block_seconds=0.01,
+        ),
+    )
+
+    app.start()
+    assert source.emit is not None
+    source.emit(_segment(0))
+    assert storage.entered.wait(timeout=5.0)  # the worker holds event 0
+    for i in range(1, 6):
+        source.emit(_segment(i))
+
+    stats = app.queue_stats()
+    assert stats["depth"] == 2
+    assert stats["max_depth"] == 2
+    assert stats["dropped"] == 3
+
+    storage.gate.set()
+    app.stop()
+    assert [e.title for e in storage.inserted_events] == [f"file{i}.py" for i in kept]
+
+
+@pytest.mark.unit
+def test_queued_worker_survives_storage_errors() -> None:
+    class FlakyStorage(FakeStorage):
+        def insert_event(self, e: Event) -> int:
+            if e.title == "file1.py":
+                raise RuntimeError("disk full")
+            return super().insert_event(e)
+
+    source = FakeSource()
+    storage = FlakyStorage()
+    app = AppService(source=source, storage=storage, config=AppServiceConfig(ingest_mode="queued"))
+
+    app.start()
+    assert source.emit is not None
+    for i in range(3):
+        source.emit(_segment(i))
+    app.stop()
+
+    assert [e.title for e in storage.inserted_events] == ["file0.py", "file2.py"]
+    assert app.queue_stats()["errors"] == 1
+
+
+@pytest.mark.unit
+def test_appservice_rejects_unknown_overflow_policy() -> None:
+    with pytest.raises(ValueError):
+        AppService(
+            source=FakeSource(),
+            storage=FakeStorage(),
+            config=AppServiceConfig(ingest_mode="queued", queue_overflow="spill"),
+        )
+
+
+@pytest.mark.unit
+def test_queued_ingestion_group_commits_batches() -> None:
+    source = FakeSource()
+    storage = GatedStorage()
+    publisher = FakePublisher()
+    app = AppService(
+        source=source,
+        storage=storage,
+        classifier=FakeClassifier(),
+        publisher=publisher,
+        config=AppServiceConfig(ingest_mode="queued", commit_max_events=4, commit_max_seconds=0.01),
+    )
+
+    app.start()
+    assert source.emit is not None
+    source.emit(_segment(0))
+    assert storage.entered.wait(timeout=5.0)  # batch [0] is being written
+    for i in range(1, 10):
+        source.emit(_segment(i))
+    storage.gate.set()
+    app.stop()
+
+    assert storage.units_of_work == [1, 4, 4, 1]
+    assert [e.title for e in storage.inserted_events] == [f"file{i}.py" for i in range(10)]
+    assert [event_id for event_id, _, _ in storage.engine_labels] == list(range(1, 11))
+    assert publisher.recorded_ids == publisher.labeled_ids == list(range(1, 11))
+    assert app.queue_stats()["batches"] == 4
+
+
+@pytest.mark.unit
+def test_group_commit_needs_queued_mode() -> None:
+    with pytest.raises(ValueError):
+        AppService(source=FakeSource(), storage=FakeStorage(), config=AppServiceConfig(commit_max_events=8))
+
+
+@pytest.mark.unit
+def test_failed_group_commit_is_retried_event_by_event() -> None:
+    class RollbackStorage(FakeStorage):
+        """Undoes the inserts of a unit of work that raises; rejects file2.py."""
+
+        @contextmanager
+        def unit_of_work(self) -> Iterator[None]:
+            before = len(self.inserted_events)
+            try:
+                yield
+            except Exception:
+                del self.inserted_events[before:]
+                raise
+            self.units_of_work.append(len(self.inserted_events) - before)
+
+        def insert_event(self, e: Event) -> int:
+            if e.title == "file2.py":
+                raise RuntimeError("constraint failed")
+            return super().insert_event(e)
+
+    source = FakeSource()
+    storage = RollbackStorage()
+    app = AppService(
+        source=source,
+        storage=storage,
+        config=AppServiceConfig(ingest_mode="queued", commit_max_events=8, commit_max_seconds=0.5),
+    )
+
+    app.start()
+    assert source.emit is not None
+    for i in range(5):
+        source.emit(_segment(i))
+    app.stop()
+
+    assert [e.title for e in storage.inserted_events] == ["file0.py", "file1.py", "file3.py", "file4.py"]
+    assert storage.units_of_work == [1, 1, 1, 1]
+    stats = app.queue_stats()
+    assert (stats["processed"], stats["errors"], stats["batch_retries"]) == (5, 1, 1)
+    assert stats["last_error"] == "RuntimeError: constraint failed"
+
+
+@pytest.mark.unit
+def test_retried_events_roll_back_on_label_errors_and_publish_after_commit() -> None:
+    class RollbackStorage(FakeStorage):
+        """Undoes the writes of a unit of work that raises; rejects the label of file2.py."""
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.open_units = 0
+
+        @contextmanager
+        def unit_of_work(self) -> Iterator[None]:
+            before = (len(self.inserted_events), len(self.engine_labels))
+            self.open_units += 1
+            try:
+                yield
+            except Exception:
+                del self.inserted_events[before[0]:]
+                del self.engine_labels[before[1]:]
+                raise
+            finally:
+                self.open_units -= 1
+            self.units_of_work.append(len(self.inserted_events) - before[0])
+
+        def upsert_engine_classification(self, event_id: int, engine_version: str, c: Classification) -> None:
+            if self.inserted_events[event_id - 1].title == "file2.py":
+                raise RuntimeError("label write failed")
+            super().upsert_engine_classification(event_id, engine_version, c)
+
+    class CommitCheckingPublisher(FakePublisher):
+        def event_recorded(self, event_id: int) -> None:
+            assert storage.open_units == 0, "published before the commit"
+            super().event_recorded(event_id)
+
+    source = FakeSource()
+    storage = RollbackStorage()
+    publisher = CommitCheckingPublisher()
+    classifier = FakeClassifier()
+    app = AppService(
+        source=source,
+        storage=storage,
+        classifier=classifier,
+        publisher=publisher,
+        config=AppServiceConfig(ingest_mode="queued", commit_max_events=8, commit_max_seconds=0.5),
+    )
+
+    app.start()
+    assert source.emit is not None
+    for i in range(4):
+        source.emit(_segment(i))
+    app.stop()
+
+    assert [e.title for e in storage.inserted_events] == ["file0.py", "file1.py", "file3.py"]
+    assert [event_id for event_id, _, _ in storage.engine_labels] == [1, 2, 3]
+    assert publisher.recorded_ids == publisher.labeled_ids == [1, 2, 3]
+    assert classifier.calls == 4  # the retry reuses the batch's labels
+    stats = app.queue_stats()
+    assert (stats["processed"], stats["errors"], stats["batch_retries"]) == (4, 1, 1)
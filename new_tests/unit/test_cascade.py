@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from new_classifiers.cascade import CallbackClassifier, CascadeClassifier, Stage
+from new_core.appservice import AppService, AppServiceConfig
+from new_core.memo import ClassificationMemo
+from new_core.models import Classification, Event
+
+
+EVENT = Event(start_ts=1.0, end_ts=2.0, app="Firefox", title="Docs", url="https://example.com")
+
+
+class FakeSource:
+    def __init__(self) -> None:
+        self.emit = None
+
+    def start(self, emit) -> None:
+        self.emit = emit
+
+    def stop(self) -> None:
+        pass
+
+
+class FakeStorage:
+    def __init__(self) -> None:
+        self.engine_labels: list[tuple[int, str, Classification]] = []
+
+    def insert_event(self, e: Event) -> int:
+        return 1
+
+    def upsert_engine_classification(self, event_id: int, engine_version: str, c: Classification) -> None:
+        self.engine_labels.append((event_id, engine_version, c))
+
+
+class StaticClassifier:
+    def __init__(self, engine_version: str, category_id: str, confidence: float = 1.0) -> None:
+        self.engine_version = engine_version
+        self.category_id = category_id
+        self.confidence = confidence
+        self.calls = 0
+
+    def classify(self, e: Event) -> Classification:
+        self.calls += 1
+        return Classification(category_id=self.category_id, confidence=self.confidence, meta={"productive": True})
+
+
+class GatedClassifier(StaticClassifier):
+    """Blocks until the test releases it, like a slow network call."""
+
+    def __init__(self, engine_version: str, category_id: str) -> None:
+        super().__init__(engine_version, category_id)
+        self.release = threading.Event()
+
+    def classify(self, e: Event) -> Classification:
+        self.release.wait(5)
+        return super().classify(e)
+
+
+class FlakyClassifier(StaticClassifier):
+    """Raises on the first ``failures`` calls, like a network call that drops."""
+
+    def __init__(self, engine_version: str, category_id: str, failures: int = 1) -> None:
+        super().__init__(engine_version, category_id)
+        self.failures = failures
+
+    def classify(self, e: Event) -> Classification:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("model unreachable")
+        return super().classify(e)
+
+
+def _stage_statuses(c: Classification) -> list[tuple[str, str]]:
+    return [(step["stage"], step["status"]) for step in c.meta["cascade"]]
+
+
+@pytest.mark.unit
+def test_cascade_short_circuits_on_confident_result() -> None:
+    rules = StaticClassifier("rules-v1", "Coding")
+    model = StaticClassifier("local-nb-v1", "Research")
+    cascade = CascadeClassifier([Stage("rules", rules), Stage("local", model)])
+
+    result = cascade.classify(EVENT)
+
+    assert result.category_id == "Coding"
+    assert result.meta["stage"] == "rules"
+    assert result.meta["productive"] is True
+    assert _stage_statuses(result) == [("rules", "accepted")]
+    assert model.calls == 0
+    assert cascade.engine_version == "cascade[rules-v1>local-nb-v1]"
+
+
+@pytest.mark.unit
+def test_cascade_falls_through_unsure_stages() -> None:
+    cascade = CascadeClassifier(
+        [
+            Stage("rules", StaticClassifier("rules-v1", "Unknown")),
+            Stage("local", StaticClassifier("local-nb-v1", "Research", confidence=0.6), min_confidence=0.8),
+            Stage("ai", CallbackClassifier("ai-v1", lambda app, title, url: {"category": "Docs", "productive": True})),
+        ]
+    )
+
+    result = cascade.classify(EVENT)
+
+    assert result.category_id == "Docs"
+    assert result.meta["stage"] == "ai"
+    assert _stage_statuses(result) == [("rules", "rejected"), ("local", "rejected"), ("ai", "accepted")]
+
+
+@pytest.mark.unit
+def test_cascade_defers_over_budget_stage_and_reports_late_result() -> None:
+    slow = GatedClassifier("ai-v1", "Docs")
+    cascade = CascadeClassifier(
+        [Stage("rules", StaticClassifier("rules-v1", "Unknown")), Stage("ai", slow, budget_seconds=0.01)]
+    )
+    late: list[tuple[Event, Classification | None]] = []
+    done = threading.Event()
+    cascade.add_late_listener(lambda e, c: (late.append((e, c)), done.set()))
+
+    provisional = cascade.classify(EVENT)
+    slow.release.set()
+
+    assert provisional.category_id == "Unknown"
+    assert provisional.meta["pending"] == ["ai"]
+    assert _stage_statuses(provisional) == [("rules", "rejected"), ("ai", "deferred")]
+    assert done.wait(5)
+    event, final = late[0]
+    assert event == EVENT
+    assert final is not None and final.category_id == "Docs"
+    assert final.meta["stage"] == "ai"
+    assert _stage_statuses(final)[-1] == ("ai", "accepted")
+    cascade.close()
+
+
+@pytest.mark.unit
+def test_cascade_discards_late_results_past_timeout() -> None:
+    slow = GatedClassifier("ai-v1", "Docs")
+    cascade = CascadeClassifier([Stage("ai", slow, budget_seconds=0.01, timeout_seconds=0.02)])
+    late: list[Classification | None] = []
+    done = threading.Event()
+    cascade.add_late_listener(lambda e, c: (late.append(c), done.set()))
+
+    cascade.classify(EVENT)
+    threading.Timer(0.1, slow.release.set).start()
+
+    assert done.wait(5)
+    assert late == [None]
+    cascade.close()
+
+
+@pytest.mark.unit
+def test_appservice_stores_late_cascade_labels() -> None:
+    source = FakeSource()
+    storage = FakeStorage()
+    slow = GatedClassifier("ai-v1", "Docs")
+    cascade = CascadeClassifier(
+        [Stage("rules", StaticClassifier("rules-v1", "Unknown")), Stage("ai", slow, budget_seconds=0.01)]
+    )
+    app = AppService(source=source, storage=storage, classifier=cascade)
+    stored = threading.Event()
+    cascade.add_late_listener(lambda e, c: stored.set())  # runs after AppService's listener
+
+    app.start()
+    assert source.emit is not None
+    source.emit(EVENT)
+    slow.release.set()
+
+    assert stored.wait(5)
+    labels = [(event_id, c.category_id) for event_id, _, c in storage.engine_labels]
+    assert labels == [(1, "Unknown"), (1, "Docs")]
+    cascade.close()
+
+
+class HungClassifier(StaticClassifier):
+    """Never answers until the test tears it down."""
+
+    def __init__(self, engine_version: str) -> None:
+        super().__init__(engine_version, "Docs")
+        self.teardown = threading.Event()
+
+    def classify(self, e: Event) -> Classification:
+        self.teardown.wait()
+        return super().classify(e)
+
+
+@pytest.mark.unit
+def test_cascade_times_out_a_stage_that_never_returns() -> None:
+    source = FakeSource()
+    storage = FakeStorage()
+    hung = HungClassifier("ai-v1")
+    cascade = CascadeClassifier(
+        [Stage("ai", hung, budget_seconds=0.01, timeout_seconds=0.05)], max_workers=1
+    )
+    app = AppService(source=source, storage=storage, classifier=cascade)
+    late: list[Classification | None] = []
+    done = threading.Event()
+    cascade.add_late_listener(lambda e, c: (late.append(c), len(late) == 2 and done.set()))
+
+    app.start()
+    assert source.emit is not None
+    source.emit(EVENT)
+    source.emit(Event(start_ts=2.0, end_ts=3.0, app="Firefox", title="Other", url=""))  # queued behind the hung one
+
+    try:
+        assert done.wait(5)
+        assert late == [None, None]
+        assert not app._awaiting_late and not app._unclaimed_late
+    finally:
+        hung.teardown.set()
+        cascade.close()
+
+
+@pytest.mark.unit
+def test_appservice_forgets_unclaimed_late_labels() -> None:
+    class FailingLabelStorage(FakeStorage):
+        def upsert_engine_classification(self, event_id: int, engine_version: str, c: Classification) -> None:
+            raise RuntimeError("disk full")
+
+    source = FakeSource()
+    slow = GatedClassifier("ai-v1", "Docs")
+    cascade = CascadeClassifier([Stage("ai", slow, budget_seconds=0.01)])
+    app = AppService(
+        source=source,
+        storage=FailingLabelStorage(),
+        classifier=cascade,
+        config=AppServiceConfig(late_label_max_age_seconds=0.0),
+    )
+    done = threading.Event()
+    cascade.add_late_listener(lambda e, c: done.set())
+
+    app.start()
+    assert source.emit is not None
+    source.emit(EVENT)  # the provisional write fails, so the id is never awaited
+    slow.release.set()
+    assert done.wait(5)
+    assert len(app._unclaimed_late) == 1
+
+    app._await_late(Event(start_ts=5.0, end_ts=6.0, app="Code", title="x"), 7)
+
+    assert list(app._unclaimed_late) == []
+    cascade.close()
+
+
+@pytest.mark.unit
+def test_memo_retries_cascade_results_with_failed_stages() -> None:
+    flaky = FlakyClassifier("local-nb-v1", "Research")
+    cascade = CascadeClassifier([Stage("rules", StaticClassifier("rules-v1", "Unknown")), Stage("local", flaky)])
+    memo = ClassificationMemo()
+
+    first = memo.classify(cascade, EVENT)
+    assert first.category_id == "Unknown"
+    assert _stage_statuses(first) == [("rules", "rejected"), ("local", "error")]
+    assert len(memo) == 0
+
+    second = memo.classify(cascade, EVENT)
+    assert second.category_id == "Research"
+    assert memo.classify(cascade, EVENT) == second
+    assert flaky.calls == 1
+    assert memo.hits == 1
+
+
+@pytest.mark.unit
+def test_memo_does_not_remember_unknown_from_fallible_stages() -> None:
+    answers = [{}, {"category": "Docs", "productive": True}]
+    ai = CallbackClassifier("ai-v1", lambda app, title, url: answers.pop(0))
+    cascade = CascadeClassifier([Stage("rules", StaticClassifier("rules-v1", "Unknown")), Stage("ai", ai)])
+    memo = ClassificationMemo()
+
+    assert memo.classify(cascade, EVENT).category_id == "Unknown"
+    assert memo.classify(cascade, EVENT).category_id == "Docs"
+    assert len(memo) == 1
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from new_classifiers.compiled_rules import HotReloadingRules, compile_rules
+from new_classifiers.rules import RulesClassifier
+from new_core.models import Event
+
+
+def _write_rules(path, rules) -> None:
+    previous = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(json.dumps(rules), encoding="utf-8")
+    # Guarantee a visible mtime change even on coarse-grained filesystems.
+    os.utime(path, ns=(previous + 1_000_000_000, previous + 1_000_000_000))
+
+
+@pytest.mark.unit
+def test_compile_rules_writes_and_reuses_binary_cache(tmp_path) -> None:
+    rules_path = tmp_path / "rules.json"
+    cache_dir = tmp_path / "cache"
+    _write_rules(rules_path, {"Coding": {"apps": ["Code"], "domains": ["github.com/org"], "productive": True}})
+
+    first = compile_rules(rules_path, cache_dir)
+    cached_files = list(cache_dir.glob("*.pickle"))
+    second = compile_rules(rules_path, cache_dir)
+
+    assert len(cached_files) == 1
+    assert first.source_hash in cached_files[0].name
+    assert second == first
+    assert second.app_index == {"code": ("Coding", True)}
+    assert second.domain_index == {"github.com": [("/org", "Coding", True)]}
+
+
+@pytest.mark.unit
+def test_rules_classifier_picks_up_rule_edits(tmp_path) -> None:
+    rules_path = tmp_path / "rules.json"
+    _write_rules(rules_path, {"Coding": {"apps": ["Code"], "domains": [], "productive": True}})
+    classifier = RulesClassifier(rules_path, reload_interval=0.0, cache_dir=None)
+    event = Event(start_ts=1.0, end_ts=2.0, app="Obsidian", title="Notes", url="")
+
+    assert classifier.classify(event).category_id == "Unknown"
+
+    _write_rules(
+        rules_path,
+        {
+            "Coding": {"apps": ["Code"], "domains": [], "productive": True},
+            "Docs": {"apps": ["Obsidian"], "domains": [], "productive": True},
+        },
+    )
+
+    result = classifier.classify(event)
+    assert result.category_id == "Docs"
+    assert result.rule_id == "app:obsidian"
+
+
+@pytest.mark.unit
+def test_hot_rules_keep_previous_snapshot_on_invalid_file(tmp_path) -> None:
+    rules_path = tmp_path / "rules.json"
+    _write_rules(rules_path, {"Coding": {"apps": ["Code"], "domains": [], "productive": True}})
+    hot = HotReloadingRules(rules_path, cache_dir=None, check_interval=0.0)
+    before = hot.current()
+
+    bumped = rules_path.stat().st_mtime_ns + 2_000_000_000
+    rules_path.write_text("{not json", encoding="utf-8")
+    os.utime(rules_path, ns=(bumped, bumped))
+
+    assert hot.current() is before
+
+
+@pytest.mark.unit
+def test_rules_classifier_matches_title_and_url_patterns(tmp_path) -> None:
+    rules_path = tmp_path / "rules.json"
+    _write_rules(
+        rules_path,
+        {
+            "Coding": {
+                "apps": ["Code"],
+                "domains": [],
+                "url_globs": ["*github.com/*/pull/*"],
+                "productive": True,
+            },
+            "Productivity": {
+                "apps": [],
+                "domains": ["github.com"],
+                "title_regexes": [r"\bjira\b"],
+                "productive": True,
+            },
+        },
+    )
+    classifier = RulesClassifier(rules_path, cache_dir=None)
+
+    pull = classifier.classify(
+        Event(start_ts=1.0, end_ts=2.0, app="Firefox", title="Fix bug", url="https://github.com/o/r/pull/3")
+    )
+    repo = classifier.classify(
+        Event(start_ts=1.0, end_ts=2.0, app="Firefox", title="o/r", url="https://github.com/o/r")
+    )
+    jira = classifier.classify(
+        Event(start_ts=1.0, end_ts=2.0, app="Firefox", title="PROJ-1 - Jira", url="https://corp.example/browse")
+    )
+
+    assert (pull.category_id, pull.rule_id) == ("Coding", "url-glob:*github.com/*/pull/*")
+    assert (repo.category_id, repo.rule_id) == ("Productivity", "domain:github.com")
+    assert (jira.category_id, jira.rule_id) == ("Productivity", r"title-regex:\bjira\b")
+
+
+@pytest.mark.unit
+def test_invalid_pattern_keeps_previous_rules(tmp_path) -> None:
+    rules_path = tmp_path / "rules.json"
+    _write_rules(rules_path, {"Coding": {"apps": ["Code"], "title_regexes": ["main"], "productive": True}})
+    hot = HotReloadingRules(rules_path, cache_dir=None, check_interval=0.0)
+    before = hot.current()
+
+    _write_rules(rules_path, {"Coding": {"apps": ["Code"], "title_regexes": [r"(a)\1"], "productive": True}})
+
+    assert hot.current() is before
+
+
+@pytest.mark.unit
+def test_rules_files_with_the_same_name_keep_separate_caches(tmp_path) -> None:
+    cache_dir = tmp_path / "cache"
+    first_path = tmp_path / "a" / "rules.json"
+    second_path = tmp_path / "b" / "rules.json"
+    for path, app in ((first_path, "Code"), (second_path, "Slack")):
+        path.parent.mkdir()
+        _write_rules(path, {"Work": {"apps": [app], "domains": [], "productive": True}})
+
+    compile_rules(first_path, cache_dir)
+    compile_rules(second_path, cache_dir)
+
+    assert len(list(cache_dir.glob("rules-*.pickle"))) == 2
+    assert compile_rules(first_path, cache_dir).app_index == {"code": ("Work", True)}
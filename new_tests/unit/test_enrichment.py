@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Any, Hashable
+
+import pytest
+
+from new_core.models import Event, content_hash
+from new_logger.enrichment import (
+    EnrichedEventSource,
+    EnrichmentPipeline,
+    HashStage,
+    NormalizeTitleStage,
+    default_pipeline,
+    normalize_title,
+)
+from new_logger.replay import ReplayEventSource
+
+
+def _event(title: str = "Inbox", url: str = "", app: str = "Safari") -> Event:
+    return Event(start_ts=0.0, end_ts=1.0, app=app, title=title, url=url)
+
+
+class CountingStage:
+    name = "counting"
+    cacheable = True
+
+    def __init__(self) -> None:
+        self.computed = 0
+
+    def key(self, e: Event) -> Hashable:
+        return e.app
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        self.computed += 1
+        return {"app": e.app.upper()}
+
+
+class FailingStage:
+    name = "failing"
+    cacheable = True
+
+    def key(self, e: Event) -> Hashable:
+        return e.title
+
+    def compute(self, e: Event) -> dict[str, Any]:
+        raise RuntimeError("boom")
+
+
+@pytest.mark.unit
+def test_default_pipeline_sanitizes_normalizes_and_hashes() -> None:
+    pipeline = default_pipeline()
+    e = pipeline.enrich(_event(title="  Docs\u200b \tpage ", url="https://Example.com/a?token=secret#frag"))
+
+    assert e.url == "https://example.com/a?token=_REDACTED_"
+    assert e.title == "Docs page"
+    assert e.content_hash == content_hash(e.app, e.title, e.url)
+
+
+@pytest.mark.unit
+def test_normalize_title_strips_unread_counters_only_when_asked() -> None:
+    assert normalize_title("(3) Inbox") == "(3) Inbox"
+    assert normalize_title("(12+) Slack", strip_counters=True) == "Slack"
+    assert normalize_title("Café\x00 menu") == "Café menu"
+
+
+@pytest.mark.unit
+def test_stage_results_are_cached_by_key() -> None:
+    stage = CountingStage()
+    pipeline = EnrichmentPipeline([stage], cache_size=2)
+
+    assert pipeline.enrich(_event(app="code")).app == "CODE"
+    assert pipeline.enrich(_event(app="code", title="other")).app == "CODE"
+    pipeline.enrich(_event(app="a"))
+    pipeline.enrich(_event(app="b"))  # evicts "code"
+    pipeline.enrich(_event(app="code"))
+
+    stats = pipeline.stats()["counting"]
+    assert stage.computed == 4
+    assert (stats.calls, stats.cache_hits, stats.errors) == (5, 1, 0)
+    assert stats.seconds > 0
+
+
+@pytest.mark.unit
+def test_failing_stage_passes_the_event_through() -> None:
+    pipeline = EnrichmentPipeline([FailingStage(), HashStage()])
+
+    e = pipeline.enrich(_event())
+
+    assert e.title == "Inbox"
+    assert e.content_hash is not None
+    assert pipeline.stats()["failing"].errors == 1
+
+
+@pytest.mark.unit
+def test_pipeline_rejects_duplicate_stage_names() -> None:
+    with pytest.raises(ValueError):
+        EnrichmentPipeline([NormalizeTitleStage(), NormalizeTitleStage()])
+
+
+@pytest.mark.unit
+def test_enriched_source_wraps_any_event_source() -> None:
+    inner = ReplayEventSource([_event(title="a  b"), _event(title="c")])
+    source = EnrichedEventSource(inner)
+    events: list[Event] = []
+
+    source.start(events.append)
+
+    assert [e.title for e in events] == ["a b", "c"]
+    assert all(e.content_hash for e in events)
+    assert source.pipeline.stats()["content_hash"].calls == 2
+
+
+@pytest.mark.unit
+def test_device_stage_stamps_only_events_without_a_device() -> None:
+    pipeline = default_pipeline(device="mac")
+
+    assert pipeline.enrich(_event()).device == "mac"
+    assert pipeline.enrich(replace(_event(), device="pc")).device == "pc"
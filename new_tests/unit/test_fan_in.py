@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Optional
+
+import pytest
+
+from new_core.models import Event
+from new_logger.fan_in import FanInEventSource, SourceSpec
+from new_logger.replay import ReplayEventSource
+
+
+def _event(start: float, end: float, app: str) -> Event:
+    return Event(start_ts=start, end_ts=end, app=app, title="")
+
+
+def _timeline(events: list[Event]) -> list[tuple[float, float, str]]:
+    return [(e.start_ts, e.end_ts, e.app) for e in events]
+
+
+class ManualSource:
+    """Emits events when the test calls push(); start blocks until stop()."""
+
+    def __init__(self) -> None:
+        self.emit: Optional[Callable[[Event], None]] = None
+        self.started = threading.Event()
+        self.stopped = threading.Event()
+
+    def start(self, emit: Callable[[Event], None]) -> None:
+        self.emit = emit
+        self.started.set()
+        self.stopped.wait(timeout=10.0)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def push(self, e: Event) -> None:
+        assert self.emit is not None
+        self.emit(e)
+
+
+@pytest.mark.unit
+def test_fan_in_resolves_overlaps_by_priority() -> None:
+    windows = ReplayEventSource([_event(0, 100, "Firefox"), _event(100, 200, "Code")])
+    tabs = ReplayEventSource([_event(10, 20, "tab1"), _event(30, 150, "tab2")])
+    merged = FanInEventSource(
+        [SourceSpec("window", windows, priority=0), SourceSpec("browser", tabs, priority=10)],
+        poll_seconds=0.01,
+    )
+
+    out: list[Event] = []
+    merged.start(out.append)
+
+    assert _timeline(out) == [
+        (0, 10, "Firefox"),
+        (10, 20, "tab1"),
+        (20, 30, "Firefox"),
+        (30, 150, "tab2"),
+        (150, 200, "Code"),
+    ]
+    stats = merged.stats()
+    assert stats["split"] == 1
+    assert stats["by_source"] == {"window": 2, "browser": 2}
+
+
+@pytest.mark.unit
+def test_fan_in_equal_priority_keeps_the_earlier_segment() -> None:
+    a = ReplayEventSource([_event(0, 50, "a")])
+    b = ReplayEventSource([_event(40, 60, "b"), _event(60, 70, "c")])
+    merged = FanInEventSource([SourceSpec("a", a), SourceSpec("b", b)], poll_seconds=0.01)
+
+    out: list[Event] = []
+    merged.start(out.append)
+
+    assert _timeline(out) == [(0, 50, "a"), (50, 60, "b"), (60, 70, "c")]
+
+
+@pytest.mark.unit
+def test_fan_in_waits_for_the_watermark_of_every_running_source() -> None:
+    fast, slow = ManualSource(), ManualSource()
+    merged = FanInEventSource([SourceSpec("fast", fast), SourceSpec("slow", slow, priority=1)], poll_seconds=0.01)
+    out: list[Event] = []
+    released = threading.Event()
+
+    def emit(e: Event) -> None:
+        out.append(e)
+        released.set()
+
+    runner = threading.Thread(target=merged.start, args=(emit,))
+    runner.start()
+    assert fast.started.wait(5.0) and slow.started.wait(5.0)
+
+    fast.push(_event(0, 10, "fast"))
+    assert not released.wait(0.1)  # slow has said nothing yet; it might overlap
+
+    slow.push(_event(5, 8, "slow"))
+    assert not released.wait(0.1)  # slow could still send something in [8, 10)
+
+    slow.push(_event(12, 15, "slow"))
+    assert released.wait(5.0)
+    merged.stop()
+    runner.join(5.0)
+
+    assert _timeline(out) == [(0, 5, "fast"), (5, 8, "slow"), (8, 10, "fast"), (12, 15, "slow")]
+
+
+@pytest.mark.unit
+def test_fan_in_releases_early_when_the_buffer_is_full() -> None:
+    fast, idle = ManualSource(), ManualSource()
+    merged = FanInEventSource([SourceSpec("fast", fast), SourceSpec("idle", idle)], max_buffered=2, poll_seconds=0.01)
+    out: list[Event] = []
+    runner = threading.Thread(target=merged.start, args=(out.append,))
+    runner.start()
+    assert fast.started.wait(5.0)
+
+    for i in range(4):
+        fast.push(_event(i, i + 1, f"e{i}"))
+    merged.stop()
+    runner.join(5.0)
+
+    assert [e.app for e in out] == ["e0", "e1", "e2", "e3"]
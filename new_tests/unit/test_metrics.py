@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import socket
+import urllib.request
+from typing import Callable, Optional
+
+import pytest
+
+from new_core.appservice import CLASSIFY_FAILURES, EVENTS_INGESTED, AppService
+from new_core.metrics import REGISTRY, MetricsRegistry
+from new_core.models import Classification, Event
+from new_publish.metrics_http import MetricsServer
+from new_storage.sqlite import STORAGE_SECONDS, SQLiteStorage
+
+
+class FakeSource:
+    def __init__(self) -> None:
+        self.emit: Optional[Callable[[Event], None]] = None
+
+    def start(self, emit: Callable[[Event], None]) -> None:
+        self.emit = emit
+
+    def stop(self) -> None:
+        pass
+
+
+class BrokenClassifier:
+    engine_version = "broken-v1"
+
+    def classify(self, e: Event) -> Classification:
+        raise RuntimeError("model missing")
+
+
+@pytest.mark.unit
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    events = registry.counter("demo_events", "Events seen.", ("source",))
+    depth = registry.gauge("demo_depth", "Queue depth.")
+    latency = registry.histogram("demo_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    events.labels(source='mac"os').inc(3)
+    depth.set(7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_depth Queue depth.",
+        "# TYPE demo_depth gauge",
+        "demo_depth 7",
+        "# HELP demo_events_total Events seen.",
+        "# TYPE demo_events_total counter",
+        'demo_events_total{source="mac\\"os"} 3',
+        "# HELP demo_seconds Latency.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{le="0.1"} 1',
+        'demo_seconds_bucket{le="1"} 2',
+        'demo_seconds_bucket{le="+Inf"} 3',
+        "demo_seconds_sum 5.55",
+        "demo_seconds_count 3",
+    ]
+
+
+@pytest.mark.unit
+def test_registry_reuses_metrics_by_name() -> None:
+    registry = MetricsRegistry()
+    first = registry.counter("demo_polls", "Polls.", ("source",))
+
+    assert registry.counter("demo_polls", "Polls.", ("source",)) is first
+    with pytest.raises(ValueError):
+        registry.gauge("demo_polls", "Polls.")
+    with pytest.raises(ValueError):
+        first.inc()  # labelled metrics need labels()
+
+
+@pytest.mark.unit
+def test_appservice_counts_classification_failures(tmp_path) -> None:
+    source = FakeSource()
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    app = AppService(source=source, storage=storage, classifier=BrokenClassifier())
+    failures, ingested = CLASSIFY_FAILURES.value, EVENTS_INGESTED.value
+    inserts = STORAGE_SECONDS.labels(op="insert_event").count
+
+    app.start()
+    assert source.emit is not None
+    source.emit(Event(start_ts=1.0, end_ts=2.0, app="Code", title="main.py"))
+    storage.close()
+
+    assert CLASSIFY_FAILURES.value == failures + 1
+    assert EVENTS_INGESTED.value == ingested + 1
+    assert STORAGE_SECONDS.labels(op="insert_event").count == inserts + 1
+
+
+@pytest.mark.unit
+def test_metrics_server_serves_the_registry() -> None:
+    server = MetricsServer(REGISTRY)
+    server.start()
+    try:
+        with urllib.request.urlopen(server.url, timeout=5.0) as response:
+            content_type = response.headers["Content-Type"]
+            body = response.read().decode("utf-8")
+    finally:
+        server.stop()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE activity_events_ingested_total counter" in body
+    assert "activity_events_received_total " in body
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(not socket.has_ipv6, reason="no IPv6 support")
+def test_metrics_server_binds_ipv6_loopback() -> None:
+    try:
+        server = MetricsServer(REGISTRY, host="::1")
+    except OSError:
+        pytest.skip("::1 is not configured")
+    server.start()
+    try:
+        assert server.url.startswith("http://[::1]:")
+        with urllib.request.urlopen(server.url, timeout=5.0) as response:
+            assert response.status == 200
+    finally:
+        server.stop()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+
+import pytest
+
+from new_classifiers.naive_bayes import NaiveBayesClassifier, iter_sqlite_samples
+from new_core.models import Classification, Event
+from new_storage.sqlite import SQLiteStorage
+
+
+SAMPLES = [
+    ("Firefox", "Pull request #12 - repo", "https://github.com/org/repo/pull/12", "Coding"),
+    ("Firefox", "Issues - repo", "https://github.com/org/repo/issues", "Coding"),
+    ("Code", "main.py - project", "", "Coding"),
+    ("Firefox", "Funny cat video", "https://www.youtube.com/watch?v=1", "Entertainment"),
+    ("Firefox", "Music mix video", "https://www.youtube.com/watch?v=2", "Entertainment"),
+    ("Spotify", "Playlist", "", "Entertainment"),
+    ("Firefox", "Something", "https://unknown.example", "Unknown"),
+]
+
+
+@pytest.mark.unit
+def test_naive_bayes_predicts_from_hashed_context_tokens() -> None:
+    model = NaiveBayesClassifier.train(
+        SAMPLES,
+        productive_by_category={"Coding": True},
+        min_confidence=0.6,
+    )
+
+    assert sorted(model.classes) == ["Coding", "Entertainment"]
+
+    result = model.classify(
+        Event(start_ts=1.0, end_ts=2.0, app="Firefox", title="Pull request #99", url="https://github.com/org/other/pull/99")
+    )
+    assert result.category_id == "Coding"
+    assert result.rule_id == "local-nb"
+    assert result.meta == {"productive": True}
+    assert result.confidence >= 0.6
+
+
+@pytest.mark.unit
+def test_naive_bayes_reports_unknown_below_threshold() -> None:
+    model = NaiveBayesClassifier.train(SAMPLES, min_confidence=0.999999)
+
+    result = model.classify(Event(start_ts=1.0, end_ts=2.0, app="Terminal", title="", url=""))
+
+    assert result.category_id == "Unknown"
+    assert result.rule_id is None
+    assert result.confidence < 0.999999
+
+
+@pytest.mark.unit
+def test_naive_bayes_roundtrips_through_npz(tmp_path) -> None:
+    model = NaiveBayesClassifier.train(SAMPLES, productive_by_category={"Coding": True})
+    path = model.save(tmp_path / "model.npz")
+
+    loaded = NaiveBayesClassifier.load(path)
+
+    for app, title, url, _ in SAMPLES:
+        assert loaded.predict(app, title, url) == pytest.approx(model.predict(app, title, url))
+
+
+@pytest.mark.unit
+def test_sqlite_samples_prefer_user_overrides(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    first = storage.insert_event(Event(start_ts=1.0, end_ts=2.0, app="Code", title="a", url=""))
+    second = storage.insert_event(Event(start_ts=2.0, end_ts=3.0, app="Slack", title="b", url=""))
+    storage.insert_event(Event(start_ts=3.0, end_ts=4.0, app="Mail", title="c", url=""))
+    storage.upsert_engine_classification(first, "rules-v1", Classification(category_id="Coding"))
+    storage.upsert_engine_classification(second, "rules-v1", Classification(category_id="Unknown"))
+    storage.set_user_override(second, "Communication")
+    storage.close()
+
+    samples = sorted(iter_sqlite_samples(tmp_path / "activity.sqlite3"))
+
+    assert samples == [("Code", "a", "", "Coding"), ("Slack", "b", "", "Communication")]
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import fnmatch
+import pickle
+import re
+
+import pytest
+
+from new_classifiers.patterns import PatternSet
+
+
+REGEXES = [
+    r"\bjira\b",
+    r"pull/\d+",
+    r"^github",
+    r"x{2,3}y",
+    r"(ab|cd)+e$",
+    r"[^a-c]z",
+    r"\Bum",
+    r"colou?r",
+    r"\w+@\S+",
+    r"[A-Z]{2}-\d",
+]
+TEXTS = [
+    "JIRA board",
+    "my jira-ticket",
+    "jirax",
+    "github.com/a/pull/12",
+    "see github",
+    "xxy",
+    "ababcde",
+    "ababcdex",
+    "qz",
+    "az",
+    "dum",
+    "um",
+    "colour",
+    "me@example.org",
+    "Ab-1",
+    "",
+]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("pattern", REGEXES)
+def test_regex_patterns_agree_with_re_search(pattern) -> None:
+    patterns = PatternSet([("regex", pattern, pattern)])
+
+    for text in TEXTS:
+        expected = re.search(pattern, text, re.IGNORECASE) is not None
+        assert (patterns.match(text) is not None) == expected, (pattern, text)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("glob", ["*github.com/*/pull/*", "*.pdf", "report-??.txt", "[!a]bc", "[a-c]x*", "*", "*abc"])
+def test_glob_patterns_match_the_whole_text(glob) -> None:
+    patterns = PatternSet([("glob", glob, glob)])
+
+    for text in ["https://github.com/o/r/pull/3", "https://github.com/o/r", "notes.PDF", "report-12.txt", "zbc", "abc", "bxyz"]:
+        expected = re.fullmatch(fnmatch.translate(glob), text.lower()) is not None
+        assert (patterns.match(text) is not None) == expected, (glob, text)
+
+
+@pytest.mark.unit
+def test_first_listed_pattern_wins_and_survives_pickling() -> None:
+    patterns = PatternSet(
+        [
+            ("regex", r"pull/\d+", "pr"),
+            ("glob", "*github.com*", "github"),
+            ("regex", "nothing", "never"),
+        ]
+    )
+    restored = pickle.loads(pickle.dumps(patterns))
+
+    assert patterns.match("https://github.com/o/r/pull/7") == "pr"
+    assert patterns.match("https://github.com/o/r") == "github"
+    assert patterns.match("https://example.com") is None
+    assert restored == patterns
+    assert restored.match("https://github.com/o/r/pull/7") == "pr"
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("pattern", [r"(a)\1", r"foo(?=bar)", r"(?>a+)b", r"a{1000}"])
+def test_non_regular_constructs_are_rejected(pattern) -> None:
+    with pytest.raises(ValueError):
+        PatternSet([("regex", pattern, None)])
+
+
+@pytest.mark.unit
+def test_lazy_dfa_is_dropped_whole_when_it_reaches_the_state_limit(monkeypatch) -> None:
+    monkeypatch.setattr("new_classifiers.patterns.MAX_DFA_STATES", 64)
+    words = [f"w{i}x{i * 7 % 13}" for i in range(40)]
+    patterns = PatternSet([("regex", word, word) for word in words])
+    first_initial = patterns._initial
+
+    texts = [f"see {a} and {b}" for a in words for b in words[::3]]
+    for text in texts:
+        expected = next((word for word in words if word in text), None)
+        assert patterns.match(text) == expected
+
+    reachable = {id(patterns._initial)}
+    frontier = [patterns._initial]
+    while frontier:
+        for target, _ in frontier.pop().next.values():
+            if id(target) not in reachable:
+                reachable.add(id(target))
+                frontier.append(target)
+    assert patterns._initial is not first_initial  # the limit was hit
+    assert not first_initial.next
+    assert len(reachable) <= 64
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import threading
+
+import pytest
+
+from new_classifiers.profiling import ClassificationProfile
+from new_classifiers.rules import RulesClassifier
+from new_core.models import Event
+
+
+@pytest.mark.unit
+def test_profile_merges_per_thread_counters() -> None:
+    profile = ClassificationProfile(latency_buckets_us=(10, 100))
+
+    def work() -> None:
+        for _ in range(1000):
+            profile.record("app:code", "code", "", 0.000005)
+        profile.record(None, "mystery", "unknown.example", 0.001)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = profile.snapshot()
+    assert snapshot["calls"] == 4004
+    assert snapshot["rules"] == {"app:code": 4000}
+    assert snapshot["unmatched_apps"] == {"mystery": 4}
+    assert snapshot["unmatched_hosts"] == {"unknown.example": 4}
+    assert snapshot["latency_histogram"] == {"<=10us": 4000, "<=100us": 0, ">100us": 4}
+
+
+@pytest.mark.unit
+def test_profile_reset_and_dump(tmp_path) -> None:
+    profile = ClassificationProfile()
+    profile.record("idle", "idle", "", 0.00001)
+    profile.reset()
+    profile.record("domain:github.com", "firefox", "github.com", 0.00001)
+
+    path = tmp_path / "profile.json"
+    text = profile.dump(path)
+
+    assert json.loads(path.read_text()) == json.loads(text)
+    assert json.loads(text)["rules"] == {"domain:github.com": 1}
+
+
+@pytest.mark.unit
+def test_rules_classifier_records_into_profile() -> None:
+    profile = ClassificationProfile()
+    classifier = RulesClassifier(profile=profile, cache_dir=None)
+
+    classifier.classify(Event(start_ts=1.0, end_ts=2.0, app="Visual Studio Code", title="main.py"))
+    classifier.classify(Event(start_ts=2.0, end_ts=3.0, app="Firefox", title="x", url="https://unknown.example/a"))
+
+    snapshot = profile.snapshot()
+    assert snapshot["rules"] == {"app:visual studio code": 1}
+    assert snapshot["unmatched_hosts"] == {"unknown.example": 1}
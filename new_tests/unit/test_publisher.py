@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from new_core.models import Event
+from new_publish.coalescing import ChangeSet, CoalescingPublisher, merge_spans
+from new_publish.sse import SSEServer
+from new_storage.sqlite import SQLiteStorage
+
+
+@pytest.mark.unit
+def test_publisher_coalesces_a_burst_into_one_change_set(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    ids = [
+        storage.insert_event(Event(start_ts=start, end_ts=start + 10.0, app="Code", title="x"))
+        for start in (0.0, 10.0, 100.0)
+    ]
+    publisher = CoalescingPublisher(window_seconds=0.05, span_lookup=storage.event_spans)
+    received: list[ChangeSet] = []
+    done = threading.Event()
+    publisher.subscribe(lambda cs: (received.append(cs), done.set()))
+
+    for event_id in ids:
+        publisher.event_recorded(event_id)
+        publisher.label_updated(event_id)
+    publisher.label_updated(ids[0])
+    publisher.override_updated(ids[2])
+
+    assert done.wait(timeout=5.0)
+    publisher.close()
+    storage.close()
+
+    assert len(received) == 1
+    change_set = received[0]
+    assert change_set.seq == 1
+    assert change_set.recorded == change_set.labeled == tuple(ids)
+    assert change_set.overridden == (ids[2],)
+    assert change_set.ranges == ((0.0, 20.0), (100.0, 110.0))
+
+
+@pytest.mark.unit
+def test_publisher_flushes_early_when_the_batch_is_full() -> None:
+    publisher = CoalescingPublisher(window_seconds=60.0, max_pending=3)
+    received: list[ChangeSet] = []
+    done = threading.Event()
+    publisher.subscribe(lambda cs: (received.append(cs), done.set()))
+
+    for event_id in (1, 2, 3):
+        publisher.event_recorded(event_id)
+
+    assert done.wait(timeout=5.0)
+    publisher.close()
+    assert received[0].recorded == (1, 2, 3)
+    assert received[0].ranges == ()
+
+
+@pytest.mark.unit
+def test_publisher_history_supports_catch_up() -> None:
+    publisher = CoalescingPublisher(window_seconds=60.0, history=2)
+    for event_id in (1, 2, 3):
+        publisher.event_recorded(event_id)
+        publisher.flush()
+
+    assert [cs.recorded for cs in publisher.changes_since(1)] == [(2,), (3,)]
+    assert publisher.changes_since(3) == []
+    assert publisher.changes_since(0) is None  # change set 1 fell out of the history
+    assert publisher.changes_since(9) is None  # ahead: from an earlier process
+    publisher.close()
+
+
+@pytest.mark.unit
+def test_merge_spans_joins_touching_segments() -> None:
+    assert merge_spans([(5.0, 6.0), (0.0, 2.0), (2.0, 3.0), (2.5, 4.0)]) == ((0.0, 4.0), (5.0, 6.0))
+
+
+def _read_until(sock: socket.socket, marker: bytes, timeout: float = 5.0) -> bytes:
+    sock.settimeout(timeout)
+    data = b""
+    deadline = time.monotonic() + timeout
+    while marker not in data and time.monotonic() < deadline:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+@pytest.mark.unit
+def test_sse_server_streams_and_replays_change_sets() -> None:
+    publisher = CoalescingPublisher(window_seconds=60.0)
+    server = SSEServer(publisher, keepalive_seconds=0.2)
+    server.start()
+    try:
+        publisher.event_recorded(1)
+        publisher.flush()
+
+        with socket.create_connection(("127.0.0.1", server.port)) as sock:
+            request = f"GET /events HTTP/1.1\r\nHost: localhost\r\nLast-Event-ID: {publisher.epoch}-0\r\n\r\n"
+            sock.sendall(request.encode())
+            replayed = _read_until(sock, b'"recorded":[1]')
+            assert b"text/event-stream" in replayed
+            assert f"id: {publisher.epoch}-1\nevent: changes\n".encode() in replayed
+
+            publisher.label_updated(7)
+            publisher.flush()
+            live = _read_until(sock, f"id: {publisher.epoch}-2".encode())
+            line = next(l for l in live.split(b"\n") if l.startswith(b"data: {\"seq\":2"))
+            assert json.loads(line[len(b"data: "):])["labeled"] == [7]
+
+            assert b": keepalive" in _read_until(sock, b": keepalive")
+    finally:
+        server.stop()
+        publisher.close()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("last_id", ["{epoch}-40", "old-process-3", "40"])
+def test_sse_server_resyncs_clients_with_ids_from_another_process(last_id: str) -> None:
+    publisher = CoalescingPublisher(window_seconds=60.0)
+    server = SSEServer(publisher, keepalive_seconds=5.0)
+    server.start()
+    try:
+        publisher.event_recorded(1)
+        publisher.flush()
+
+        with socket.create_connection(("127.0.0.1", server.port)) as sock:
+            header = last_id.format(epoch=publisher.epoch)
+            sock.sendall(f"GET /events HTTP/1.1\r\nHost: localhost\r\nLast-Event-ID: {header}\r\n\r\n".encode())
+            assert b"event: resync" in _read_until(sock, b"event: resync")
+
+            publisher.label_updated(7)
+            publisher.flush()
+            assert b'"labeled":[7]' in _read_until(sock, b'"labeled":[7]')
+    finally:
+        server.stop()
+        publisher.close()
+
+
+@pytest.mark.unit
+def test_sse_server_only_binds_loopback() -> None:
+    with pytest.raises(ValueError):
+        SSEServer(CoalescingPublisher(), host="0.0.0.0")
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from new_classifiers.rules import RulesClassifier
+from new_core.models import Classification, Event
+from new_storage.reclassify import checkpoint_name, reclassify
+from new_storage.sqlite import SQLiteStorage
+
+
+class _FailingClassifier:
+    """Same engine as the rules classifier, but fails on a marked title."""
+
+    engine_version = RulesClassifier.engine_version
+
+    def classify(self, e: Event) -> Classification:
+        if e.title == "boom":
+            raise RuntimeError("interrupted")
+        return Classification(category_id="Partial")
+
+
+def _seed(storage: SQLiteStorage, count: int, boom_at: int | None = None) -> list[int]:
+    return [
+        storage.insert_event(
+            Event(
+                start_ts=float(i),
+                end_ts=float(i) + 1.0,
+                app="Visual Studio Code",
+                title="boom" if i == boom_at else f"file{i}.py",
+            )
+        )
+        for i in range(count)
+    ]
+
+
+def _labels(storage: SQLiteStorage) -> dict[int, str]:
+    with sqlite3.connect(storage.db_path) as conn:
+        rows = conn.execute(
+            "SELECT event_id, category_id FROM engine_classifications WHERE engine_version = 'rules-v1'"
+        ).fetchall()
+    return dict(rows)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("workers", [0, 2])
+def test_reclassify_labels_every_missing_event(tmp_path, workers) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    ids = _seed(storage, 25)
+    storage.upsert_engine_classification(ids[3], "rules-v1", Classification(category_id="Kept"))
+
+    result = reclassify(storage, RulesClassifier, chunk_size=4, workers=workers, log=None)
+
+    labels = _labels(storage)
+    assert result.classified == 24
+    assert labels[ids[3]] == "Kept"
+    assert {labels[i] for i in ids if i != ids[3]} == {"Coding"}
+    assert storage.get_checkpoint(checkpoint_name("rules-v1")) == ids[-1]
+    storage.close()
+
+
+@pytest.mark.unit
+def test_reclassify_resumes_from_checkpoint(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    ids = _seed(storage, 10, boom_at=6)
+
+    with pytest.raises(RuntimeError):
+        reclassify(storage, _FailingClassifier, chunk_size=3, workers=0, log=None)
+
+    # Chunks before the failing one are stored and checkpointed.
+    assert storage.get_checkpoint(checkpoint_name("rules-v1")) == ids[5]
+    assert sorted(_labels(storage)) == ids[:6]
+
+    messages: list[str] = []
+    result = reclassify(storage, RulesClassifier, chunk_size=3, workers=0, log=messages.append)
+
+    labels = _labels(storage)
+    assert result.classified == 4
+    assert [labels[i] for i in ids] == ["Partial"] * 6 + ["Coding"] * 4
+    assert messages[0] == f"[reclassify] rules-v1: resuming after event {ids[5]}"
+    assert any("events/s" in message for message in messages)
+    storage.close()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from new_core.models import Event
+from new_logger.replay import ReplayEventSource, main, open_history, parse_speed
+from new_storage.sqlite import SQLiteStorage
+
+
+def _collect(source: ReplayEventSource) -> list[Event]:
+    events: list[Event] = []
+    source.start(events.append)
+    return events
+
+
+@pytest.mark.unit
+def test_replay_reads_jsonl_with_epoch_or_iso_timestamps(tmp_path) -> None:
+    path = tmp_path / "trace.jsonl"
+    rows = [
+        {"start_ts": 10.0, "end_ts": 20.0, "app": "Code", "title": "main.py", "url": None},
+        {"start_time": "2024-01-01T09:00:00", "end_time": "2024-01-01T09:05:00", "app": "Safari", "title": "Docs"},
+    ]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n\n", encoding="utf-8")
+
+    events = _collect(ReplayEventSource(path))
+
+    assert events[0] == Event(start_ts=10.0, end_ts=20.0, app="Code", title="main.py", url="")
+    assert events[1].start_ts == datetime(2024, 1, 1, 9, 0).timestamp()
+    assert events[1].end_ts - events[1].start_ts == 300.0
+
+
+@pytest.mark.unit
+def test_replay_merges_legacy_parquet_months_in_order(tmp_path) -> None:
+    def write(name: str, rows: list[tuple[str, str, str]]) -> None:
+        pd.DataFrame(
+            {
+                "start_time": pd.to_datetime([r[0] for r in rows]),
+                "end_time": pd.to_datetime([r[1] for r in rows]),
+                "app": [r[2] for r in rows],
+                "title": ["t"] * len(rows),
+                "url": [None] * len(rows),
+                "category": ["Coding"] * len(rows),
+            }
+        ).to_parquet(tmp_path / name, index=False)
+
+    write("activity_2024_02_laptop.parquet", [("2024-02-01 10:00", "2024-02-01 10:30", "Feb")])
+    write("activity_2024_01_laptop.parquet", [("2024-01-02 10:00", "2024-01-02 11:00", "Jan-laptop")])
+    write("activity_2024_01_desktop.parquet", [("2024-01-01 08:00", "2024-01-01 09:00", "Jan-desktop")])
+
+    events = list(open_history(tmp_path))
+
+    assert [e.app for e in events] == ["Jan-desktop", "Jan-laptop", "Feb"]
+    assert events[0].start_ts == datetime(2024, 1, 1, 8, 0).timestamp()
+    assert events[0].url == ""
+
+
+@pytest.mark.unit
+def test_replay_backfills_a_database_from_another(tmp_path) -> None:
+    original = SQLiteStorage(tmp_path / "original.sqlite3")
+    for start in (30.0, 10.0, 20.0):
+        original.insert_event(Event(start_ts=start, end_ts=start + 5.0, app="Code", title=f"t{start}"))
+    original.close()
+
+    main([str(tmp_path / "original.sqlite3"), "--db", str(tmp_path / "copy.sqlite3"), "--commit-batch", "2"])
+
+    replayed = list(open_history(tmp_path / "copy.sqlite3"))
+    assert [e.start_ts for e in replayed] == [10.0, 20.0, 30.0]
+    assert all(e.content_hash for e in replayed)
+
+
+@pytest.mark.unit
+def test_replay_paces_events_by_speed() -> None:
+    trace = [Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title="x") for i in range(3)]
+
+    started = time.monotonic()
+    events = _collect(ReplayEventSource(trace, speed=100.0))
+    elapsed = time.monotonic() - started
+
+    assert events == trace
+    assert elapsed >= 0.019  # two one-second gaps at 100x
+
+
+@pytest.mark.unit
+def test_replay_stop_interrupts_a_wait() -> None:
+    trace = [Event(start_ts=0.0, end_ts=1.0, app="a", title=""), Event(start_ts=1.0, end_ts=3601.0, app="b", title="")]
+    source = ReplayEventSource(trace, speed=1.0)
+    emitted: list[Event] = []
+
+    def emit(e: Event) -> None:
+        emitted.append(e)
+        source.stop()
+
+    source.start(emit)
+    assert [e.app for e in emitted] == ["a"]
+
+
+@pytest.mark.unit
+def test_parse_speed() -> None:
+    assert parse_speed("max") is None
+    assert parse_speed("realtime") == 1.0
+    assert parse_speed("60x") == 60.0
+    assert parse_speed("2.5") == 2.5
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from new_core.models import Classification, Event
+from new_storage.rollups import RollupRow, main, split_by_bucket
+from new_storage.sqlite import SQLiteStorage
+
+
+DAY = datetime(2024, 3, 4).timestamp()
+HOUR = 3600.0
+
+
+def _label(category_id: str, productive: bool) -> Classification:
+    return Classification(category_id=category_id, meta={"productive": productive})
+
+
+def _totals(storage: SQLiteStorage, unit: str) -> list[tuple[float, str, bool, str, float]]:
+    return [
+        (r.bucket_start, r.category_id, r.productive, r.device, round(r.seconds, 6))
+        for r in storage.rollups(unit, DAY - 2 * 86400, DAY + 3 * 86400)
+    ]
+
+
+@pytest.mark.unit
+def test_split_by_bucket_cuts_at_local_hours_and_days() -> None:
+    start = DAY + 10 * HOUR + 1800
+    assert list(split_by_bucket(start, start + 2 * HOUR, "hour")) == [
+        (DAY + 10 * HOUR, 1800.0),
+        (DAY + 11 * HOUR, 3600.0),
+        (DAY + 12 * HOUR, 1800.0),
+    ]
+    next_day = datetime(2024, 3, 5).timestamp()
+    assert list(split_by_bucket(next_day - 60, next_day + 30, "day")) == [(DAY, 60.0), (next_day, 30.0)]
+    assert list(split_by_bucket(start, start, "hour")) == []
+
+
+@pytest.mark.unit
+def test_rollups_follow_inserts_labels_and_overrides(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3", rollup_engine_version="rules-v1")
+    first = storage.insert_event(
+        Event(start_ts=DAY + 9 * HOUR + 1800, end_ts=DAY + 10 * HOUR + 600, app="Code", title="", device="mac")
+    )
+    ids = storage.insert_events(
+        [Event(start_ts=DAY + 11 * HOUR, end_ts=DAY + 11 * HOUR + 900, app="Slack", title="", device="mac")]
+    )
+    assert _totals(storage, "day") == [(DAY, "", False, "mac", 3300.0)]
+
+    storage.upsert_engine_classification(first, "rules-v1", _label("Coding", True))
+    storage.upsert_engine_classifications("rules-v1", [(ids[0], _label("Chat", False))])
+    storage.upsert_engine_classification(first, "other-v1", _label("Games", False))
+    assert _totals(storage, "hour") == [
+        (DAY + 9 * HOUR, "Coding", True, "mac", 1800.0),
+        (DAY + 10 * HOUR, "Coding", True, "mac", 600.0),
+        (DAY + 11 * HOUR, "Chat", False, "mac", 900.0),
+    ]
+
+    storage.set_user_override(ids[0], "Coding")
+    assert _totals(storage, "day") == [(DAY, "Coding", True, "mac", 3300.0)]
+
+    storage.clear_user_override(ids[0])
+    incremental = _totals(storage, "day")
+    assert incremental == [(DAY, "Chat", False, "mac", 900.0), (DAY, "Coding", True, "mac", 2400.0)]
+
+    storage.rebuild_rollups("rules-v1")
+    assert _totals(storage, "day") == incremental
+    assert storage.rollups("day", DAY, DAY + 86400, device="pc") == []
+    storage.close()
+
+
+@pytest.mark.unit
+def test_rollups_are_rebuilt_after_writes_without_upkeep(tmp_path, capsys) -> None:
+    db_path = tmp_path / "activity.sqlite3"
+    SQLiteStorage(db_path, rollup_engine_version="rules-v1").close()
+
+    plain = SQLiteStorage(db_path)
+    event_id = plain.insert_event(Event(start_ts=DAY, end_ts=DAY + 60, app="Code", title=""))
+    plain.upsert_engine_classification(event_id, "rules-v1", _label("Coding", True))
+    plain.close()
+
+    storage = SQLiteStorage(db_path, rollup_engine_version="rules-v1")
+    assert storage.rollups("day", DAY, DAY + 1) == [RollupRow(DAY, "Coding", True, "", 60.0)]
+    storage.close()
+
+    main(["--db", str(db_path), "--engine-version", "rules-v1"])
+    assert "2 rollup rows for rules-v1" in capsys.readouterr().out  # one hourly, one daily
+
+
+@pytest.mark.unit
+def test_rolled_back_invalidation_is_repeated_by_the_next_write(tmp_path) -> None:
+    db_path = tmp_path / "activity.sqlite3"
+    SQLiteStorage(db_path, rollup_engine_version="rules-v1").close()
+
+    plain = SQLiteStorage(db_path)
+    with pytest.raises(RuntimeError):
+        with plain.unit_of_work():
+            plain.insert_event(Event(start_ts=DAY, end_ts=DAY + 60, app="Code", title=""))
+            raise RuntimeError("boom")
+    plain.insert_event(Event(start_ts=DAY, end_ts=DAY + 30, app="Code", title=""))
+    plain.close()
+
+    storage = SQLiteStorage(db_path, rollup_engine_version="rules-v1")
+    assert storage.rollups("day", DAY, DAY + 1) == [RollupRow(DAY, "", False, "", 30.0)]
+    storage.close()
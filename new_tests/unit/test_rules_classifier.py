@@ -8,7 +8,7 @@ from new_core.models import Classification, Event
 
 @pytest.mark.unit
 def test_rules_classifier_handles_idle_events() -> None:
-    classifier = RulesClassifier()
+    classifier = RulesClassifier(cache_dir=None)
 
     result = classifier.classify(
         Event(
@@ -31,7 +31,7 @@ def test_rules_classifier_handles_idle_events() -> None:
 
 @pytest.mark.unit
 def test_rules_classifier_matches_app_rules() -> None:
-    classifier = RulesClassifier()
+    classifier = RulesClassifier(cache_dir=None)
 
     result = classifier.classify(
         Event(
@@ -50,7 +50,7 @@ def test_rules_classifier_matches_app_rules() -> None:
 
 @pytest.mark.unit
 def test_rules_classifier_matches_domain_path_rules() -> None:
-    classifier = RulesClassifier()
+    classifier = RulesClassifier(cache_dir=None)
 
     result = classifier.classify(
         Event(
@@ -65,3 +65,74 @@ def test_rules_classifier_matches_domain_path_rules() -> None:
     assert result.category_id == "Research"
     assert result.rule_id == "domain:www.google.com/search"
     assert result.meta == {"productive": True}
+
+
+def _batch_events() -> list[Event]:
+    rows = [
+        ("Visual Studio Code", "main.py", ""),
+        ("Firefox", "Search results", "https://www.google.com/search?q=one"),
+        ("Visual Studio Code", "other.py", ""),
+        ("Firefox", "Search results", "https://www.google.com/search?q=two"),
+        ("Finder", "Idle", ""),
+        ("Firefox", "Nowhere", "https://unknown.example/page"),
+    ]
+    return [Event(start_ts=float(i), end_ts=float(i) + 1.0, app=a, title=t, url=u) for i, (a, t, u) in enumerate(rows)]
+
+
+@pytest.mark.unit
+def test_classify_many_matches_single_event_results() -> None:
+    classifier = RulesClassifier(cache_dir=None)
+    events = _batch_events()
+
+    results = classifier.classify_many(events)
+
+    assert results == [classifier.classify(e) for e in events]
+    # Both google searches reduce to one context and share its result.
+    assert results[1] is results[3]
+
+
+@pytest.mark.unit
+def test_classify_columns_broadcasts_unique_contexts() -> None:
+    classifier = RulesClassifier(cache_dir=None)
+    events = _batch_events()
+
+    columns = classifier.classify_columns(
+        [e.app for e in events],
+        [e.title for e in events],
+        [e.url for e in events],
+    )
+
+    assert list(columns["category_id"]) == ["Coding", "Research", "Coding", "Research", "Idle", "Unknown"]
+    assert list(columns["productive"]) == [True, True, True, True, False, False]
+    assert columns["rule_id"][5] is None
+    assert list(columns["context_index"]) == [0, 1, 0, 1, 2, 3]
+
+
+@pytest.mark.unit
+def test_classify_table_accepts_pandas_and_arrow() -> None:
+    pd = pytest.importorskip("pandas")
+    pa = pytest.importorskip("pyarrow")
+    classifier = RulesClassifier(cache_dir=None)
+    events = _batch_events()
+    frame = pd.DataFrame({"app": [e.app for e in events], "title": [e.title for e in events], "url": [e.url for e in events]})
+
+    labelled = classifier.classify_table(frame)
+    table = classifier.classify_table(pa.Table.from_pandas(frame))
+
+    expected = [r.category_id for r in classifier.classify_many(events)]
+    assert labelled["category_id"].tolist() == expected
+    assert table.column("category_id").to_pylist() == expected
+    assert table.column("productive").type == pa.bool_()
+
+
+@pytest.mark.unit
+def test_rules_classifier_cache_version_tracks_rules_file(tmp_path) -> None:
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text('{"Coding": {"apps": ["code"], "productive": true}}')
+    classifier = RulesClassifier(rules_path, reload_interval=0.0, cache_dir=None)
+    before = classifier.cache_version
+
+    rules_path.write_text('{"Coding": {"apps": ["code", "vim"], "productive": true}}')
+
+    assert before.startswith("rules-v1+")
+    assert classifier.cache_version != before
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import sqlite3
+import threading
 
 import pytest
 
@@ -125,3 +126,329 @@ def test_sqlite_storage_sets_and_clears_user_overrides(tmp_path) -> None:
     assert row is None
 
     storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_storage_pages_unclassified_events_and_batches_upserts(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    ids = [
+        storage.insert_event(Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title=f"t{i}"))
+        for i in range(5)
+    ]
+    storage.upsert_engine_classification(ids[1], "rules-v1", Classification(category_id="Coding"))
+
+    first = storage.unclassified_events("rules-v1", after_id=0, limit=2)
+    second = storage.unclassified_events("rules-v1", after_id=first[-1][0], limit=2)
+
+    assert [event_id for event_id, _ in first] == [ids[0], ids[2]]
+    assert [event_id for event_id, _ in second] == [ids[3], ids[4]]
+    assert first[0][1].title == "t0"
+
+    written = storage.upsert_engine_classifications(
+        "rules-v1",
+        [(event_id, Classification(category_id="Coding", meta={"productive": True})) for event_id, _ in second],
+        checkpoint=("reclassify:rules-v1", ids[4]),
+    )
+
+    assert written == 2
+    assert storage.get_checkpoint("reclassify:rules-v1") == ids[4]
+    assert [event_id for event_id, _ in storage.unclassified_events("rules-v1")] == [ids[0], ids[2]]
+
+    storage.clear_checkpoint("reclassify:rules-v1")
+    assert storage.get_checkpoint("reclassify:rules-v1") is None
+
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_storage_persists_context_classifications(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    c = Classification(category_id="Coding", rule_id="app:code", meta={"productive": True})
+
+    assert storage.get_context_classification("abc", "rules-v1") is None
+    storage.put_context_classification("abc", "rules-v1", c)
+    storage.close()
+
+    reopened = SQLiteStorage(tmp_path / "activity.sqlite3")
+    assert reopened.get_context_classification("abc", "rules-v1") == c
+    assert reopened.get_context_classification("abc", "rules-v2") is None
+
+    reopened.put_context_classification("abc", "rules-v2", c)
+    assert reopened.prune_context_classifications("rules-v2") == 1
+    assert reopened.get_context_classification("abc", "rules-v1") is None
+    assert reopened.get_context_classification("abc", "rules-v2") == c
+    reopened.close()
+
+
+@pytest.mark.unit
+def test_sqlite_unit_of_work_commits_once_or_rolls_back(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    label = Classification(category_id="Coding", confidence=1.0)
+
+    def committed_events() -> int:
+        with sqlite3.connect(storage.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    with storage.unit_of_work():
+        first = storage.insert_event(Event(start_ts=1.0, end_ts=2.0, app="Code", title="a"))
+        storage.upsert_engine_classification(first, "rules-v1", label)
+        with storage.unit_of_work():
+            storage.insert_event(Event(start_ts=2.0, end_ts=3.0, app="Code", title="b"))
+        assert committed_events() == 0
+    assert committed_events() == 2
+
+    with pytest.raises(RuntimeError):
+        with storage.unit_of_work():
+            storage.insert_event(Event(start_ts=3.0, end_ts=4.0, app="Code", title="c"))
+            storage.upsert_engine_classifications("rules-v1", [(first, label)], checkpoint=("job", 1))
+            raise RuntimeError("boom")
+    assert committed_events() == 2
+    assert storage.get_checkpoint("job") is None
+
+    storage.insert_event(Event(start_ts=4.0, end_ts=5.0, app="Code", title="d"))
+    assert committed_events() == 3
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_insert_events_returns_consecutive_ids(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    storage.insert_event(Event(start_ts=0.0, end_ts=1.0, app="Code", title="first"))
+
+    events = (Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title=f"w{i}") for i in range(1, 26))
+    ids = storage.insert_events(events, chunk_size=10)
+
+    assert ids == range(2, 27)
+    assert storage.insert_events([]) == range(0)
+    with sqlite3.connect(storage.db_path) as conn:
+        rows = conn.execute("SELECT id, title FROM events WHERE id >= 2 ORDER BY id").fetchall()
+    assert rows == [(i, f"w{i - 1}") for i in ids]
+
+    with pytest.raises(sqlite3.IntegrityError):
+        storage.insert_events([
+            Event(start_ts=30.0, end_ts=31.0, app="Code", title="ok"),
+            Event(start_ts=31.0, end_ts=None, app="Code", title="open"),  # type: ignore[arg-type]
+        ])
+    assert storage.insert_events([Event(start_ts=32.0, end_ts=33.0, app="Code", title="x")]) == range(27, 28)
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_bulk_load_defers_indexes_and_restores_settings(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+
+    def indexes() -> set[str]:
+        with sqlite3.connect(storage.db_path) as conn:
+            rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'events'")
+            return {name for (name,) in rows if not name.startswith("sqlite_")}
+
+    before = indexes()
+    with storage.bulk_load():
+        assert indexes() == set()
+        assert storage._conn.execute("PRAGMA synchronous").fetchone()[0] == 0
+        storage.insert_events(Event(start_ts=float(i), end_ts=float(i) + 1.0, app="Code", title="t") for i in range(100))
+    assert indexes() == before
+    assert storage._conn.execute("PRAGMA synchronous").fetchone()[0] == 2
+
+    with pytest.raises(ValueError):
+        with storage.bulk_load(synchronous="FAST"):
+            pass
+    with storage.unit_of_work():
+        with pytest.raises(RuntimeError):
+            with storage.bulk_load():
+                pass
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_effective_labels_prefer_overrides_and_clip_to_the_window(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3")
+    ids = storage.insert_events(
+        Event(start_ts=float(t), end_ts=float(t) + 10.0, app=app, title="")
+        for t, app in [(0, "Code"), (10, "Slack"), (20, "Code"), (30, "Code")]
+    )
+    storage.upsert_engine_classifications(
+        "rules-v1",
+        [
+            (ids[0], Classification(category_id="Coding", meta={"productive": True})),
+            (ids[1], Classification(category_id="Chat", meta={"productive": False})),
+            (ids[2], Classification(category_id="Coding", meta={"productive": True})),
+        ],
+    )
+    storage.set_user_override(ids[2], "Docs")
+
+    batches = list(storage.effective_labels(5.0, 35.0, "rules-v1", productive_by_category={"Docs": True}, batch_size=2))
+
+    assert [len(batch["event_id"]) for batch in batches] == [2, 2]
+    rows = [dict(zip(batch, values)) for batch in batches for values in zip(*batch.values())]
+    assert [(r["event_id"], r["category_id"], r["productive"], r["overridden"], r["duration"]) for r in rows] == [
+        (ids[0], "Coding", True, False, 5.0),
+        (ids[1], "Chat", False, False, 10.0),
+        (ids[2], "Docs", True, True, 10.0),
+        (ids[3], None, None, False, 5.0),
+    ]
+
+    filtered = list(storage.effective_labels(0.0, 40.0, "rules-v1", apps=["Code"], categories=["Coding", "Docs"]))
+    assert filtered[0]["event_id"] == [ids[0], ids[2]]
+    assert filtered[0]["productive"] == [True, None]
+
+    table = storage.effective_labels_arrow(0.0, 40.0, "rules-v1").read_all()
+    assert table.num_rows == 4
+    assert table.column("category_id").to_pylist() == ["Coding", "Chat", "Docs", None]
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_queries_read_committed_snapshots_without_waiting_for_the_writer(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3", readers=2)
+    first = storage.insert_event(Event(start_ts=0.0, end_ts=1.0, app="Code", title="a"))
+    in_transaction = threading.Event()
+    release = threading.Event()
+    written: list[int] = []
+
+    def writer() -> None:
+        with storage.unit_of_work():
+            written.append(storage.insert_event(Event(start_ts=1.0, end_ts=2.0, app="Code", title="b")))
+            # Inside its own unit of work the writer sees its uncommitted row.
+            assert storage.event_spans(written) == {written[0]: (1.0, 2.0)}
+            in_transaction.set()
+            release.wait(timeout=5.0)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    assert in_transaction.wait(timeout=5.0)
+
+    # The writer holds the connection lock; readers neither wait nor see the open transaction.
+    assert storage.event_spans([first, written[0]]) == {first: (0.0, 1.0)}
+    labels = storage.effective_labels(0.0, 10.0, "rules-v1", batch_size=1)
+    assert next(labels)["event_id"] == [first]
+
+    release.set()
+    thread.join(timeout=5.0)
+    assert list(labels) == []  # the stream stays on the snapshot it started with
+    assert storage.event_spans(written) == {written[0]: (1.0, 2.0)}
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_reader_pool_reuses_nested_readers_and_falls_back_to_the_writer(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3", readers=1, reader_wait_seconds=0.05)
+    first = storage.insert_event(Event(start_ts=0.0, end_ts=1.0, app="Code", title="a"))
+    storage.insert_event(Event(start_ts=1.0, end_ts=2.0, app="Code", title="b"))
+
+    # A query inside a streaming read on the same thread reuses its reader.
+    for batch in storage.effective_labels(0.0, 10.0, "rules-v1", batch_size=1):
+        assert list(storage.event_spans(batch["event_id"])) == batch["event_id"]
+        assert storage.get_checkpoint("missing") is None
+
+    # Another thread finds the only reader taken and queries on the writer.
+    labels = storage.effective_labels(0.0, 10.0, "rules-v1", batch_size=1)
+    next(labels)
+    spans: list[dict[int, tuple[float, float]]] = []
+    thread = threading.Thread(target=lambda: spans.append(storage.event_spans([first])))
+    thread.start()
+    thread.join(timeout=5.0)
+    assert spans == [{first: (0.0, 1.0)}]
+    labels.close()
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_close_closes_readers_still_in_use(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3", readers=2)
+    storage.insert_event(Event(start_ts=0.0, end_ts=1.0, app="Code", title="a"))
+
+    with storage._reading() as conn:
+        storage.close()
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+@pytest.mark.unit
+def test_sqlite_normalized_layout_interns_text_behind_an_events_view(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3", layout="normalized")
+    ids = storage.insert_events(
+        Event(start_ts=float(i), end_ts=i + 1.0, app="Safari", title="Docs", url=f"https://example.com/{i % 2}")
+        for i in range(4)
+    )
+    storage.insert_event(Event(start_ts=9.0, end_ts=10.0, app="Code", title="Docs", url=""))
+
+    with sqlite3.connect(storage.db_path) as conn:
+        rows = conn.execute(
+            "SELECT id, app, title, url, host FROM events WHERE app = 'Safari' ORDER BY id"
+        ).fetchall()
+        counts = [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("apps", "titles", "urls", "hosts")]
+        by_host = conn.execute("SELECT host_id, COUNT(*) FROM events GROUP BY host_id ORDER BY host_id").fetchall()
+
+    assert storage.layout == "normalized"
+    assert [row[0] for row in rows] == list(ids)
+    assert rows[1][1:] == ("Safari", "Docs", "https://example.com/1", "example.com")
+    assert counts == [2, 1, 3, 2]
+    assert [n for _, n in by_host] == [4, 1]
+    assert [e.app for _, e in storage.unclassified_events("rules-v1")] == ["Safari"] * 4 + ["Code"]
+
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_normalized_rollback_forgets_interned_ids(tmp_path) -> None:
+    storage = SQLiteStorage(tmp_path / "activity.sqlite3", layout="normalized")
+
+    with pytest.raises(RuntimeError):
+        with storage.unit_of_work():
+            storage.insert_event(Event(start_ts=1.0, end_ts=2.0, app="Slack", title="general", url=""))
+            raise RuntimeError("boom")
+    event_id = storage.insert_event(Event(start_ts=3.0, end_ts=4.0, app="Slack", title="general", url=""))
+
+    with sqlite3.connect(storage.db_path) as conn:
+        assert conn.execute("SELECT app, title FROM events WHERE id = ?", (event_id,)).fetchone() == (
+            "Slack",
+            "general",
+        )
+
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_layout_is_fixed_when_the_database_is_created(tmp_path) -> None:
+    path = tmp_path / "activity.sqlite3"
+    SQLiteStorage(path).close()
+
+    with pytest.raises(ValueError, match="--layout normalized"):
+        SQLiteStorage(path, layout="normalized")
+    with pytest.raises(ValueError):
+        SQLiteStorage(tmp_path / "other.sqlite3", layout="columnar")
+
+    storage = SQLiteStorage(path)
+    assert storage.layout == "wide"
+    storage.close()
+
+
+@pytest.mark.unit
+def test_sqlite_label_index_holds_the_productive_flag_not_meta(tmp_path) -> None:
+    path = tmp_path / "activity.sqlite3"
+    storage = SQLiteStorage(path)
+    event_id = storage.insert_event(Event(start_ts=1.0, end_ts=2.0, app="Code", title="Editor", url=""))
+    storage.upsert_engine_classification(
+        event_id, "rules-v1", Classification(category_id="Coding", meta={"productive": True, "rule": "app:code"})
+    )
+    storage.close()
+    with sqlite3.connect(path) as conn:  # the layout written before the productive column
+        conn.execute("DROP INDEX idx_engine_classifications_lookup")
+        conn.execute("ALTER TABLE engine_classifications DROP COLUMN productive")
+        conn.execute(
+            "CREATE INDEX idx_engine_classifications_lookup "
+            "ON engine_classifications(event_id, engine_version, category_id, meta_json)"
+        )
+
+    storage = SQLiteStorage(path)
+    batch = next(storage.effective_labels(0.0, 10.0, "rules-v1"))
+    with sqlite3.connect(path) as conn:
+        index_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'idx_engine_classifications_lookup'"
+        ).fetchone()[0]
+
+    assert batch["productive"] == [True]
+    assert "meta_json" not in index_sql and "productive" in index_sql
+    storage.close()
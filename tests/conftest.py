@@ -2,7 +2,10 @@
 Pytest configuration to ensure the project root is on sys.path so tests can import
 the local `logger` package without needing an editable install.
 """
+import os
+import shutil
 import sys
+import tempfile
 from pathlib import Path
 
 
@@ -10,3 +13,10 @@ ROOT = Path(__file__).resolve().parent.parent
 ROOT_STR = str(ROOT)
 if ROOT_STR not in sys.path:
     sys.path.insert(0, ROOT_STR)
+
+
+def pytest_configure(config):
+    # Keep compiled-rules cache files out of the repository's data/cache.
+    cache_dir = tempfile.mkdtemp(prefix="rules-cache-")
+    os.environ["ACTIVITY_RULES_CACHE_DIR"] = cache_dir
+    config.add_cleanup(lambda: shutil.rmtree(cache_dir, ignore_errors=True))
@@ -0,0 +1,120 @@
+import sqlite3
+import time
+
+from logger import categorize
+from logger.ai_cache import AIDecisionCache
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = tmp_path / "ai_cache.sqlite3"
+    cache = AIDecisionCache(namespace="context", path=path, version="v1")
+    cache["notion.so"] = ("Productivity", True)
+    cache.close()
+
+    reopened = AIDecisionCache(namespace="context", path=path, version="v1")
+    assert reopened.get("notion.so") == ("Productivity", True)
+    assert AIDecisionCache(namespace="keyword", path=path, version="v1").get("notion.so") is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = AIDecisionCache(namespace="context", path=tmp_path / "c.sqlite3", max_entries=2, version="v1")
+    cache["a"] = ("A", True)
+    time.sleep(0.01)
+    cache["b"] = ("B", False)
+    time.sleep(0.01)
+    assert cache.get("a") == ("A", True)  # refresh "a"
+    time.sleep(0.01)
+    cache["c"] = ("C", False)
+
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == ("A", True)
+
+
+def test_cache_drops_expired_and_stale_version_entries(tmp_path):
+    path = tmp_path / "c.sqlite3"
+    cache = AIDecisionCache(namespace="context", path=path, version="v1")
+    cache.set("short", ("A", True), ttl_seconds=-1)
+    cache["kept"] = ("B", False)
+    assert cache.get("short") is None
+    cache.close()
+
+    assert AIDecisionCache(namespace="context", path=path, version="v2").get("kept") is None
+
+
+def test_categorize_with_ai_reuses_persisted_decision(tmp_path, monkeypatch):
+    path = tmp_path / "ai_cache.sqlite3"
+    monkeypatch.setattr(categorize, "_add_rule_from_ai", lambda *args, **kwargs: None)
+    monkeypatch.setattr(categorize, "_increment_keyword_count", lambda *args, **kwargs: None)
+    calls = []
+
+    def fake_ai(app, title, url):
+        calls.append((app, title, url))
+        return {"category": "Productivity", "productive": True}
+
+    for _ in range(2):  # simulate a restart between calls
+        monkeypatch.setattr(categorize, "AI_CACHE", AIDecisionCache("context", path=path, version="v1"))
+        monkeypatch.setattr(categorize, "KEYWORD_AI_CACHE", AIDecisionCache("keyword", path=path, version="v1"))
+        result = categorize.categorize_with_ai(
+            "Some Unknown App", "Quarterly planning board", "", ai_callback=fake_ai
+        )
+        assert result == ("Productivity", True)
+
+    assert len(calls) == 1
+
+
+def test_renamed_and_removed_categories_invalidate_cached_decisions(tmp_path, monkeypatch):
+    path = tmp_path / "ai_cache.sqlite3"
+    rules = {
+        "Productivity": {"apps": [], "domains": [], "productive": True},
+        "Social": {"apps": [], "domains": [], "productive": False},
+        "Video": {"apps": [], "domains": [], "productive": False},
+    }
+    monkeypatch.setattr(categorize, "CATEGORY_RULES", rules)
+    monkeypatch.setattr(categorize, "KEYWORD_INDEX", {"Research": [{"keyword": "arxiv", "count": 1}]})
+    cache = AIDecisionCache("context", path=path, version="v1", is_valid=categorize._is_known_category)
+    cache["notion.so"] = ("Productivity", True)
+    cache["twitter.com"] = ("Social", False)
+    cache["youtube.com"] = ("Video", False)
+    cache["arxiv.org"] = ("Research", True)
+    cache["failed"] = ("Unknown", False)
+    cache.close()
+
+    # "Social" is renamed, "Video" removed and a category is added.
+    monkeypatch.setattr(
+        categorize,
+        "CATEGORY_RULES",
+        {
+            "Productivity": {"apps": [], "domains": [], "productive": True},
+            "Social Media": {"apps": [], "domains": [], "productive": False},
+            "Brand New": {"apps": [], "domains": [], "productive": True},
+        },
+    )
+    reopened = AIDecisionCache("context", path=path, version="v1", is_valid=categorize._is_known_category)
+    assert reopened.get("notion.so") == ("Productivity", True)
+    assert reopened.get("arxiv.org") == ("Research", True)
+    assert reopened.get("failed") == ("Unknown", False)
+    assert reopened.get("twitter.com") is None
+    assert reopened.get("youtube.com") is None
+    assert len(reopened) == 3
+
+
+def test_cache_hits_batch_last_used_writes(tmp_path):
+    path = tmp_path / "c.sqlite3"
+    cache = AIDecisionCache(namespace="context", path=path, version="v1", touch_batch=2)
+    cache["a"] = ("A", True)
+    cache["b"] = ("B", False)
+
+    def stored_last_used():
+        with sqlite3.connect(str(path)) as conn:
+            return dict(conn.execute("SELECT key, last_used FROM ai_decisions").fetchall())
+
+    written = stored_last_used()
+    time.sleep(0.01)
+    assert cache.get("a") == ("A", True)
+    assert stored_last_used() == written  # kept in memory
+
+    assert cache.get("b") == ("B", False)
+    refreshed = stored_last_used()
+    assert refreshed["a"] > written["a"] and refreshed["b"] > written["b"]
+    cache.close()
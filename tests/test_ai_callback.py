@@ -0,0 +1,79 @@
+import json
+import os
+import types
+
+import pytest
+
+from logger import ai_callback
+
+
+class _FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        content = json.dumps({"category": "Coding", "productive": True, "confidence": 0.8})
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+            usage=types.SimpleNamespace(prompt_tokens=40, completion_tokens=12),
+        )
+
+
+class _FakeOpenAI:
+    instances = []
+
+    def __init__(self, api_key=None, base_url=None):
+        self.api_key = api_key
+        self.chat = types.SimpleNamespace(completions=_FakeCompletions())
+        type(self).instances.append(self)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def categorizer(monkeypatch, tmp_path):
+    _FakeOpenAI.instances = []
+    monkeypatch.setattr(ai_callback, "OpenAI", _FakeOpenAI)
+    config_path = tmp_path / "ai_config.json"
+    config_path.write_text(json.dumps({"api_key": "key-1", "model": "test-model"}))
+    rules_path = tmp_path / "category_rules.json"
+    rules_path.write_text(json.dumps({"Coding": {"productive": True}}))
+    return ai_callback.OpenAICategorizer(config_path=config_path, rules_path=rules_path)
+
+
+def test_categorizer_reuses_client_config_and_prompt(categorizer):
+    for _ in range(3):
+        assert categorizer.categorize("Code", "main.py", "")["category"] == "Coding"
+
+    stats = categorizer.stats()
+    assert len(_FakeOpenAI.instances) == 1
+    assert stats["calls"] == 3
+    assert stats["client_builds"] == 1
+    assert stats["config_loads"] == 1
+    assert stats["prompt_builds"] == 1
+    assert stats["prompt_tokens"] == 120
+    assert stats["completion_tokens"] == 36
+    assert stats["avg_latency_seconds"] >= 0.0
+
+
+def test_categorizer_reloads_on_mtime_change(categorizer, tmp_path):
+    categorizer.categorize("Code", "main.py", "")
+
+    rules_path = tmp_path / "category_rules.json"
+    rules_path.write_text(json.dumps({"Coding": {"productive": True}, "Gaming": {"productive": False}}))
+    stat = rules_path.stat()
+    os.utime(rules_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    config_path = tmp_path / "ai_config.json"
+    config_path.write_text(json.dumps({"api_key": "key-2"}))
+    stat = config_path.stat()
+    os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    categorizer.categorize("Code", "main.py", "")
+
+    stats = categorizer.stats()
+    assert stats["prompt_builds"] == 2
+    assert stats["client_builds"] == 2
+    last_call = _FakeOpenAI.instances[-1].chat.completions.calls[-1]
+    assert "Gaming" in last_call["messages"][0]["content"]
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from logger import ai_callback, categorize
+from logger.ai_cache import AIDecisionCache
+from logger.ai_queue import AIClassificationQueue
+from logger.parquet_writer import LogBuffer
+
+
+class _StubOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint answering multi-item prompts."""
+
+    requests = []
+    skipped_titles = set()  # items left out of the response, as a model sometimes does
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        items = json.loads(body["messages"][-1]["content"])["items"]
+        type(self).requests.append(items)
+        results = [
+            {"id": item["id"], "category": "Productivity", "productive": True, "confidence": 0.9}
+            for item in items
+            if item["title"] not in type(self).skipped_titles
+        ]
+        payload = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps({"results": results})},
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_openai(monkeypatch, tmp_path):
+    _StubOpenAIHandler.requests = []
+    _StubOpenAIHandler.skipped_titles = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(ai_callback, "AI_CONFIG_PATH", tmp_path / "missing_ai_config.json")
+    yield _StubOpenAIHandler
+    server.shutdown()
+
+
+@pytest.fixture
+def isolated_write_back(monkeypatch, tmp_path):
+    path = tmp_path / "ai_cache.sqlite3"
+    monkeypatch.setattr(categorize, "AI_CACHE", AIDecisionCache("context", path=path, version="v1"))
+    monkeypatch.setattr(categorize, "KEYWORD_AI_CACHE", AIDecisionCache("keyword", path=path, version="v1"))
+    monkeypatch.setattr(categorize, "_add_rule_from_ai", lambda *args, **kwargs: None)
+    monkeypatch.setattr(categorize, "_increment_keyword_count", lambda *args, **kwargs: None)
+
+
+def test_queue_batches_and_dedupes_against_stub_server(stub_openai, isolated_write_back):
+    queue = AIClassificationQueue(
+        ai_callback.openai_categorize_batch, batch_size=10, max_wait_seconds=0.2, timeout_seconds=5
+    )
+    resolved = []
+    queue.add_listener(lambda key, cat, prod: resolved.append((key, cat, prod)))
+    queue.start()
+
+    provisional = categorize.categorize_with_ai(
+        "Unknown Tool", "Quarterly planning board", "", ai_queue=queue
+    )
+    assert provisional == ("Unknown", False)
+    assert queue.submit("Unknown Tool", "Quarterly planning board", "") is False  # deduplicated
+    assert queue.submit("Other Tool", "Release checklist notes", "") is True
+
+    assert queue.join(timeout=10)
+    queue.stop()
+
+    assert len(stub_openai.requests) == 1
+    assert len(stub_openai.requests[0]) == 2
+    assert sorted(resolved) == [
+        ("other tool", "Productivity", True),
+        ("unknown tool", "Productivity", True),
+    ]
+    assert categorize.AI_CACHE.get("unknown tool") == ("Productivity", True)
+
+
+def test_items_missing_from_a_batch_response_are_retried_sooner(stub_openai, isolated_write_back):
+    stub_openai.skipped_titles = {"Release checklist notes"}
+    queue = AIClassificationQueue(
+        ai_callback.openai_categorize_batch, batch_size=10, max_wait_seconds=0.2, timeout_seconds=5
+    )
+    queue.start()
+    queue.submit("Unknown Tool", "Quarterly planning board", "")
+    queue.submit("Other Tool", "Release checklist notes", "", provisional=("Docs", True))
+    assert queue.join(timeout=10)
+    queue.stop()
+
+    cache = categorize.AI_CACHE
+    assert cache.get("other tool") == ("Docs", True)  # the provisional label, not a model answer
+    expires = dict(cache._connection().execute("SELECT key, expires_at FROM ai_decisions").fetchall())
+    assert expires["other tool"] - time.time() <= categorize.AI_FAILURE_TTL_SECONDS
+    assert expires["unknown tool"] - time.time() > categorize.AI_FAILURE_TTL_SECONDS
+
+
+def test_queue_result_relabels_buffered_samples(tmp_path):
+    buffer = LogBuffer(flush_interval=999, max_rows=10, log_dir=tmp_path, device_id="test-device")
+    ts = datetime(2024, 1, 1, 12, 0, 0)
+    buffer.buffer = [
+        {"timestamp": ts, "app": "Unknown Tool", "title": "Board", "url": None,
+         "category": "Unknown", "is_productive": False},
+        {"timestamp": ts, "app": "Code", "title": "main.py", "url": None,
+         "category": "Coding", "is_productive": True},
+    ]
+
+    buffer.apply_ai_label("unknown tool", "Productivity", True)
+
+    assert buffer.buffer[0]["category"] == "Productivity"
+    assert buffer.buffer[0]["is_productive"] is True
+    assert buffer.buffer[1]["category"] == "Coding"
@@ -87,3 +87,66 @@ def test_keyword_session_counts_once_per_context(tmp_path, monkeypatch):
 
     stored = json.loads(Path(categorize.KEYWORD_INDEX_PATH).read_text())
     assert stored["Research"][0]["count"] == 2
+
+
+def test_local_model_answers_before_ai(monkeypatch):
+    class ConfidentModel:
+        min_confidence = 0.8
+
+        def predict(self, app, title, url):
+            return "Productivity", True, 0.95
+
+    monkeypatch.setattr(categorize.AI_CACHE, "get", lambda key, default=None: default)
+    monkeypatch.setattr(categorize.KEYWORD_AI_CACHE, "get", lambda key, default=None: default)
+
+    def failing_ai(app, title, url):
+        raise AssertionError("AI should not be called")
+
+    result = categorize.categorize_with_ai(
+        "Some Unknown App", "Quarterly planning board", "",
+        ai_callback=failing_ai, local_model=ConfidentModel(),
+    )
+    assert result == ("Productivity", True)
+
+
+def test_profiling_counts_rule_hits_and_misses(monkeypatch):
+    monkeypatch.setattr(categorize, "PROFILE", None)
+    profile = categorize.enable_profiling()
+
+    categorize_fn("Visual Studio Code", "main.py", "")
+    categorize_fn("Visual Studio Code", "other.py", "")
+    categorize_fn("Some Unknown App", "Untitled", "https://nowhere.example/x")
+
+    snapshot = profile.snapshot()
+    assert snapshot["calls"] == 3
+    assert snapshot["rules"] == {"app:visual studio code": 2}
+    assert snapshot["unmatched_apps"] == {"some unknown app": 1}
+    assert snapshot["unmatched_hosts"] == {"nowhere.example": 1}
+    assert sum(snapshot["latency_histogram"].values()) == 3
+
+    categorize.disable_profiling()
+    categorize_fn("Visual Studio Code", "main.py", "")
+    assert profile.snapshot()["calls"] == 3
+
+
+def test_ai_rule_is_published_as_a_new_snapshot(tmp_path, monkeypatch):
+    from new_classifiers.compiled_rules import HotReloadingRules
+
+    rules_path = tmp_path / "rules.json"
+    coding = {"Coding": {"apps": ["code"], "domains": [], "productive": True}}
+    rules_path.write_text(json.dumps(coding))
+    categorize._ensure_loaded()
+    for name in ("_COMPILED", "CATEGORY_RULES", "APP_INDEX", "DOMAIN_INDEX", "KEYWORD_LOOKUP"):
+        monkeypatch.setattr(categorize, name, getattr(categorize, name))  # restored after the test
+    hot = HotReloadingRules(rules_path, cache_dir=None)
+    monkeypatch.setattr(categorize, "_HOT_RULES", hot)
+    categorize._apply_compiled(hot.current())
+    before = hot.current()
+
+    categorize._add_rule_from_ai("Docs", True, "Obsidian", "Notes", "")
+
+    assert before.rules == coding
+    assert categorize._COMPILED is hot.current() is not before
+    assert categorize.CATEGORY_RULES["Docs"]["apps"] == ["obsidian"]
+    assert categorize.APP_INDEX["obsidian"] == ("Docs", True)
+    assert json.loads(rules_path.read_text())["Docs"]["apps"] == ["obsidian"]
@@ -0,0 +1,65 @@
+from logger import categorize
+from logger.expiring_lru import ExpiringLRU
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl_since_last_write():
+    clock = FakeClock()
+    lru = ExpiringLRU(ttl_seconds=120, clock=clock)
+    lru.set("github.com", "pull request")
+
+    clock.now += 119
+    assert lru.get("github.com") == "pull request"
+    lru.set("github.com", "pull request")  # refresh
+
+    clock.now += 119
+    assert lru.get("github.com") == "pull request"
+
+    clock.now += 120
+    assert lru.get("github.com") is None
+    assert len(lru) == 0
+
+
+def test_size_is_bounded_and_stale_entries_are_purged_on_write():
+    clock = FakeClock()
+    lru = ExpiringLRU(ttl_seconds=60, max_entries=3, clock=clock)
+    for idx in range(5):
+        lru.set(f"host-{idx}", "kw")
+
+    assert len(lru) == 3
+    assert lru.stats()["evicted"] == 2
+    assert "host-0" not in lru
+
+    clock.now += 61
+    lru.set("fresh", "kw")
+    assert len(lru) == 1
+    assert lru.stats()["expired"] == 3
+
+
+def test_keyword_session_counts_again_after_reset_window(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(
+        categorize,
+        "KEYWORD_SESSION_STATE",
+        ExpiringLRU(ttl_seconds=categorize.KEYWORD_SESSION_RESET_SECONDS, clock=clock),
+    )
+    increments = []
+    monkeypatch.setattr(
+        categorize, "_increment_keyword_count", lambda category, keyword: increments.append(keyword)
+    )
+
+    categorize._record_keyword_session_hit("chatgpt.com", "Research", "prompt engineering")
+    clock.now += 60
+    categorize._record_keyword_session_hit("chatgpt.com", "Research", "prompt engineering")
+    clock.now += categorize.KEYWORD_SESSION_RESET_SECONDS
+    categorize._record_keyword_session_hit("chatgpt.com", "Research", "prompt engineering")
+    categorize._record_keyword_session_hit("chatgpt.com", "Research", "other keyword")
+
+    assert increments == ["prompt engineering", "prompt engineering", "other keyword"]
@@ -0,0 +1,20 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_importing_logger_modules_defers_rules_and_openai():
+    out = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            "import sys, logger.parquet_writer, logger.ai_queue, logger.categorize as c; "
+            "print('openai' in sys.modules, c._LOADED); "
+            "c.categorize('Code', 'main.py', ''); print(c._LOADED, bool(c.APP_INDEX))",
+        ],
+        cwd=ROOT,
+        text=True,
+    )
+    assert out.split() == ["False", "False", "True", "True"]
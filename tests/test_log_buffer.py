@@ -1,10 +1,11 @@
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 
 import pandas as pd
 import pytest
 
-from logger.parquet_writer import LogBuffer
+from logger.parquet_writer import FLUSH_ERRORS, FLUSH_SECONDS, ROWS_WRITTEN, LogBuffer
 
 TEST_DEVICE_ID = "test-device"
 
@@ -188,3 +189,41 @@ def test_add_triggers_flush_on_max_rows(monkeypatch, tmp_path):
     buffer.add(_sample_entry(ts + timedelta(seconds=10), "App2", "Title2"))
     assert flush_calls  # flush called
     assert flush_calls[0][0]["app"] == "App1"
+
+
+def test_flush_records_metrics(monkeypatch, tmp_path):
+    base_ts = datetime(2024, 1, 1, 9, 0, 0)
+    buffer = LogBuffer(flush_interval=999, max_rows=10, log_dir=tmp_path, device_id=TEST_DEVICE_ID)
+    buffer.buffer = [
+        _sample_entry(base_ts, "App1", "Title1"),
+        _sample_entry(base_ts + timedelta(minutes=5), "App2", "Title2"),
+    ]
+    monkeypatch.setattr(
+        "logger.parquet_writer.classify", lambda *args, **kwargs: ("General", True)
+    )
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", lambda self, *args, **kwargs: None, raising=False)
+    flushes, rows, errors = FLUSH_SECONDS.count, ROWS_WRITTEN.value, FLUSH_ERRORS.value
+
+    buffer.flush()
+    buffer.flush()  # nothing buffered: not timed as a flush
+
+    assert FLUSH_SECONDS.count == flushes + 1
+    assert ROWS_WRITTEN.value == rows + 1
+    assert FLUSH_ERRORS.value == errors
+
+
+def test_add_waits_for_ai_labeling(tmp_path):
+    buffer = LogBuffer(flush_interval=999, max_rows=10, log_dir=tmp_path, device_id=TEST_DEVICE_ID)
+    added = threading.Event()
+
+    with buffer._lock:  # held by apply_ai_label / flush in another thread
+        worker = threading.Thread(
+            target=lambda: (buffer.add(_sample_entry(datetime(2024, 1, 1), "App1", "Title1")), added.set())
+        )
+        worker.start()
+        assert not added.wait(0.05)
+        assert buffer.buffer == []
+    worker.join(5)
+
+    assert added.is_set()
+    assert len(buffer.buffer) == 1